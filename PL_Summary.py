@@ -1,57 +1,292 @@
 import pandas as pd
 from datetime import datetime, timedelta
 import calendar
-from db_handler import connect_db, get_trades
-from utils import calculate_metrics, convert_to_human_readable
+from db_handler import DEFAULT_CHUNK_ROWS, connect_db, iter_daily_log
+from profiler import profiled
+from metrics_store import split_finished_range
+from utils import (
+    FILETIME_TICKS_PER_DAY, date_key, filetime_day_bounds, filetime_series_to_datetime, filetime_series_to_day,
+    get_most_recent_monday, read_sql_with_retry
+)
 
-def to_filetime(dt):
+@profiled
+def get_daily_premium_captured(connection, start_date, end_date):
     """
-    Convert a datetime object to a Windows FILETIME integer.
-    FILETIME represents the number of 100-nanosecond intervals since January 1, 1601 (UTC).
-    We use the formula:
-        filetime = (posix_time * 10,000,000) + 116444736000000000
+    Retrieve the premium captured (sum of ProfitLoss) for every calendar day in
+    the range with a single grouped query.
+
+    :param connection: An active database connection.
+    :param start_date: Start date as a datetime object.
+    :param end_date: End date as a datetime object (inclusive).
+    :return: Series indexed by date covering every day of the range; days
+             without trades are 0.
+    """
+    query = """
+    SELECT Year, Month, Day, SUM(ProfitLoss) AS PremiumCaptured
+    FROM Trade
+    WHERE (Year * 10000 + Month * 100 + Day) BETWEEN ? AND ?
+      AND TATTradeID IS NOT NULL
+    GROUP BY Year, Month, Day;
+    """
+    params = (date_key(start_date), date_key(end_date))
+    df_daily = read_sql_with_retry(query, connection, params=params)
+
+    if df_daily.empty:
+        daily_pl = pd.Series(dtype='float64')
+    else:
+        trade_days = pd.to_datetime(df_daily[['Year', 'Month', 'Day']])
+        daily_pl = pd.Series(df_daily['PremiumCaptured'].fillna(0).values, index=trade_days)
+    return fill_calendar_days(daily_pl, start_date, end_date)
+
+def fill_calendar_days(daily_pl, start_date, end_date):
+    """
+    Reindex a per-day premium-captured Series (indexed by date or Timestamp) to
+    every calendar day from start_date through end_date, with 0 for days that
+    had no trades.
+    """
+    calendar_days = pd.date_range(_as_date(start_date), _as_date(end_date), freq='D').date
+    daily_pl = pd.Series(daily_pl.values, index=pd.to_datetime(daily_pl.index).date, dtype='float64')
+    return daily_pl.reindex(calendar_days, fill_value=0.0).rename('PremiumCaptured')
+
+def build_cumulative_pl(daily_pl):
+    """
+    Turn a daily premium-captured Series into the running total that
+    premium_captured_between answers window queries from.
     """
-    posix_time = (dt - datetime(1970, 1, 1)).total_seconds()
-    return int(posix_time * 10000000 + 116444736000000000)
+    return daily_pl.sort_index().cumsum()
 
-def calculate_premium_captured_over_range(start_date, end_date, connection):
+def premium_captured_between(cumulative_pl, start_date, end_date):
+    """
+    Premium captured from start_date through end_date (inclusive), read off a
+    cumulative series in constant time.
+
+    The window must lie inside the range the cumulative series was built for.
+    """
+    start_day, end_day = _as_date(start_date), _as_date(end_date)
+    if end_day < start_day:
+        return 0
+
+    first_day, last_day = cumulative_pl.index[0], cumulative_pl.index[-1]
+    if start_day < first_day or end_day > last_day:
+        raise ValueError(
+            f"Window {start_day} to {end_day} is outside the loaded range {first_day} to {last_day}."
+        )
+
+    total_to_end = cumulative_pl.loc[end_day]
+    day_before_start = start_day - timedelta(days=1)
+    total_before_start = cumulative_pl.loc[day_before_start] if day_before_start >= first_day else 0
+    return total_to_end - total_before_start
+
+def get_report_range_start(date):
+    """
+    First day a report for `date` needs data from: the earlier of the week
+    start and the month start.
+    """
+    return min(get_most_recent_monday(date), date.replace(day=1))
+
+def calculate_wtd_mtd_pl(connection, date):
+    """
+    Week-to-date and month-to-date premium captured for `date`, answered from
+    one query over the longer of the two windows.
+
+    :return: Tuple of (weekly_pl, monthly_pl).
+    """
+    daily_pl = get_daily_premium_captured(connection, get_report_range_start(date), date)
+    return wtd_mtd_from_daily_pl(daily_pl, date)
+
+def wtd_mtd_from_daily_pl(daily_pl, date):
+    """
+    Week-to-date and month-to-date premium captured for `date` from per-day
+    figures already in memory, e.g. the premium_captured column of
+    utils.calculate_daily_metrics.
+
+    :return: Tuple of (weekly_pl, monthly_pl).
+    """
+    cumulative_pl = build_cumulative_pl(fill_calendar_days(daily_pl, get_report_range_start(date), date))
+    weekly_pl = premium_captured_between(cumulative_pl, get_most_recent_monday(date), date)
+    monthly_pl = premium_captured_between(cumulative_pl, date.replace(day=1), date)
+    return weekly_pl, monthly_pl
+
+@profiled
+def calculate_premium_captured_over_range(start_date, end_date, connection, store=None):
     """
     Calculate the total premium captured over a date range.
     
     :param start_date: Start date as a datetime object.
     :param end_date: End date as a datetime object.
     :param connection: An active database connection.
+    :param store: Optional refreshed MetricsStore answering the finished days.
     :return: Total premium captured over the date range.
     """
-    current_date = start_date
+    finished, live = split_finished_range(start_date, end_date, store)
     total_premium_captured = 0
-
-    while current_date <= end_date:
-        df_trades_ordered = get_trades(connection, current_date.year, current_date.month, current_date.day)
-        # calculate_metrics returns multiple values; we only need premium_captured here.
-        _, premium_captured, _, _, _, _, _, _, _ = calculate_metrics(df_trades_ordered)
-        total_premium_captured += premium_captured
-        current_date += timedelta(days=1)
-    
+    if finished:
+        total_premium_captured += store.get_daily_metrics(*finished)['premium_captured'].sum()
+    if live:
+        total_premium_captured += get_daily_premium_captured(connection, *live).sum()
     return total_premium_captured
 
-def calculate_total_PL(start_date_str, end_date_str=None):
+def _as_date(value):
+    return value.date() if isinstance(value, datetime) else value
+
+@profiled
+def get_daily_log(connection, start_date, end_date):
+    """
+    Return every DailyLog row (DailyLogID, LogDate, PL, SPX) from start_date
+    through end_date, with LogDate decoded, in time order.
+    """
+    # Whole days: from the start of start_date through the end of end_date,
+    # whatever time of day the dates carry.
+    start_filetime = filetime_day_bounds(start_date)[0]
+    end_filetime = filetime_day_bounds(end_date)[1]
+
+    query = """
+    SELECT DailyLogID, LogDate, PL, SPX FROM DailyLog
+    WHERE LogDate BETWEEN ? AND ?
+    ORDER BY LogDate;
+    """
+    df_daily_log = read_sql_with_retry(query, connection, params=(start_filetime, end_filetime))
+    df_daily_log['LogDate'] = filetime_series_to_datetime(df_daily_log['LogDate'])
+    return df_daily_log
+
+@profiled
+def get_last_of_day_pl(connection, start_date, end_date):
+    """
+    Return the last DailyLog row of each day from start_date through end_date.
+    The selection is done by SQLite, so only one row per day is read.
+
+    :return: DataFrame with LogDay (the day, as Timestamp), LogDate (decoded),
+             PL and SPX, in the shape of MetricsStore.get_last_of_day_logs.
+    """
+    start_filetime = filetime_day_bounds(start_date)[0]
+    end_filetime = filetime_day_bounds(end_date)[1]
+
+    # SQLite returns the bare PL/SPX columns from the row holding MAX(LogDate)
+    query = """
+    SELECT LogDate / ? AS DayNumber, MAX(LogDate) AS LogDate, PL, SPX
+    FROM DailyLog
+    WHERE LogDate BETWEEN ? AND ?
+    GROUP BY DayNumber
+    ORDER BY DayNumber;
+    """
+    df_last_of_day = read_sql_with_retry(
+        query, connection, params=(FILETIME_TICKS_PER_DAY, start_filetime, end_filetime)
+    )
+    df_last_of_day['LogDay'] = filetime_series_to_day(df_last_of_day['DayNumber'] * FILETIME_TICKS_PER_DAY)
+    df_last_of_day['LogDate'] = filetime_series_to_datetime(df_last_of_day['LogDate'])
+    return df_last_of_day[['LogDay', 'LogDate', 'PL', 'SPX']]
+
+def last_of_day_from_chunks(log_chunks):
+    """
+    Fold DailyLog chunks (see db_handler.iter_daily_log) into the last row of
+    each day, keeping only one row per day between chunks, so memory depends
+    on the number of days rather than on the number of log rows.
+
+    :return: DataFrame like get_last_of_day_pl.
+    """
+    df_last_of_day = None
+    for df_daily_log in log_chunks:
+        candidates = pd.concat([df_last_of_day, df_daily_log[['LogDay', 'LogDate', 'PL', 'SPX']]],
+                               ignore_index=True)
+        # Rows are in DailyLogID order; keep the latest LogDate of each day
+        latest = candidates.sort_values('LogDate', kind='stable').groupby('LogDay').tail(1)
+        df_last_of_day = latest.sort_values('LogDay', ignore_index=True)
+    if df_last_of_day is None:
+        return pd.DataFrame({'LogDay': pd.Series(dtype='datetime64[ns]'), 'LogDate': pd.Series(dtype='datetime64[ns]'),
+                             'PL': pd.Series(dtype='float64'), 'SPX': pd.Series(dtype='float64')})
+    return df_last_of_day
+
+@profiled
+def stream_last_of_day_pl(connection, start_date, end_date, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """
+    get_last_of_day_pl computed in Python from the DailyLog read in chunks of
+    `chunk_rows`, for histories whose log is scanned row by row anyway.
+    """
+    return last_of_day_from_chunks(iter_daily_log(connection, start_date, end_date, chunk_rows))
+
+def load_last_of_day_pl(connection, start_date, end_date, store=None):
+    """
+    Last-of-day DailyLog rows from start_date through end_date: finished days
+    from `store` (a refreshed MetricsStore) when given, the rest from the
+    live database.
+
+    :return: DataFrame with LogDay, LogDate, PL and SPX (see get_last_of_day_pl).
+    """
+    finished, live = split_finished_range(start_date, end_date, store)
+    parts = []
+    if finished:
+        df_stored = store.get_last_of_day_logs(*finished)
+        df_stored['LogDate'] = filetime_series_to_datetime(df_stored['LogDate'])
+        parts.append(df_stored)
+    if live:
+        live_start = datetime.combine(live[0], datetime.min.time())
+        live_end = datetime.combine(live[1], datetime.min.time())
+        parts.append(get_last_of_day_pl(connection, live_start, live_end))
+    if not parts:
+        return get_last_of_day_pl(connection, start_date, end_date)
+    return pd.concat(parts, ignore_index=True) if len(parts) > 1 else parts[0]
+
+def build_equity_curve(df_last_of_day):
+    """
+    Turn last-of-day rows (see load_last_of_day_pl) into a daily equity curve.
+
+    :return: DataFrame indexed by day with the day's PL, the cumulative Equity,
+             its running Peak and the Drawdown from that peak (0 or negative).
+    """
+    daily_pl = df_last_of_day.set_index('LogDay')['PL'].fillna(0.0).astype('float64')
+    equity = daily_pl.cumsum()
+    # The curve starts at 0 before the first day, so a losing first day is a drawdown
+    peak = equity.cummax().clip(lower=0.0)
+    return pd.DataFrame({
+        'PL': daily_pl,
+        'Equity': equity,
+        'Peak': peak,
+        'Drawdown': equity - peak,
+    }).rename_axis('Day')
+
+def get_equity_curve(connection, start_date, end_date, store=None):
+    """
+    Daily equity curve and drawdown from the last-of-day PL of each day from
+    start_date through end_date (see build_equity_curve).
+    """
+    return build_equity_curve(load_last_of_day_pl(connection, start_date, end_date, store))
+
+def max_drawdown(equity_curve):
+    """
+    Largest drop of an equity curve from a previous peak.
+
+    :return: Tuple of (drawdown, peak_day, trough_day); drawdown is 0 or
+             negative, and both days are None when there was no drawdown.
+    """
+    if equity_curve.empty or equity_curve['Drawdown'].min() >= 0:
+        return 0.0, None, None
+    trough_day = equity_curve['Drawdown'].idxmin()
+    before_trough = equity_curve.loc[:trough_day]
+    at_peak = before_trough[before_trough['Equity'] == before_trough['Peak'].iloc[-1]]
+    peak_day = at_peak.index[-1] if not at_peak.empty else None
+    return equity_curve.at[trough_day, 'Drawdown'], peak_day, trough_day
+
+@profiled
+def calculate_total_PL(start_date_str, end_date_str=None, store=None, db_path=None, debug=False):
     """
     Calculate the total PL sum from the last trade of each day between start_date_str and end_date_str.
     If end_date_str is omitted, defaults to the current month of the start_date.
     
-    This function now only queries data for the specified date range using filetime boundaries,
-    which can improve performance when the database contains large amounts of data.
+    Only the last DailyLog row of each day is read from the database.
+    Finished days are read from `store` (a refreshed MetricsStore) when one is given.
     
     :param start_date_str: Start date in "YYYYMMDD" format.
     :param end_date_str: Optional end date in "YYYYMMDD" format.
+    :param store: Optional MetricsStore.
+    :param db_path: Optional database path overriding config.yaml.
+    :param debug: Print the last-of-day rows being summed.
     :return: Total PL sum or None if an error occurs.
     """
     if not start_date_str:
         raise ValueError("A start date must be provided in the format YYYYMMDD.")
 
     try:
-        with connect_db() as connection:
+        with connect_db(db_path=db_path) as connection:
             try:
                 start_date = datetime.strptime(start_date_str, "%Y%m%d")
             except ValueError:
@@ -68,28 +303,15 @@ def calculate_total_PL(start_date_str, end_date_str=None):
                 # If end_date is not provided, limit to the current month of the start_date.
                 end_date = start_date.replace(day=calendar.monthrange(start_date.year, start_date.month)[1])
 
-            # Compute the filetime boundaries for the given date range.
-            start_filetime = to_filetime(start_date)
-            # To get the end of the day for end_date, add one day and subtract 1.
-            end_filetime = to_filetime(end_date + timedelta(days=1)) - 1
-
-            # Query only rows with LogDate within the filetime boundaries.
-            query = "SELECT DailyLogID, LogDate, PL, SPX FROM DailyLog WHERE LogDate BETWEEN ? AND ?;"
-            df_daily_log = pd.read_sql_query(query, connection, params=(start_filetime, end_filetime))
-
-            # Convert LogDate from filetime to a human-readable date.
-            df_daily_log['LogDate'] = df_daily_log['LogDate'].apply(convert_to_human_readable)
+            print(f"Calculating total PL from {start_date} to {end_date}")
+            df_last_of_day = load_last_of_day_pl(connection, start_date, end_date, store)
 
-            if df_daily_log.empty:
+            if df_last_of_day.empty:
                 print("No data found for the specified date range.")
                 return 0
 
-            # Group by date (using the human-readable LogDate) and pick the last entry of each day.
-            df_last_of_day = df_daily_log.groupby(df_daily_log['LogDate'].dt.date).tail(1)
-
-            print(f"Calculating total PL from {start_date} to {end_date}")
-            print(f"Filtered DataFrame:\n{df_daily_log[['LogDate', 'PL']]}")
-            print(f"PL values being summed:\n{df_last_of_day[['LogDate', 'PL']]}")
+            if debug:
+                print(f"PL values being summed:\n{df_last_of_day[['LogDay', 'LogDate', 'PL']]}")
 
             total_pl_sum = df_last_of_day['PL'].sum()
             print(f"Total PL sum: {total_pl_sum}")
@@ -1,61 +1,413 @@
 import argparse
-from datetime import datetime
-from db_handler import get_trades, connect_db
-from discord_messenger import send_message_to_discord, delete_messages
+import time
+from datetime import datetime, timedelta
+from discord_messenger import (
+    DEFAULT_POST_RETRIES, DEFAULT_POST_RETRY_DELAY, POST_DELIVERED, send_message_to_discord, send_message_with_retries,
+    delete_messages, edit_messages, load_posted_messages, record_posted_messages, forget_posted_messages
+)
 from utils import (
-    input_with_timeout, get_specified_date, calculate_metrics,
-    format_message, get_most_recent_monday, get_last_spx_value
+    DEFAULT_WATCH_INTERVAL, load_yaml_config, input_with_timeout, get_specified_date,
+    get_day_metrics, format_message, get_most_recent_monday, get_last_spx_value, get_last_spx_values
 )
-from PL_Summary import calculate_premium_captured_over_range  
-
-parser = argparse.ArgumentParser(description='Process trades and send updates.')
-parser.add_argument('--noimage', action='store_true', help='Disable image capture and sending to webhook.')
-parser.add_argument('--date', type=str, nargs='?', const=None,
-                    help='Specify a date in the format YYYYMMDD (e.g., 20240920). If omitted, current date is used.')
-parser.add_argument('--debug', action='store_true', help='Print message to console and save image to file.')
-parser.add_argument('--win', type=str, choices=['max', 'restore'],
-                    help='Adjust window size before screenshot: "max" to maximize, "restore" to restore.')
-args = parser.parse_args()
-
-specified_date = get_specified_date(args.date)
-year, month, day = specified_date.year, specified_date.month, specified_date.day
-
-# Use the context manager for DB connection
-with connect_db() as connection:
-    # Calculate Weekly PL
-    most_recent_monday = get_most_recent_monday(specified_date)
-    weekly_pl = calculate_premium_captured_over_range(most_recent_monday, specified_date, connection)
-
-    # Calculate Monthly PL
-    first_day_of_month = specified_date.replace(day=1)
-    monthly_pl = calculate_premium_captured_over_range(first_day_of_month, specified_date, connection)
-
-    # Fetch trades and compute daily metrics
-    df_trades_ordered = get_trades(connection, year, month, day)
+from screenshot import get_screenshot_options
+from profiler import profiled, profiling, stage
+
+# The database, metrics and rendering modules pull in pandas (and Pillow); they
+# are imported inside the functions that need them so --help, argument errors
+# and the posting code start without loading them.
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Process trades and send updates.')
+    parser.add_argument('--noimage', action='store_true', help='Disable image capture and sending to webhook.')
+    parser.add_argument('--date', type=str, nargs='?', const=None,
+                        help='Specify a date in the format YYYYMMDD (e.g., 20240920). If omitted, current date is used.')
+    parser.add_argument('--debug', action='store_true', help='Print message to console and save image to file.')
+    parser.add_argument('--win', type=str, choices=['max', 'restore'],
+                        help='Adjust window size before screenshot: "max" to maximize, "restore" to restore.')
+    parser.add_argument('--render', action='store_true',
+                        help='Attach an image of the day\'s trades and PL/SPX curve rendered from the database '
+                             'instead of a screenshot of the TAT window.')
+    parser.add_argument('--edit', action='store_true',
+                        help='Edit the messages already posted for the date in place instead of posting new ones.')
+    parser.add_argument('--watch', type=float, nargs='?', const=DEFAULT_WATCH_INTERVAL, metavar='SECONDS',
+                        help='Stay running and keep today\'s posted report up to date, checking the database '
+                             f'for changes every SECONDS (default {DEFAULT_WATCH_INTERVAL}).')
+    parser.add_argument('--profile', type=str, metavar='FILE',
+                        help='Write a JSON trace of the time, rows read and peak memory of every stage to FILE.')
+    parser.add_argument('--cprofile', type=str, metavar='FILE',
+                        help='Also write cProfile statistics of the run to FILE (view with pstats or snakeviz).')
+    parser.add_argument('--from', dest='from_date', type=str,
+                        help='Backfill: first date (YYYYMMDD) of a range of reports generated in one run.')
+    parser.add_argument('--to', dest='to_date', type=str,
+                        help='Backfill: last date (YYYYMMDD) of the range. Defaults to the current date.')
+    parser.add_argument('--dry-run', type=str, metavar='FILE',
+                        help='Backfill: write the formatted messages to FILE instead of posting them.')
+    parser.add_argument('--no-prompt', action='store_true',
+                        help='Exit once the report is posted instead of asking whether to delete it.')
+    parser.add_argument('--schedule', type=str, nargs='?', const='', metavar='HH:MM',
+                        help='Unattended: on a trading day, wait until HH:MM (default: schedule_time from '
+                             'config.yaml, else 16:15), post today\'s report with retries and exit once every '
+                             'webhook acknowledged it. Never prompts.')
+    parser.add_argument('--delete', action='store_true',
+                        help='Delete the messages recorded in the ledger for --date (default today) or for '
+                             '--from/--to, then exit.')
+    args = parser.parse_args(argv)
+
+    if args.from_date and args.date:
+        parser.error('--date cannot be combined with --from/--to.')
+    if (args.to_date or args.dry_run) and not args.from_date:
+        parser.error('--to and --dry-run require --from.')
+    if args.render and (args.noimage or args.win):
+        parser.error('--render cannot be combined with --noimage or --win.')
+    if args.watch is not None and (args.date or args.from_date):
+        parser.error('--watch always follows the current date and cannot be combined with --date or --from.')
+    if args.schedule is not None and (args.date or args.from_date or args.watch is not None or args.edit):
+        parser.error('--schedule posts the current date and cannot be combined with --date, --from, --watch '
+                     'or --edit.')
+    if args.delete and (args.watch is not None or args.schedule is not None or args.edit or args.dry_run):
+        parser.error('--delete cannot be combined with --watch, --schedule, --edit or --dry-run.')
+    return args
+
+@profiled
+def build_daily_report(connection, specified_date, store=None):
+    """
+    Compute the metrics of `specified_date` and return the formatted message.
+    """
+    from metrics_store import load_daily_metrics
+    from PL_Summary import get_report_range_start, wtd_mtd_from_daily_pl
+
+    year, month, day = specified_date.year, specified_date.month, specified_date.day
+
+    # Per-day metrics of the whole week/month range in one pass
+    daily_metrics = load_daily_metrics(
+        connection, get_report_range_start(specified_date), specified_date, store
+    )
+
+    # Daily metrics for the specified date
     (
         premium_sold, premium_captured, pcr,
         win_rate, expired_trades, stops,
         bad_slip, bad_slip_max, negative_exp
-    ) = calculate_metrics(df_trades_ordered)
+    ) = get_day_metrics(daily_metrics, specified_date)
 
-    spx_last = get_last_spx_value(connection, year, month, day)
+    # Weekly and Monthly PL from the same per-day figures
+    weekly_pl, monthly_pl = wtd_mtd_from_daily_pl(daily_metrics['premium_captured'], specified_date)
 
-# Format the final message
-formatted_message = format_message(
-    specified_date, premium_sold, premium_captured, pcr, win_rate,
-    expired_trades, stops, bad_slip, bad_slip_max, spx_last,
-    negative_exp, weekly_pl, monthly_pl
-)
+    spx_last = get_last_spx_value(connection, year, month, day, store)
 
-# Send Discord message
-message_ids = send_message_to_discord(
-    formatted_message,
-    args.noimage,
-    args.win,
-    args.debug
-)
+    return format_message(
+        specified_date, premium_sold, premium_captured, pcr, win_rate,
+        expired_trades, stops, bad_slip, bad_slip_max, spx_last,
+        negative_exp, weekly_pl, monthly_pl
+    )
+
+@profiled
+def build_backfill_reports(connection, start_date, end_date, store=None):
+    """
+    Format the report of every day from start_date through end_date that has
+    trades or an SPX value, from one bulk load of per-day metrics and one SPX
+    query.
+
+    :return: List of (date, formatted_message) tuples in date order.
+    """
+    from metrics_store import load_daily_metrics
+    from PL_Summary import (
+        get_report_range_start, fill_calendar_days, build_cumulative_pl, premium_captured_between
+    )
+
+    range_start = get_report_range_start(start_date)
+    daily_metrics = load_daily_metrics(connection, range_start, end_date, store)
+    cumulative_pl = build_cumulative_pl(
+        fill_calendar_days(daily_metrics['premium_captured'], range_start, end_date)
+    )
+
+    dates = [start_date + timedelta(days=i) for i in range((end_date - start_date).days + 1)]
+    spx_values = get_last_spx_values(connection, dates)
+
+    reports = []
+    for date in dates:
+        spx_last = spx_values[date.date()]
+        if spx_last is None and date not in daily_metrics.index:
+            continue  # Weekend or holiday: nothing to report
+
+        (
+            premium_sold, premium_captured, pcr,
+            win_rate, expired_trades, stops,
+            bad_slip, bad_slip_max, negative_exp
+        ) = get_day_metrics(daily_metrics, date)
+        weekly_pl = premium_captured_between(cumulative_pl, get_most_recent_monday(date), date)
+        monthly_pl = premium_captured_between(cumulative_pl, date.replace(day=1), date)
+
+        reports.append((date, format_message(
+            date, premium_sold, premium_captured, pcr, win_rate,
+            expired_trades, stops, bad_slip, bad_slip_max, spx_last,
+            negative_exp, weekly_pl, monthly_pl
+        )))
+    return reports
+
+def report_key(date):
+    return date.strftime("%Y%m%d")
+
+@profiled
+def render_image(connection, date, args):
+    """
+    With --render, the report image of `date` as (filename, bytes); otherwise None.
+    """
+    if not args.render:
+        return None
+    from report_image import build_report_image
+    return build_report_image(connection, date, get_screenshot_options(load_yaml_config()))
+
+@profiled
+def publish_report(date, message, noimage, args, image=None):
+    """
+    Post a report and record the posted messages in the ledger. With --edit,
+    messages already posted for the date are edited in place instead.
+    `image` is attached instead of a screenshot when given.
+
+    :return: The report's posted-message records.
+    """
+    key = report_key(date)
+    if args.edit:
+        posted_messages = load_posted_messages(key)
+        if posted_messages:
+            results = edit_messages(posted_messages, message)
+            print(f"Edited {sum(results)} of {len(results)} message(s) posted for {date:%Y-%m-%d}.")
+            return posted_messages
+        print(f"No posted messages recorded for {date:%Y-%m-%d}; posting a new report.")
+
+    posted_messages = send_message_to_discord(message, noimage, args.win, args.debug, image=image)
+    record_posted_messages(key, posted_messages)
+    return [posted for posted in posted_messages if posted.get("id")]
+
+def run_backfill(args):
+    from db_handler import connect_db, read_transaction
+    from metrics_store import open_metrics_store
+
+    start_date = get_specified_date(args.from_date)
+    end_date = get_specified_date(args.to_date) if args.to_date else get_specified_date()
+    end_date = datetime(end_date.year, end_date.month, end_date.day)
+    if end_date < start_date:
+        raise SystemExit("--to must not be earlier than --from.")
+
+    with connect_db() as connection, open_metrics_store() as store, read_transaction(connection):
+        if store is not None:
+            store.refresh(connection)
+        reports = build_backfill_reports(connection, start_date, end_date, store)
+        if args.render and not args.dry_run:
+            images = {report_key(date): render_image(connection, date, args) for date, _ in reports}
+
+    print(f"Generated {len(reports)} report(s) from {start_date:%Y-%m-%d} to {end_date:%Y-%m-%d}.")
+
+    if args.dry_run:
+        with open(args.dry_run, 'w', encoding='utf-8') as f:
+            for _, message in reports:
+                f.write(message)
+                f.write("\n")
+        print(f"Messages written to {args.dry_run}.")
+        return
+
+    # Post the queued messages; screenshots only reflect the current state, so only
+    # rendered images (--render) are attached
+    posted_by_report = {}
+    for date, message in reports:
+        image = images[report_key(date)] if args.render else None
+        posted_by_report[report_key(date)] = publish_report(date, message, True, args, image)
+
+    if args.no_prompt:
+        return
+    user_input = input_with_timeout("Do you want to delete the postings? (Y/N): ", 30)
+    if user_input and user_input.strip().lower() in ['yes', 'y']:
+        for key, posted_messages in posted_by_report.items():
+            delete_messages(posted_messages)
+            forget_posted_messages(key, posted_messages)
+
+def run_watch(args):
+    from db_handler import connect_db
+    from metrics_store import open_metrics_store
+    from watcher import watch
+
+    def publish(date, message):
+        posted_messages = load_posted_messages(report_key(date))
+        if posted_messages:
+            results = edit_messages(posted_messages, message)
+            print(f"{datetime.now():%H:%M:%S} Updated {sum(results)} of {len(results)} posted message(s).")
+        else:
+            image = render_image(connection, date, args)
+            posted_messages = send_message_to_discord(message, args.noimage, args.win, args.debug, image=image)
+            record_posted_messages(report_key(date), posted_messages)
+            print(f"{datetime.now():%H:%M:%S} Posted today's report.")
+
+    # The replica is only synced when a connection is opened; watch TAT's own file
+    # so its data_version changes with every commit
+    with connect_db(use_replica=False) as connection, open_metrics_store() as store:
+        print(f"Watching for changes every {args.watch:g}s. Press Ctrl+C to stop.")
+        try:
+            watch(connection, publish, args.watch, store)
+        except KeyboardInterrupt:
+            print("Watch stopped.")
+
+def build_report(args, databases, specified_date):
+    """
+    The formatted report of `specified_date`, one column per account when
+    several databases are configured.
+
+    :return: Tuple of (message, image); image is the --render image or None.
+    """
+    with stage('Trade_Scout.imports'):
+        from db_handler import connect_db, read_transaction
+        from metrics_store import open_metrics_store
+
+    if len(databases) > 1:
+        # Several accounts: one report with a column per account and the combined figures
+        from accounts import build_accounts_report
+        if args.render:
+            print("--render draws a single database; no image is attached to the multi-account report.")
+        return build_accounts_report(databases, specified_date), None
+
+    # Use the context manager for DB connection; all reads share one snapshot
+    with connect_db() as connection, open_metrics_store() as store, read_transaction(connection):
+        # Bring the local metrics store (if enabled) up to date; finished days are read from it
+        if store is not None:
+            store.refresh(connection)
+
+        formatted_message = build_daily_report(connection, specified_date, store)
+        image = render_image(connection, specified_date, args)
+    return formatted_message, image
+
+def run_single(args, databases):
+    specified_date = get_specified_date(args.date)
+    formatted_message, image = build_report(args, databases, specified_date)
+
+    # Send (or edit) the Discord message(s)
+    posted_messages = publish_report(specified_date, formatted_message, args.noimage, args, image)
+    if args.no_prompt:
+        return
+
+    # Optional: prompt to delete the posted message(s)
+    with stage('Trade_Scout.prompt'):
+        user_input = input_with_timeout("Do you want to delete the posting? (Y/N): ", 30)
+    if user_input and user_input.strip().lower() in ['yes', 'y']:
+        delete_messages(posted_messages)
+        forget_posted_messages(report_key(specified_date), posted_messages)
+
+def _webhook_key(webhook):
+    return webhook["url"], webhook.get("thread_id")
+
+def run_scheduled(args, databases, now=datetime.now, sleep=time.sleep):
+    """
+    Unattended run: nothing on weekends and `market_holidays`; otherwise wait
+    until the post time, post today's report with retries and exit.
+
+    Every attempt's posts are recorded in the ledger as soon as it completes,
+    so a run repeated on the same day (e.g. by the OS scheduler after a
+    failure or a crash) edits the messages already posted and only posts to
+    the webhooks that have none. Exits with an error if a post failed.
+    """
+    from scheduler import get_market_holidays, get_post_time, is_trading_day, wait_until
+
+    config = load_yaml_config()
+    try:
+        post_time = get_post_time(config, args.schedule)
+    except ValueError as e:
+        raise SystemExit(str(e))
+    today = now()
+    if not is_trading_day(today, get_market_holidays(config)):
+        print(f"{today:%Y-%m-%d} is not a trading day; nothing to post.")
+        return
+    if config.get('replica') and len(databases) == 1:
+        # Compare the replica's checksums now, before waiting, so the sync at
+        # the post time only copies the rows TAT added in the meantime
+        from db_handler import get_db_settings
+        from replica import get_replica_path, sync_replica
+        db_path, _, busy_timeout_ms = get_db_settings(config)
+        sync_replica(db_path, get_replica_path(config), busy_timeout_ms, check_interval=0)
+    wait_until(datetime.combine(today.date(), post_time), now=now, sleep=sleep)
+
+    specified_date = now()
+    formatted_message, image = build_report(args, databases, specified_date)
+    key = report_key(specified_date)
+
+    posted_before = load_posted_messages(key)
+    if posted_before:
+        results = edit_messages(posted_before, formatted_message)
+        print(f"Edited {sum(results)} of {len(results)} message(s) already posted for {specified_date:%Y-%m-%d}.")
+    posted_webhooks = {_webhook_key(posted) for posted in posted_before if isinstance(posted, dict)}
+    webhooks = [webhook for webhook in config['webhooks'] if _webhook_key(webhook) not in posted_webhooks]
+    if not webhooks:
+        return
+
+    posted_messages, outcomes = send_message_with_retries(
+        formatted_message, args.noimage, args.win, args.debug,
+        config.get('post_retries', DEFAULT_POST_RETRIES), config.get('post_retry_delay', DEFAULT_POST_RETRY_DELAY),
+        webhooks=webhooks, image=image, on_posted=lambda posted: record_posted_messages(key, posted), sleep=sleep
+    )
+    for posted, outcome in zip(posted_messages, outcomes):
+        if outcome == POST_DELIVERED and not posted.get("id"):
+            print(f"Posted to {posted['url']}, but Discord returned no message id; it is not in the ledger "
+                  "and cannot be edited or deleted by TradeScout.")
+    failed = [posted["url"] for posted, outcome in zip(posted_messages, outcomes) if outcome != POST_DELIVERED]
+    if failed:
+        raise SystemExit(f"{len(failed)} of {len(posted_messages)} post(s) failed; "
+                         "run again to post to the remaining webhooks.")
+    print(f"Posted the report for {specified_date:%Y-%m-%d} to {len(posted_messages)} webhook(s).")
+
+def run_delete(args):
+    """
+    Delete the messages the ledger holds for --date or the --from/--to range.
+    Messages whose deletion fails stay in the ledger for another attempt.
+    """
+    if args.from_date:
+        start_date = get_specified_date(args.from_date)
+        end_date = get_specified_date(args.to_date) if args.to_date else get_specified_date()
+        dates = [start_date + timedelta(days=i) for i in range((end_date - start_date).days + 1)]
+    else:
+        dates = [get_specified_date(args.date)]
+
+    recorded = False
+    for date in dates:
+        key = report_key(date)
+        posted_messages = load_posted_messages(key)
+        if not posted_messages:
+            continue
+        recorded = True
+        # Ledger records all carry an id, so the results line up with them
+        results = delete_messages(posted_messages)
+        deleted = [posted for posted, ok in zip(posted_messages, results) if ok]
+        forget_posted_messages(key, deleted)
+        print(f"Deleted {len(deleted)} of {len(posted_messages)} message(s) posted for {date:%Y-%m-%d}.")
+    if not recorded:
+        print("No posted messages recorded for the given date(s).")
+
+def run(args):
+    if args.delete:
+        # Only the ledger and the webhooks are needed
+        run_delete(args)
+        return
+
+    from db_handler import get_databases
+
+    config = load_yaml_config()
+    databases = get_databases(config)
+    if len(databases) > 1 and (args.watch is not None or args.from_date) and not config.get('db_path'):
+        raise SystemExit("--watch and --from read a single database; set db_path in config.yaml to the account to use.")
+
+    if args.schedule is not None:
+        run_scheduled(args, databases)
+    elif args.watch is not None:
+        run_watch(args)
+    elif args.from_date:
+        run_backfill(args)
+    else:
+        run_single(args, databases)
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.profile or args.cprofile:
+        with profiling(args.profile, args.cprofile):
+            run(args)
+    else:
+        run(args)
 
-# Optional: prompt to delete the posted message(s)
-user_input = input_with_timeout("Do you want to delete the posting? (Y/N): ", 30)
-if user_input and user_input.strip().lower() in ['yes', 'y']:
-    delete_messages(message_ids)
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from db_handler import connect_db, get_trades, read_transaction
+from profiler import profiled
+from utils import (
+    METRIC_INPUT_COLUMNS, calculate_metrics, format_accounts_message, format_report_rows,
+    get_day_metrics, get_last_spx_value
+)
+
+COMBINED_COLUMN_TITLE = 'Total'
+
+@profiled
+def build_account_report(database, date):
+    """
+    The report figures of one account for `date`, read over the account's own
+    connection from one snapshot.
+
+    :param database: Dict with 'name' and 'db_path' (see db_handler.get_databases).
+    :return: Dict with the account's name, its calculate_metrics tuple, weekly
+             and monthly PL, last SPX value and the day's trades (the metric
+             input columns), which the combined column is computed from.
+    """
+    from metrics_store import load_daily_metrics
+    from PL_Summary import get_report_range_start, wtd_mtd_from_daily_pl
+
+    with connect_db(db_path=database['db_path']) as connection, read_transaction(connection):
+        daily_metrics = load_daily_metrics(connection, get_report_range_start(date), date)
+        weekly_pl, monthly_pl = wtd_mtd_from_daily_pl(daily_metrics['premium_captured'], date)
+        return {
+            'name': database['name'],
+            'metrics': get_day_metrics(daily_metrics, date),
+            'weekly_pl': weekly_pl,
+            'monthly_pl': monthly_pl,
+            'spx_last': get_last_spx_value(connection, date.year, date.month, date.day),
+            'trades': get_trades(connection, date.year, date.month, date.day, columns=METRIC_INPUT_COLUMNS),
+        }
+
+def _build_account_report_or_error(database, date):
+    try:
+        return build_account_report(database, date)
+    except Exception as e:
+        print(f"Could not read account {database['name']}: {e}")
+        return {'name': database['name'], 'error': str(e)}
+
+def combine_account_reports(reports):
+    """
+    Combined figures of the accounts that were read: the day's metrics are
+    recomputed from all their trades together (so PCR and win rate are
+    weighted by premium and trades), WTD/MTD PL are summed.
+
+    :return: Tuple of (metrics tuple, weekly_pl, monthly_pl).
+    """
+    import pandas as pd
+
+    trades = pd.concat([report['trades'] for report in reports], ignore_index=True)
+    return (
+        calculate_metrics(trades),
+        sum(report['weekly_pl'] for report in reports),
+        sum(report['monthly_pl'] for report in reports),
+    )
+
+def _report_rows(metrics, weekly_pl, monthly_pl):
+    (
+        premium_sold, premium_captured, pcr,
+        win_rate, expired_trades, stops,
+        bad_slip, bad_slip_max, negative_exp
+    ) = metrics
+    return format_report_rows(
+        premium_sold, premium_captured, pcr, win_rate, expired_trades, stops,
+        bad_slip, bad_slip_max, negative_exp, weekly_pl, monthly_pl
+    )
+
+@profiled
+def build_accounts_report(databases, date):
+    """
+    Read every account's figures for `date` concurrently, one thread and
+    connection per database, so a slow or locked database only delays its
+    own column. An account that cannot be read is shown as n/a with a note.
+
+    :return: The formatted message with one column per account plus the
+             combined column.
+    """
+    with ThreadPoolExecutor(max_workers=len(databases)) as executor:
+        reports = list(executor.map(lambda database: _build_account_report_or_error(database, date), databases))
+
+    read = [report for report in reports if 'error' not in report]
+    columns = [
+        (report['name'], _report_rows(report['metrics'], report['weekly_pl'], report['monthly_pl'])
+         if 'error' not in report else None)
+        for report in reports
+    ]
+    columns.append((COMBINED_COLUMN_TITLE, _report_rows(*combine_account_reports(read)) if read else None))
+
+    # SPX is the same market data in every account; take the first one logged
+    spx_last = next((report['spx_last'] for report in read if report['spx_last'] is not None), None)
+    notes = [f"{report['name']}: not available" for report in reports if 'error' in report]
+    return format_accounts_message(date, spx_last, columns, notes)
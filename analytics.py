@@ -0,0 +1,179 @@
+"""
+Multi-year analytics: per-day metrics and last-of-day PL over long ranges,
+computed month by month in parallel worker processes, and a yearly summary.
+
+Usage:
+    python analytics.py --from 20210101 --to 20241231 [--workers 8] [--csv summary.csv]
+"""
+import argparse
+import calendar
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+
+from db_handler import ConnectionPool, get_db_settings, load_config, read_transaction
+from profiler import profiled
+
+# One pool per database in each process: the month tasks a worker runs share
+# its connection instead of opening and closing one per month
+_pools = {}
+
+def month_ranges(start_date, end_date):
+    """
+    Split start_date through end_date (inclusive) into calendar months.
+
+    :return: List of (first_day, last_day) datetimes, the first and last
+             clipped to the range.
+    """
+    start_day = datetime(start_date.year, start_date.month, start_date.day)
+    end_day = datetime(end_date.year, end_date.month, end_date.day)
+    ranges = []
+    month_start = start_day
+    while month_start <= end_day:
+        month_end = month_start.replace(day=calendar.monthrange(month_start.year, month_start.month)[1])
+        ranges.append((month_start, min(month_end, end_day)))
+        month_start = month_end + timedelta(days=1)
+    return ranges
+
+def _get_pool(db_path, busy_timeout_ms):
+    key = (db_path, busy_timeout_ms)
+    if key not in _pools:
+        _pools[key] = ConnectionPool(db_path, size=1, read_only=True, busy_timeout_ms=busy_timeout_ms)
+    return _pools[key]
+
+def _close_pools():
+    while _pools:
+        _pools.popitem()[1].close()
+
+def analyze_month(db_path, busy_timeout_ms, start_date, end_date, backend=None):
+    """
+    Worker: per-day metrics and last-of-day PL rows of one month, read over
+    the worker's own read-only connection from one snapshot. The connection
+    is kept open for the next month the worker runs.
+
+    :return: Tuple of (daily_metrics, df_last_of_day).
+    """
+    from metrics_store import compute_daily_metrics
+    from PL_Summary import get_last_of_day_pl
+
+    with _get_pool(db_path, busy_timeout_ms).connection() as connection, read_transaction(connection):
+        daily_metrics = compute_daily_metrics(connection, start_date, end_date, backend)
+        df_last_of_day = get_last_of_day_pl(connection, start_date, end_date)
+    return daily_metrics, df_last_of_day
+
+def _analyze_month_task(task):
+    return analyze_month(*task)
+
+@profiled
+def analyze_range(start_date, end_date, db_path=None, workers=None, backend=None):
+    """
+    Per-day metrics and last-of-day PL from start_date through end_date, one
+    month per task, spread over `workers` processes (all cores by default;
+    1 runs the months in this process).
+
+    The months are merged in date order, so the result does not depend on
+    the number of workers or on which one finishes first.
+
+    :param db_path: Database path overriding config.yaml. Without it the
+                    configured database (or its replica, when enabled) is read.
+    :param backend: Metrics backend (see utils.get_metrics_backend).
+    :return: Tuple of (daily_metrics, df_last_of_day), shaped like
+             utils.calculate_daily_metrics and PL_Summary.get_last_of_day_pl.
+    """
+    import pandas as pd
+    from utils import get_metrics_backend
+
+    config = load_config() if db_path is None else {}
+    config_db_path, _, busy_timeout_ms = get_db_settings(config)
+    if db_path is None and config.get('replica'):
+        from replica import get_replica_check_interval, get_replica_path, sync_replica
+        db_path = sync_replica(config_db_path, get_replica_path(config), busy_timeout_ms,
+                               get_replica_check_interval(config))
+    db_path = db_path or config_db_path
+    if not os.path.exists(db_path):
+        raise FileNotFoundError(f"Database file not found at {db_path}")
+
+    # Resolve the backend here so the workers need no config.yaml
+    backend = backend or get_metrics_backend(config)
+    tasks = [(db_path, busy_timeout_ms, first_day, last_day, backend)
+             for first_day, last_day in month_ranges(start_date, end_date)]
+    workers = min(workers or os.cpu_count() or 1, len(tasks)) or 1
+
+    try:
+        if workers == 1:
+            results = [_analyze_month_task(task) for task in tasks]
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                # map returns the results in task (month) order
+                results = list(executor.map(_analyze_month_task, tasks))
+
+        if not results:
+            return analyze_month(db_path, busy_timeout_ms, start_date, end_date, backend)
+    finally:
+        # The workers' connections close with their processes; these are this process's
+        _close_pools()
+    # Months without rows come back untyped; leave them out unless all are empty
+    metrics_parts = [metrics for metrics, _ in results if not metrics.empty] or [results[0][0]]
+    last_of_day_parts = [last_of_day for _, last_of_day in results if not last_of_day.empty] or [results[0][1]]
+    daily_metrics = pd.concat(metrics_parts)
+    df_last_of_day = pd.concat(last_of_day_parts, ignore_index=True)
+    return daily_metrics, df_last_of_day
+
+def summarize_by_year(daily_metrics, df_last_of_day):
+    """
+    Yearly summary of analyze_range's results.
+
+    :return: DataFrame indexed by year with the trading days, premium sold and
+             captured, PCR, the mean daily win rate, the expired/stop/bad-slip
+             counts, the summed last-of-day PL and its maximum drawdown
+             within the year.
+    """
+    import pandas as pd
+    from PL_Summary import build_equity_curve, max_drawdown
+
+    yearly = daily_metrics.groupby(daily_metrics.index.year).agg(
+        days=('premium_sold', 'size'),
+        premium_sold=('premium_sold', 'sum'),
+        premium_captured=('premium_captured', 'sum'),
+        avg_win_rate=('win_rate', 'mean'),
+        expired_trades=('expired_trades', 'sum'),
+        stops=('stops', 'sum'),
+        bad_slip=('bad_slip', 'sum'),
+        negative_exp=('negative_exp', 'sum'),
+    )
+    has_premium = yearly['premium_sold'] != 0
+    yearly.insert(3, 'pcr', (yearly['premium_captured'] / yearly['premium_sold'] * 100).where(has_premium, 0))
+
+    pl_by_year = {}
+    for year, df_year in df_last_of_day.groupby(df_last_of_day['LogDay'].dt.year):
+        pl_by_year[year] = (df_year['PL'].sum(), max_drawdown(build_equity_curve(df_year))[0])
+    pl = pd.DataFrame.from_dict(pl_by_year, orient='index', columns=['pl', 'max_drawdown'])
+
+    return yearly.join(pl, how='outer').rename_axis('Year')
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Summarize several years of TAT history in parallel.')
+    parser.add_argument('--from', dest='from_date', type=str, required=True, help='First date (YYYYMMDD).')
+    parser.add_argument('--to', dest='to_date', type=str,
+                        help='Last date (YYYYMMDD). Defaults to the current date.')
+    parser.add_argument('--workers', type=int, help='Worker processes (default: one per core).')
+    parser.add_argument('--csv', type=str, metavar='FILE', help='Also write the yearly summary to FILE.')
+    args = parser.parse_args(argv)
+
+    try:
+        start_date = datetime.strptime(args.from_date, "%Y%m%d")
+        end_date = datetime.strptime(args.to_date, "%Y%m%d") if args.to_date else datetime.now()
+    except ValueError:
+        parser.error("Dates must be in the format YYYYMMDD (e.g., 20240917).")
+
+    daily_metrics, df_last_of_day = analyze_range(start_date, end_date, workers=args.workers)
+    summary = summarize_by_year(daily_metrics, df_last_of_day)
+    print(summary.to_string(float_format=lambda value: f"{value:,.2f}"))
+    if args.csv:
+        summary.to_csv(args.csv)
+        print(f"Summary written to {os.path.abspath(args.csv)}.")
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()  # worker processes of the packaged executable
+    main()
@@ -0,0 +1,51 @@
+"""
+Benchmark of analytics.analyze_range: a multi-year synthetic TAT database
+summarized with an increasing number of worker processes.
+
+Usage:
+    python benchmarks/bench_analytics.py [--scale years] [--workers 1 2 4 8] [--keep DIR]
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+# Add the parent directory (where analytics.py exists) and the tests (fixtures) to sys.path
+REPO_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(REPO_DIR)
+sys.path.append(os.path.join(REPO_DIR, 'tests'))
+
+from analytics import analyze_range, summarize_by_year
+from bench_suite import SCALES, get_database
+from tat_fixtures import GENERATED_START_DATE, trading_days
+
+def main():
+    parser = argparse.ArgumentParser(description='Time the parallel analytics driver per worker count.')
+    parser.add_argument('--scale', choices=list(SCALES), default='years', help='Database size (default: years).')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, os.cpu_count() or 1],
+                        help='Worker counts to time.')
+    parser.add_argument('--keep', type=str, metavar='DIR',
+                        help='Generate the database into DIR and reuse it on later runs.')
+    args = parser.parse_args()
+
+    days = trading_days(GENERATED_START_DATE, SCALES[args.scale][0])
+    with contextlib.ExitStack() as stack:
+        directory = args.keep or stack.enter_context(tempfile.TemporaryDirectory())
+        os.makedirs(directory, exist_ok=True)
+        path = get_database(args.scale, directory)
+
+        print(f"{args.scale}: {days[0]:%Y-%m-%d} to {days[-1]:%Y-%m-%d} on {os.cpu_count()} cores")
+        baseline = None
+        for workers in sorted(set(args.workers)):
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                summarize_by_year(*analyze_range(days[0], days[-1], db_path=path, workers=workers))
+            seconds = time.perf_counter() - start
+            baseline = baseline or seconds
+            print(f"  {workers:>3} workers {seconds:8.2f} s   speedup {baseline / seconds:5.2f}x")
+
+if __name__ == "__main__":
+    main()
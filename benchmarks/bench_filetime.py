@@ -0,0 +1,53 @@
+"""
+Benchmark: per-row convert_to_human_readable vs. vectorized FILETIME decoding.
+
+Usage:
+    python benchmarks/bench_filetime.py [--rows 1000000]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+# Add the parent directory (where utils.py exists) to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils import convert_to_human_readable, filetime_series_to_datetime
+
+def make_filetime_column(rows):
+    """
+    One FILETIME per minute starting 2025-01-02, like the DailyLog table.
+    (A million minutes stays clear of any Feb 29, which cannot take a forced
+    non-leap year.)
+    """
+    start = 133802496000000000
+    return pd.Series(start + np.arange(rows, dtype='int64') * 600000000)
+
+def time_call(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - start, result
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark FILETIME column decoding.')
+    parser.add_argument('--rows', type=int, default=1000000, help='Number of rows in the column.')
+    args = parser.parse_args()
+
+    column = make_filetime_column(args.rows)
+
+    per_row_seconds, per_row = time_call(lambda c: pd.to_datetime(c.apply(convert_to_human_readable)), column)
+    vectorized_seconds, vectorized = time_call(filetime_series_to_datetime, column)
+
+    if not per_row.equals(vectorized):
+        raise AssertionError("Vectorized decoding does not match convert_to_human_readable")
+
+    print(f"rows:        {args.rows:,}")
+    print(f"per-row:     {per_row_seconds:8.3f} s")
+    print(f"vectorized:  {vectorized_seconds:8.3f} s")
+    print(f"speedup:     {per_row_seconds / vectorized_seconds:8.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Benchmark: interpreter startup cost of Trade_Scout.py and of repeated config loads.
+
+Every configuration is timed in a fresh interpreter, so the figures include
+module imports:
+  - "entry point": importing Trade_Scout, which is all --help, argument errors
+    and the posting code pay;
+  - "all modules": additionally importing the database, metrics and rendering
+    modules, which a report run loads on first use (and every run used to
+    load up front).
+
+Usage:
+    python benchmarks/bench_startup.py [--runs 10]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+REPO_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+HEAVY_MODULES = ['pandas', 'numpy', 'PIL', 'pyautogui', 'pygetwindow']
+
+SCENARIOS = {
+    'entry point': "import Trade_Scout",
+    'all modules': "import Trade_Scout, db_handler, metrics_store, PL_Summary, watcher, report_image",
+}
+
+def time_import(code, runs):
+    """
+    Median wall time of running `code` in a fresh interpreter, and the heavy
+    modules it loaded.
+    """
+    report = f"import sys; print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    timings = []
+    loaded = ''
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = subprocess.run(
+            [sys.executable, '-c', f"{code}; {report}"],
+            cwd=REPO_DIR, capture_output=True, text=True, check=True
+        )
+        timings.append(time.perf_counter() - start)
+        loaded = result.stdout.strip()
+    return statistics.median(timings), loaded
+
+def time_config_loads(calls):
+    sys.path.insert(0, REPO_DIR)
+    from utils import get_config_path, load_yaml_config
+
+    if not os.path.exists(get_config_path()):
+        return None
+    start = time.perf_counter()
+    for _ in range(calls):
+        load_yaml_config()
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark Trade_Scout startup time.')
+    parser.add_argument('--runs', type=int, default=10, help='Fresh interpreters per scenario.')
+    args = parser.parse_args()
+
+    baseline, _ = time_import("pass", args.runs)
+    print(f"python -c pass:  {baseline * 1000:8.1f} ms")
+    for name, code in SCENARIOS.items():
+        seconds, loaded = time_import(code, args.runs)
+        print(f"{name + ':':<16} {seconds * 1000:8.1f} ms  (loads: {loaded or 'none of ' + ', '.join(HEAVY_MODULES)})")
+
+    config_seconds = time_config_loads(1000)
+    if config_seconds is None:
+        print("config:          no config.yaml, skipped")
+    else:
+        print(f"config x1000:    {config_seconds * 1000:8.1f} ms  (parsed once, then cached)")
+
+if __name__ == "__main__":
+    main()
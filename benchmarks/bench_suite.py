@@ -0,0 +1,137 @@
+"""
+Benchmark suite: the report queries and calculations against synthetic TAT
+databases of increasing size.
+
+Each scale is generated once into a temporary directory (or --keep DIR, where
+existing files are reused) with tests/tat_fixtures.generate_tat_database.
+Every function is timed as the median of --repeat calls over the whole
+generated range, or its last day for the single-day functions.
+
+With --replica every scale is also timed against its indexed replica (see
+replica.sync_replica).
+
+Usage:
+    python benchmarks/bench_suite.py [--scales day month year] [--repeat 3] [--keep DIR] [--replica]
+"""
+import argparse
+import contextlib
+import io
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+# Add the parent directory (where utils.py exists) and the tests (fixtures) to sys.path
+REPO_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(REPO_DIR)
+sys.path.append(os.path.join(REPO_DIR, 'tests'))
+
+from db_handler import get_trades, get_trades_range, open_connection
+from PL_Summary import (
+    calculate_premium_captured_over_range, calculate_total_PL, get_last_of_day_pl, stream_last_of_day_pl
+)
+from metrics_store import compute_daily_metrics
+from replica import sync_replica
+from utils import METRIC_INPUT_COLUMNS, calculate_metrics, get_last_spx_value
+from tat_fixtures import GENERATED_START_DATE, generate_tat_database, trading_days
+
+# name: (trading days, trades per day, DailyLog interval in seconds)
+SCALES = {
+    'day': (1, 40, 60),
+    'month': (21, 40, 60),
+    'year': (252, 40, 60),
+    'years': (1008, 250, 60),     # four years of minute logs, ~250k trades
+    'millions': (1008, 1000, 60), # ~1M trades
+}
+DEFAULT_SCALES = ['day', 'month', 'year']
+
+def get_database(scale, directory):
+    days, trades_per_day, log_interval = SCALES[scale]
+    path = os.path.join(directory, f"tat_{scale}.db3")
+    if not os.path.exists(path):
+        start = time.perf_counter()
+        generate_tat_database(path, days=days, trades_per_day=trades_per_day,
+                              log_interval_seconds=log_interval).close()
+        print(f"Generated {scale} database in {time.perf_counter() - start:.1f} s.")
+    return path
+
+def median_time(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            func()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+def bench_scale(scale, path, repeat):
+    days = trading_days(GENERATED_START_DATE, SCALES[scale][0])
+    first_day, last_day = days[0], days[-1]
+    connection = open_connection(path)
+    try:
+        day_trades = get_trades(connection, last_day.year, last_day.month, last_day.day)
+        trade_count, log_count = connection.execute(
+            "SELECT (SELECT COUNT(*) FROM Trade), (SELECT COUNT(*) FROM DailyLog);"
+        ).fetchone()
+
+        results = {
+            'get_trades': median_time(
+                lambda: get_trades(connection, last_day.year, last_day.month, last_day.day), repeat),
+            'calculate_metrics': median_time(lambda: calculate_metrics(day_trades), repeat),
+            'get_trades_range (all columns)': median_time(
+                lambda: get_trades_range(connection, first_day, last_day), repeat),
+            'get_trades_range (metric inputs)': median_time(
+                lambda: get_trades_range(connection, first_day, last_day, columns=METRIC_INPUT_COLUMNS), repeat),
+            'daily metrics (pandas)': median_time(
+                lambda: compute_daily_metrics(connection, first_day, last_day, 'pandas'), repeat),
+            'daily metrics (sql)': median_time(
+                lambda: compute_daily_metrics(connection, first_day, last_day, 'sql'), repeat),
+            'premium_captured_over_range': median_time(
+                lambda: calculate_premium_captured_over_range(first_day, last_day, connection), repeat),
+            'calculate_total_PL': median_time(
+                lambda: calculate_total_PL(f"{first_day:%Y%m%d}", f"{last_day:%Y%m%d}", db_path=path), repeat),
+            'last-of-day PL (sql)': median_time(
+                lambda: get_last_of_day_pl(connection, first_day, last_day), repeat),
+            'last-of-day PL (streamed)': median_time(
+                lambda: stream_last_of_day_pl(connection, first_day, last_day), repeat),
+            'get_last_spx_value': median_time(
+                lambda: get_last_spx_value(connection, last_day.year, last_day.month, last_day.day), repeat),
+        }
+    finally:
+        connection.close()
+    return trade_count, log_count, results
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark report functions on synthetic TAT databases.')
+    parser.add_argument('--scales', nargs='+', choices=list(SCALES), default=DEFAULT_SCALES,
+                        help=f"Database sizes to run (default: {' '.join(DEFAULT_SCALES)}).")
+    parser.add_argument('--repeat', type=int, default=3, help='Timed calls per function.')
+    parser.add_argument('--keep', type=str, metavar='DIR',
+                        help='Generate the databases into DIR and reuse them on later runs.')
+    parser.add_argument('--replica', action='store_true',
+                        help='Also time every function against an indexed replica of each database.')
+    args = parser.parse_args()
+
+    with contextlib.ExitStack() as stack:
+        directory = args.keep or stack.enter_context(tempfile.TemporaryDirectory())
+        os.makedirs(directory, exist_ok=True)
+
+        for scale in args.scales:
+            path = get_database(scale, directory)
+            trade_count, log_count, results = bench_scale(scale, path, args.repeat)
+            print(f"\n{scale}: {trade_count:,} trades, {log_count:,} DailyLog rows")
+            if args.replica:
+                replica_path = os.path.join(directory, f"tat_{scale}_replica.db3")
+                with contextlib.redirect_stdout(io.StringIO()):
+                    sync_replica(path, replica_path)
+                replica_results = bench_scale(scale, replica_path, args.repeat)[2]
+                print(f"  {'':<34} {'TAT file':>13} {'replica':>13}")
+                for name, seconds in results.items():
+                    print(f"  {name:<34} {seconds * 1000:10.2f} ms {replica_results[name] * 1000:10.2f} ms")
+            else:
+                for name, seconds in results.items():
+                    print(f"  {name:<34} {seconds * 1000:10.2f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""
+Breakdown report: PCR, win rate, stops and slippage of a date range split by
+TradeType, StopType and entry-time bucket (from DateOpened).
+
+Usage:
+    python breakdown.py --from 20240901 --to 20240930 [--bucket 30] [--csv FILE] [--discord | --dry-run FILE]
+"""
+import argparse
+import os
+from datetime import datetime
+
+from db_handler import connect_db, iter_trades_range, read_transaction
+from profiler import profiled
+from utils import (
+    METRIC_INPUT_COLUMNS, PARTIAL_METRIC_AGGREGATES, combine_partial_metrics, finish_metrics, partial_metrics
+)
+
+DEFAULT_BUCKET_MINUTES = 30
+BREAKDOWN_DIMENSIONS = ['TradeType', 'StopType', 'EntryTime']
+BREAKDOWN_INPUT_COLUMNS = ['TradeType', 'StopType', 'DateOpened'] + METRIC_INPUT_COLUMNS
+NO_VALUE = '(none)'
+TOTAL_DIMENSION = 'Total'
+BREAKDOWN_COLUMNS = ['trades', 'premium_sold', 'premium_captured', 'pcr', 'win_rate', 'expired_trades',
+                     'stops', 'bad_slip', 'bad_slip_max', 'negative_exp']
+
+def entry_time_buckets(date_opened, bucket_minutes=DEFAULT_BUCKET_MINUTES):
+    """
+    Label every trade with the start (HH:MM) of its `bucket_minutes` entry
+    window, e.g. 10:17 -> "10:00" with 30-minute buckets.
+    """
+    return date_opened.dt.floor(f"{int(bucket_minutes)}min").dt.strftime("%H:%M")
+
+def _group_key(values):
+    return values.astype(object).where(values.notna(), NO_VALUE)
+
+def breakdown_partials(df_trades, bucket_minutes=DEFAULT_BUCKET_MINUTES):
+    """
+    partial_metrics of a trade frame grouped by every TradeType, StopType and
+    entry-time combination at once; the per-dimension breakdowns are rolled
+    up from it.
+    """
+    return partial_metrics(df_trades, {
+        'TradeType': _group_key(df_trades['TradeType']),
+        'StopType': _group_key(df_trades['StopType']),
+        'EntryTime': _group_key(entry_time_buckets(df_trades['DateOpened'], bucket_minutes)),
+    })
+
+def finish_breakdown(partial):
+    """
+    Roll the combination partials up into one block of rows per dimension,
+    plus a Total row.
+
+    :return: DataFrame indexed by (Dimension, Group) with BREAKDOWN_COLUMNS.
+    """
+    import pandas as pd
+
+    blocks = {}
+    for dimension in BREAKDOWN_DIMENSIONS:
+        rolled_up = partial.groupby(level=dimension).agg(PARTIAL_METRIC_AGGREGATES)
+        blocks[dimension] = finish_metrics(rolled_up).assign(trades=rolled_up['trades'])
+    total = partial.agg(PARTIAL_METRIC_AGGREGATES).to_frame('All').T.astype('float64')
+    blocks[TOTAL_DIMENSION] = finish_metrics(total).assign(trades=total['trades'])
+
+    breakdown = pd.concat(blocks, names=['Dimension', 'Group'])
+    return breakdown[BREAKDOWN_COLUMNS].astype({
+        column: 'int64' for column in ['trades', 'expired_trades', 'stops', 'bad_slip', 'negative_exp']
+    })
+
+def calculate_breakdown(df_trades, bucket_minutes=DEFAULT_BUCKET_MINUTES):
+    """
+    Breakdown of the trades in memory (BREAKDOWN_INPUT_COLUMNS needed).
+    """
+    return finish_breakdown(breakdown_partials(df_trades, bucket_minutes))
+
+@profiled
+def breakdown_range(connection, start_date, end_date, bucket_minutes=DEFAULT_BUCKET_MINUTES):
+    """
+    Breakdown of the trades from start_date through end_date in one pass: the
+    projected trade columns are read in chunks (see db_handler.iter_trades_range)
+    and folded into the combination partials.
+    """
+    partial = None
+    for df_trades in iter_trades_range(connection, start_date, end_date, columns=BREAKDOWN_INPUT_COLUMNS):
+        chunk_partial = breakdown_partials(df_trades, bucket_minutes)
+        partial = chunk_partial if partial is None else combine_partial_metrics([partial, chunk_partial])
+    return finish_breakdown(partial)
+
+def _format_money(value):
+    return f"(${abs(value):,.0f})" if value < 0 else f"${value:,.0f}"
+
+def format_breakdown_messages(breakdown, start_date, end_date):
+    """
+    The breakdown as Discord messages, one code block per dimension so every
+    message stays well below Discord's length limit.
+    """
+    header = f"{start_date:%Y %b %d} - {end_date:%Y %b %d}"
+    messages = []
+    for dimension in BREAKDOWN_DIMENSIONS + [TOTAL_DIMENSION]:
+        if dimension not in breakdown.index.get_level_values('Dimension'):
+            continue
+        lines = [
+            f"{header}  by {dimension}" if dimension != TOTAL_DIMENSION else f"{header}  total",
+            f"{'Group':<10} | {'Trades':>6} | {'Prem Cap':>10} | {'PCR':>7} | {'Win %':>7} | {'Stp':>4} | {'Slip':>4}",
+            "-----------|--------|------------|---------|---------|------|-----",
+        ]
+        for row in breakdown.loc[dimension].itertuples():
+            lines.append(
+                f"{str(row.Index)[:10]:<10} | {row.trades:>6,} | {_format_money(row.premium_captured):>10} | "
+                f"{row.pcr:>6.1f}% | {row.win_rate:>6.1f}% | {row.stops:>4} | {row.bad_slip:>4}"
+            )
+        messages.append("```\n" + "\n".join(lines) + "\n```")
+    return messages
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Break a date range down by TradeType, StopType and entry time.')
+    parser.add_argument('--from', dest='from_date', type=str, required=True, help='First date (YYYYMMDD).')
+    parser.add_argument('--to', dest='to_date', type=str,
+                        help='Last date (YYYYMMDD). Defaults to the current date.')
+    parser.add_argument('--bucket', type=int, default=DEFAULT_BUCKET_MINUTES, metavar='MINUTES',
+                        help=f'Entry-time bucket size in minutes (default {DEFAULT_BUCKET_MINUTES}).')
+    parser.add_argument('--csv', type=str, metavar='FILE', help='Also write the breakdown to FILE.')
+    parser.add_argument('--discord', action='store_true', help='Post the breakdown to the configured webhooks.')
+    parser.add_argument('--dry-run', type=str, metavar='FILE',
+                        help='Write the Discord messages to FILE instead of posting them.')
+    args = parser.parse_args(argv)
+
+    try:
+        start_date = datetime.strptime(args.from_date, "%Y%m%d")
+        end_date = datetime.strptime(args.to_date, "%Y%m%d") if args.to_date else datetime.now()
+    except ValueError:
+        parser.error("Dates must be in the format YYYYMMDD (e.g., 20240917).")
+    if args.bucket <= 0 or (60 % args.bucket and args.bucket % 60):
+        parser.error("--bucket must divide an hour (e.g. 15, 30) or be whole hours.")
+
+    with connect_db() as connection, read_transaction(connection):
+        breakdown = breakdown_range(connection, start_date, end_date, args.bucket)
+
+    print(breakdown.to_string(float_format=lambda value: f"{value:,.2f}"))
+    if args.csv:
+        breakdown.to_csv(args.csv)
+        print(f"Breakdown written to {os.path.abspath(args.csv)}.")
+
+    messages = format_breakdown_messages(breakdown, start_date, end_date)
+    if args.dry_run:
+        with open(args.dry_run, 'w', encoding='utf-8') as f:
+            f.write("\n".join(messages) + "\n")
+        print(f"Messages written to {args.dry_run}.")
+    elif args.discord:
+        from discord_messenger import record_posted_messages, send_message_to_discord
+        report_key = f"breakdown_{start_date:%Y%m%d}_{end_date:%Y%m%d}"
+        for message in messages:
+            record_posted_messages(report_key, send_message_to_discord(message, True, None, False))
+        print(f"Posted {len(messages)} message(s); recorded under {report_key}.")
+
+if __name__ == "__main__":
+    main()
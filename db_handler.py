@@ -3,25 +3,105 @@ import pandas as pd
 import yaml
 import os
 import time
+import queue
+import threading
+from pathlib import Path
 from datetime import datetime
-from utils import convert_to_human_readable, load_yaml_config
+from utils import (
+    date_key, filetime_day_bounds, filetime_series_to_datetime, filetime_series_to_day, load_yaml_config,
+    execute_with_retry, read_sql_with_retry, run_with_lock_retry
+)
 import sys
 from contextlib import contextmanager
+from profiler import profiled
+
+DEFAULT_BUSY_TIMEOUT_MS = 5000
+SQLITE_MAX_PARAMS = 500
+DEFAULT_CHUNK_ROWS = 50000  # rows per chunk of the iter_* readers
 
 # Load YAML configuration
 def load_config():
     return load_yaml_config()
 
+@profiled
+def open_connection(db_path, read_only=True, busy_timeout_ms=DEFAULT_BUSY_TIMEOUT_MS,
+                    check_same_thread=True):
+    """
+    Open a SQLite connection to the TAT database. In read-only mode the file is
+    opened through a `mode=ro` URI, so TradeScout can never take a write lock
+    on TAT's database. busy_timeout makes SQLite itself wait for TAT's writer
+    instead of failing with "database is locked" straight away.
+    """
+    if read_only:
+        uri = f"{Path(db_path).resolve().as_uri()}?mode=ro"
+        connection = sqlite3.connect(uri, uri=True, timeout=busy_timeout_ms / 1000,
+                                     check_same_thread=check_same_thread)
+    else:
+        connection = sqlite3.connect(db_path, timeout=busy_timeout_ms / 1000,
+                                     check_same_thread=check_same_thread)
+    connection.execute(f"PRAGMA busy_timeout = {int(busy_timeout_ms)};")
+    return connection
+
+def get_databases(config):
+    """
+    The TAT databases to report on: the `databases` list of config.yaml (one
+    entry per account, each with a `name` and a `db_path`), or the single
+    `db_path` as an unnamed account.
+
+    :return: List of dicts with 'name' and 'db_path'.
+    """
+    databases = config.get('databases')
+    if not databases:
+        return [{'name': None, 'db_path': config.get('db_path', 'data/data.db3')}]
+
+    accounts = []
+    for index, database in enumerate(databases, start=1):
+        if not database.get('db_path'):
+            raise ValueError(f"Entry {index} of 'databases' in config.yaml has no db_path.")
+        accounts.append({'name': str(database.get('name') or f"Account {index}"), 'db_path': database['db_path']})
+    names = [account['name'] for account in accounts]
+    if len(set(names)) != len(names):
+        raise ValueError("The names of the 'databases' in config.yaml must be unique.")
+    return accounts
+
+def get_db_settings(config):
+    """
+    Connection settings from config.yaml: (db_path, read_only, busy_timeout_ms).
+    With a `databases` list and no `db_path`, db_path is the first database.
+    """
+    return (
+        config.get('db_path') or get_databases(config)[0]['db_path'],
+        config.get('db_read_only', True),
+        config.get('db_busy_timeout_ms', DEFAULT_BUSY_TIMEOUT_MS),
+    )
+
 @contextmanager
-def connect_db(retries=5, delay=1):
+def connect_db(retries=5, delay=1, db_path=None, use_replica=True):
     """
     Context manager to connect to the SQLite database with optional retries.
+    Failed attempts are retried with exponential backoff starting at `delay`
+    seconds. `db_path` overrides the path from config.yaml; with an explicit
+    `db_path` a missing config.yaml means default settings. With `replica`
+    enabled in config.yaml (and no `db_path`), the indexed local replica is
+    synced first and opened instead of TAT's file (see replica.sync_replica);
+    `use_replica=False` opens TAT's file regardless, for callers that must
+    see TAT's commits as they happen, e.g. --watch.
     Usage:
         with connect_db() as connection:
             # use 'connection' here
     """
-    config = load_config()
-    db_path = config.get('db_path', 'data/data.db3')
+    try:
+        config = load_config()
+    except FileNotFoundError:
+        if db_path is None:
+            raise
+        config = {}
+    config_db_path, read_only, busy_timeout_ms = get_db_settings(config)
+    if db_path is None and use_replica and config.get('replica'):
+        from replica import get_replica_check_interval, get_replica_path, sync_replica
+        db_path = sync_replica(config_db_path, get_replica_path(config), busy_timeout_ms,
+                               get_replica_check_interval(config))
+    db_path = db_path or config_db_path
 
     if not os.path.exists(db_path):
         raise FileNotFoundError(f"Database file not found at {db_path}")
@@ -29,13 +109,14 @@ def connect_db(retries=5, delay=1):
     connection = None
     for attempt in range(retries):
         try:
-            connection = sqlite3.connect(db_path)
-            print(f"Connected to the database at {db_path} on attempt {attempt + 1}.")
+            connection = open_connection(db_path, read_only, busy_timeout_ms)
+            mode = "read-only" if read_only else "read-write"
+            print(f"Connected to the database at {db_path} ({mode}) on attempt {attempt + 1}.")
             break
         except sqlite3.OperationalError as e:
             print(f"Attempt {attempt + 1} of {retries} failed: {e}")
             if attempt < retries - 1:
-                time.sleep(delay)
+                time.sleep(delay * 2 ** attempt)
             else:
                 raise ConnectionError(f"Failed to connect after {retries} attempts") from e
 
@@ -46,36 +127,340 @@ def connect_db(retries=5, delay=1):
             connection.close()
             print("Database connection closed.")
 
-def get_trades(connection, year, month, day):
+@contextmanager
+def read_transaction(connection):
     """
-    Retrieve trades for the specified date and return a DataFrame with columns
-    in a consistent order.
+    Run a group of reads inside one read transaction, so every query of a
+    report sees the same snapshot of the database even while TAT keeps
+    writing. Starting the transaction is retried while the database is locked.
+    Usage:
+        with connect_db() as connection, read_transaction(connection):
+            # all queries here read one consistent snapshot
+    """
+    if connection.in_transaction:
+        yield connection
+        return
+
+    def begin():
+        connection.execute("BEGIN;")
+        # The shared lock (or WAL snapshot) is only taken by the first read
+        connection.execute("SELECT 1 FROM sqlite_master LIMIT 1;").fetchall()
+
+    run_with_lock_retry(begin)
+    try:
+        yield connection
+    finally:
+        if connection.in_transaction:
+            connection.rollback()
+
+class ConnectionPool:
+    """
+    Small pool of reusable SQLite connections for long-running and batch
+    callers, so they do not open, configure and close a connection for every
+    unit of work. Connections are created lazily up to `size` and handed to
+    one thread at a time.
+    Usage:
+        pool = ConnectionPool()
+        with pool.connection() as connection:
+            ...
+        pool.close()
+    """
+
+    def __init__(self, db_path=None, size=4, read_only=None, busy_timeout_ms=None):
+        if None in (db_path, read_only, busy_timeout_ms):
+            config_db_path, config_read_only, config_busy_timeout_ms = get_db_settings(load_config())
+            db_path = db_path or config_db_path
+            read_only = config_read_only if read_only is None else read_only
+            busy_timeout_ms = config_busy_timeout_ms if busy_timeout_ms is None else busy_timeout_ms
+        self.db_path = db_path
+        self.read_only = read_only
+        self.busy_timeout_ms = busy_timeout_ms
+        self.size = size
+
+        if not os.path.exists(self.db_path):
+            raise FileNotFoundError(f"Database file not found at {self.db_path}")
+
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def _acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._created < self.size:
+                self._created += 1
+                try:
+                    return open_connection(self.db_path, self.read_only, self.busy_timeout_ms,
+                                           check_same_thread=False)
+                except Exception:
+                    self._created -= 1
+                    raise
+        return self._idle.get()
+
+    @contextmanager
+    def connection(self):
+        if self._closed:
+            raise RuntimeError("Connection pool is closed.")
+        connection = self._acquire()
+        try:
+            yield connection
+        finally:
+            if connection.in_transaction:
+                connection.rollback()
+            self._idle.put(connection)
+
+    def close(self):
+        self._closed = True
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+TRADE_COLUMNS = [
+    "TradeID", "DateOpened", "TradeType", "ShortPut", "LongPut",
+    "ShortCall", "LongCall", "Qty", "StopType", "PriceOpen",
+    "PriceStopTarget", "ProfitLoss", "PriceClose", "DateClosed",
+    "ClosingProcessed", "TotalPremium", "Commission", "CommissionClose"
+]
+TRADE_DAY_COLUMNS = ["Year", "Month", "Day"]
+
+# Compact dtypes of the trade columns; the rest stay int64/float64. Strikes are
+# multiples of 0.5 or more and are exact in float32. Prices, premiums and PL stay
+# float64 so differences such as the bad-slip check (>= 0.50) are not shifted
+# by float32 rounding.
+TRADE_DTYPES = {
+    "TradeType": "category", "StopType": "category",
+    "Qty": "Int16", "ClosingProcessed": "Int8",
+    "ShortPut": "float32", "LongPut": "float32", "ShortCall": "float32", "LongCall": "float32",
+}
+DATE_COLUMNS = ["DateOpened", "DateClosed"]
+
+def _select_columns(columns):
+    if columns is None:
+        return list(TRADE_COLUMNS)
+    columns = list(columns)
+    unknown = [column for column in columns if column not in TRADE_COLUMNS]
+    if unknown:
+        raise ValueError(f"Unknown trade column(s): {', '.join(unknown)}")
+    return columns
+
+def compact_trade_dtypes(df_trades):
+    """
+    Convert the trade columns present in `df_trades` to TRADE_DTYPES, in place.
     """
+    for column, dtype in TRADE_DTYPES.items():
+        if column in df_trades:
+            df_trades[column] = df_trades[column].astype(dtype)
+    return df_trades
+
+def _read_trades(connection, where_clause, params, columns, extra_columns=(), limit=None):
+    selected = columns + [column for column in extra_columns if column not in columns]
+    # Chunked reads page through the trades in TradeID order
+    page = f"ORDER BY TradeID LIMIT {int(limit)}" if limit else ""
     query = f"""
-    SELECT
-        TradeID, DateOpened, DateClosed, TradeType,
-        ShortPut, LongPut, ShortCall, LongCall,
-        Qty, StopType, PriceOpen, PriceStopTarget,
-        ProfitLoss, PriceClose, ClosingProcessed,
-        TotalPremium, Commission, CommissionClose
+    SELECT {', '.join(selected)}
     FROM Trade
-    WHERE Year = {year}
-      AND Month = {month}
-      AND Day = {day}
-      AND TATTradeID IS NOT NULL;
+    WHERE {where_clause}
+      AND TATTradeID IS NOT NULL
+    {page};
     """
-    df_trades = pd.read_sql_query(query, connection)
+    df_trades = read_sql_with_retry(query, connection, params=params)
+
+    # Convert date fields (only those requested)
+    for column in DATE_COLUMNS:
+        if column in df_trades:
+            df_trades[column] = filetime_series_to_datetime(df_trades[column])
+    return compact_trade_dtypes(df_trades)
 
-    # Convert date fields
-    df_trades['DateOpened'] = df_trades['DateOpened'].apply(convert_to_human_readable)
-    df_trades['DateClosed'] = df_trades['DateClosed'].apply(convert_to_human_readable)
+@profiled
+def get_trades(connection, year, month, day, columns=None):
+    """
+    Retrieve trades for the specified date and return a DataFrame with columns
+    in a consistent order.
+
+    :param columns: Subset of TRADE_COLUMNS to read; all by default. Only the
+                    requested columns are selected, and DateOpened/DateClosed
+                    are only decoded when requested.
+    """
+    columns = _select_columns(columns)
+    df_trades = _read_trades(connection, "Year = ? AND Month = ? AND Day = ?", (year, month, day), columns)
 
     # Reorder columns for consistency
-    df_trades_ordered = df_trades[[
-        "TradeID", "DateOpened", "TradeType", "ShortPut", "LongPut",
-        "ShortCall", "LongCall", "Qty", "StopType", "PriceOpen",
-        "PriceStopTarget", "ProfitLoss", "PriceClose", "DateClosed",
-        "ClosingProcessed", "TotalPremium", "Commission", "CommissionClose"
-    ]]
+    df_trades_ordered = df_trades[columns]
     
     return df_trades_ordered
+
+@profiled
+def get_trades_range(connection, start_date, end_date, columns=None):
+    """
+    Retrieve the trades of every day from start_date through end_date
+    (inclusive) with one query. Columns are those of get_trades (or
+    `columns`) plus a TradeDate column holding the trade's calendar day, ready
+    for utils.calculate_daily_metrics.
+    """
+    columns = _select_columns(columns)
+    df_trades = _read_trades(
+        connection,
+        "(Year * 10000 + Month * 100 + Day) BETWEEN ? AND ?",
+        (date_key(start_date), date_key(end_date)),
+        columns, TRADE_DAY_COLUMNS
+    )
+    return _with_trade_date(df_trades, columns)
+
+def _iter_trades(connection, where_clause, params, columns, chunk_rows):
+    last_trade_id = -1
+    while True:
+        df_trades = _read_trades(
+            connection, f"TradeID > ? AND {where_clause}", (last_trade_id, *params),
+            columns, TRADE_DAY_COLUMNS + ['TradeID'], limit=chunk_rows
+        )
+        if not df_trades.empty:
+            last_trade_id = int(df_trades['TradeID'].iloc[-1])
+        yield _with_trade_date(df_trades, columns)
+        if len(df_trades) < chunk_rows:
+            return
+
+def iter_trades_range(connection, start_date, end_date, columns=None, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """
+    Generator counterpart of get_trades_range for long histories: yields
+    frames of at most `chunk_rows` trades, in TradeID order, with the columns
+    of get_trades_range. Each chunk is a separate query resuming after the
+    last TradeID read, so memory does not grow with the range. At least one
+    chunk is yielded, empty when the range has no trades.
+
+    Wrap the loop in read_transaction to read all chunks from one snapshot.
+    """
+    columns = _select_columns(columns)
+    yield from _iter_trades(
+        connection, "(Year * 10000 + Month * 100 + Day) BETWEEN ? AND ?",
+        (date_key(start_date), date_key(end_date)), columns, chunk_rows
+    )
+
+def iter_trades_on_days(connection, days, columns=None, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """
+    iter_trades_range for a set of days that need not be consecutive, e.g. a
+    few scattered days to recompute: only those days' trades are read, with
+    one day-key IN list per SQLITE_MAX_PARAMS days (one pass over the table
+    each, instead of everything between the first and last day).
+
+    :return: Generator of chunks as iter_trades_range; at least one chunk is
+             yielded, empty when `days` is empty or has no trades.
+    """
+    columns = _select_columns(columns)
+    day_keys = sorted({date_key(day) for day in days})
+    if not day_keys:
+        yield from _iter_trades(connection, "0", (), columns, chunk_rows)
+        return
+    for i in range(0, len(day_keys), SQLITE_MAX_PARAMS):
+        chunk = day_keys[i:i + SQLITE_MAX_PARAMS]
+        placeholders = ', '.join('?' * len(chunk))
+        yield from _iter_trades(
+            connection, f"(Year * 10000 + Month * 100 + Day) IN ({placeholders})", chunk, columns, chunk_rows
+        )
+
+def iter_daily_log(connection, start_date, end_date, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """
+    Yield the DailyLog rows from start_date through end_date in frames of at
+    most `chunk_rows`, in DailyLogID order. The day bounds are applied in SQL
+    as FILETIME values and each chunk is decoded on its own.
+
+    :return: Generator of DataFrames with DailyLogID, LogDay (the row's
+             calendar day, see utils.filetime_series_to_day), LogDate
+             (decoded), PL and SPX; nothing is yielded for an empty range.
+             Wrap the loop in read_transaction for a single snapshot.
+    """
+    start_filetime = filetime_day_bounds(start_date)[0]
+    end_filetime = filetime_day_bounds(end_date)[1]
+    query = f"""
+    SELECT DailyLogID, LogDate, PL, SPX FROM DailyLog
+    WHERE DailyLogID > ? AND LogDate BETWEEN ? AND ?
+    ORDER BY DailyLogID
+    LIMIT {int(chunk_rows)};
+    """
+    last_log_id = -1
+    while True:
+        df_daily_log = read_sql_with_retry(query, connection, params=(last_log_id, start_filetime, end_filetime))
+        if df_daily_log.empty:
+            return
+        last_log_id = int(df_daily_log['DailyLogID'].iloc[-1])
+        df_daily_log.insert(1, 'LogDay', filetime_series_to_day(df_daily_log['LogDate']))
+        df_daily_log['LogDate'] = filetime_series_to_datetime(df_daily_log['LogDate'])
+        yield df_daily_log
+        if len(df_daily_log) < chunk_rows:
+            return
+
+@profiled
+def get_trades_after(connection, trade_id, date, columns=None):
+    """
+    Retrieve the trades of `date` with a TradeID above `trade_id`, i.e. those
+    added since a previous read. Columns are those of get_trades_range.
+    """
+    columns = _select_columns(columns)
+    df_trades = _read_trades(
+        connection,
+        "TradeID > ? AND Year = ? AND Month = ? AND Day = ?",
+        (trade_id, date.year, date.month, date.day),
+        columns, TRADE_DAY_COLUMNS
+    )
+    return _with_trade_date(df_trades, columns)
+
+@profiled
+def get_trades_by_ids(connection, trade_ids, columns=None):
+    """
+    Re-read the given trades, e.g. to pick up ones that have since closed.
+    Columns are those of get_trades_range.
+    """
+    columns = _select_columns(columns)
+    trade_ids = [int(trade_id) for trade_id in trade_ids]
+    frames = []
+    for i in range(0, len(trade_ids), SQLITE_MAX_PARAMS):
+        chunk = trade_ids[i:i + SQLITE_MAX_PARAMS]
+        frames.append(_read_trades(
+            connection, f"TradeID IN ({', '.join('?' * len(chunk))})", chunk, columns, TRADE_DAY_COLUMNS
+        ))
+    if not frames:
+        frames.append(_read_trades(connection, "0", (), columns, TRADE_DAY_COLUMNS))
+    # Categories of the chunks may differ; concat falls back to object, so re-apply
+    return _with_trade_date(compact_trade_dtypes(pd.concat(frames, ignore_index=True)), columns)
+
+def get_trade_ids_without_tat_id(connection, date, trade_id=0):
+    """
+    Return the TradeIDs of `date` above `trade_id` whose TATTradeID is still
+    NULL. The trade readers skip those rows until TAT sets it, so callers that
+    read incrementally must re-read them later (see get_trades_by_ids).
+    """
+    rows = execute_with_retry(
+        connection,
+        "SELECT TradeID FROM Trade WHERE TradeID > ? AND Year = ? AND Month = ? AND Day = ? "
+        "AND TATTradeID IS NULL ORDER BY TradeID;",
+        (trade_id, date.year, date.month, date.day)
+    )
+    return [row[0] for row in rows]
+
+def get_max_row_ids(connection):
+    """
+    Return the highest (TradeID, DailyLogID) currently in the database, 0 when
+    a table is empty.
+    """
+    rows = execute_with_retry(
+        connection,
+        "SELECT (SELECT COALESCE(MAX(TradeID), 0) FROM Trade), "
+        "(SELECT COALESCE(MAX(DailyLogID), 0) FROM DailyLog);"
+    )
+    return rows[0]
+
+def get_data_version(connection):
+    """
+    SQLite's data_version for this connection. It changes whenever another
+    connection (e.g. TAT) commits to the database, and costs no I/O to read.
+    """
+    return connection.execute("PRAGMA data_version;").fetchone()[0]
+
+def _with_trade_date(df_trades, columns):
+    df_trades['TradeDate'] = pd.to_datetime(df_trades[TRADE_DAY_COLUMNS])
+    return df_trades[columns + ['TradeDate']]
@@ -1,65 +1,317 @@
 import requests
 import os
-from utils import take_screenshot_of_app, load_yaml_config
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from profiler import profiled
+from screenshot import APP_WINDOW_TITLE, get_screenshot_options, take_screenshot_of_app
+from utils import load_yaml_config, get_config_path
+
+MAX_WEBHOOK_WORKERS = 8
+MAX_RATE_LIMIT_RETRIES = 3
+DEFAULT_RETRY_AFTER = 1.0  # seconds, when a 429 response does not say how long to wait
+REQUEST_TIMEOUT = 30
+LEDGER_FILENAME = 'posted_messages.json'
+DEFAULT_POST_RETRIES = 3  # attempts after the first for transiently failed posts (unattended runs)
+DEFAULT_POST_RETRY_DELAY = 30.0  # seconds before the first of those retries, doubled after each
+
+# Outcomes of a post (see post_to_webhook)
+POST_DELIVERED = 'delivered'
+POST_TRANSIENT_FAILURE = 'transient'  # 5xx, 429 after its retries, connection errors: worth retrying
+POST_PERMANENT_FAILURE = 'permanent'  # other 4xx, invalid URLs: a retry would fail the same way
+
+_session = None
 
 # Load webhooks from config.yaml
 def load_webhooks():
     config = load_yaml_config()
     return config['webhooks']
 
-# Send message to Discord
-def send_message_to_discord(message, noimage, win, debug):
-    screenshot_path = None
-    if not noimage:
-        # Take a screenshot and return the temporary file path
-        screenshot_path = take_screenshot_of_app("Trade Automation Toolbox", win)
-    
-    message_ids = []
-    webhooks = load_webhooks()  # Load webhooks from config.yaml
-
-    for webhook in webhooks:
-        url = webhook["url"]
-        thread_id = webhook.get("thread_id")
-        if thread_id:
-            url += f"?thread_id={thread_id}"
-
-        payload = {"content": message}
-        response = None  # Initialize response variable
+def get_session():
+    """
+    Shared keep-alive session whose connection pool is large enough for one
+    connection per concurrent webhook request.
+    """
+    global _session
+    if _session is None:
+        _session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=MAX_WEBHOOK_WORKERS, pool_maxsize=MAX_WEBHOOK_WORKERS)
+        _session.mount('https://', adapter)
+        _session.mount('http://', adapter)
+    return _session
+
+def get_retry_after(response):
+    """
+    Seconds to wait before retrying a rate-limited (429) response, from the
+    Retry-After header or Discord's JSON retry_after field.
+    """
+    retry_after = response.headers.get('Retry-After')
+    if retry_after is None:
+        try:
+            retry_after = response.json().get('retry_after')
+        except ValueError:
+            retry_after = None
+    try:
+        return max(float(retry_after), 0.0)
+    except (TypeError, ValueError):
+        return DEFAULT_RETRY_AFTER
+
+def request_with_rate_limit(method, url, retries=MAX_RATE_LIMIT_RETRIES, **kwargs):
+    """
+    Send a request to a webhook, waiting and retrying as often as `retries`
+    while Discord answers 429 Too Many Requests. The last response is returned.
+    """
+    for attempt in range(retries + 1):
+        response = get_session().request(method, url, timeout=REQUEST_TIMEOUT, **kwargs)
+        if response.status_code != 429 or attempt == retries:
+            return response
+        wait = get_retry_after(response)
+        print(f"Rate limited by {url}, retrying in {wait:.2f}s ({attempt + 1}/{retries}).")
+        time.sleep(wait)
+
+def run_concurrently(func, items):
+    """
+    Call `func` on every item from a thread pool and return the results in
+    the order of `items`.
+    """
+    items = list(items)
+    if not items:
+        return []
+    with ThreadPoolExecutor(max_workers=min(MAX_WEBHOOK_WORKERS, len(items))) as executor:
+        return list(executor.map(func, items))
+
+def thread_params(thread_id):
+    return {"thread_id": thread_id} if thread_id else {}
+
+def _failure_kind(status_code):
+    return POST_TRANSIENT_FAILURE if status_code == 429 or status_code >= 500 else POST_PERMANENT_FAILURE
 
+@profiled
+def post_to_webhook(webhook, message, image=None):
+    """
+    Post `message` (and optionally an image given as (filename, bytes)) to one
+    webhook.
+
+    :return: Tuple of (posted-message record {"url", "thread_id", "id"},
+             outcome). The outcome is POST_DELIVERED for a 2xx response,
+             whose "id" may still be None when Discord's answer had none,
+             else POST_TRANSIENT_FAILURE or POST_PERMANENT_FAILURE.
+    """
+    url = webhook["url"]
+    thread_id = webhook.get("thread_id")
+    posted = {"url": url, "thread_id": thread_id, "id": None}
+
+    # wait=true makes Discord return the created message, including its id
+    params = {"wait": "true", **thread_params(thread_id)}
+    payload = {"content": message}
+
+    try:
+        if image:
+            response = request_with_rate_limit("POST", url, params=params, data=payload, files={"file": image})
+        else:
+            response = request_with_rate_limit("POST", url, params=params, data=payload)
+
+        # Check if response is successful
+        if response.status_code not in [200, 204]:
+            print(f"Failed to send message to webhook {url}. Status code: {response.status_code}")
+            print(f"Response: {response.text}")
+            return posted, _failure_kind(response.status_code)
         try:
-            if screenshot_path and os.path.isfile(screenshot_path):
-                with open(screenshot_path, "rb") as image_file:
-                    files = {"file": (os.path.basename(screenshot_path), image_file)}
-                    response = requests.post(url, data=payload, files=files)
-            else:
-                response = requests.post(url, data=payload)
-
-            # Check if response is successful
-            if response.status_code not in [200, 204]:
-                print(f"Failed to send message to webhook {url}. Status code: {response.status_code}")
-                print(f"Response: {response.text}")
-                message_ids.append(None)
-            else:
-                try:
-                    response_data = response.json()
-                    message_id = response_data.get('id')
-                    message_ids.append(message_id)
-                except ValueError:
-                    message_ids.append(None)
-
-        except Exception as e:
-            print(f"Error while sending message to {url}: {e}")
-            message_ids.append(None)
-
-    # Clean up the temporary screenshot file after all webhooks have been processed
-    if screenshot_path and os.path.exists(screenshot_path):
-        os.remove(screenshot_path)
-
-    return message_ids
+            posted["id"] = response.json().get('id')
+        except ValueError:
+            pass
+        return posted, POST_DELIVERED
+
+    except (requests.ConnectionError, requests.Timeout) as e:
+        print(f"Error while sending message to {url}: {e}")
+        return posted, POST_TRANSIENT_FAILURE
+    except Exception as e:
+        print(f"Error while sending message to {url}: {e}")
+        return posted, POST_PERMANENT_FAILURE
+
+def _save_debug_image(image):
+    # Keep a copy of the attached image for inspection
+    with open(f"debug_{image[0]}", "wb") as f:
+        f.write(image[1])
+    print(f"Screenshot saved to debug_{image[0]} ({len(image[1])} bytes).")
+
+# Send message to Discord
+@profiled
+def send_message_to_discord(message, noimage, win, debug, webhooks=None, image=None):
+    """
+    Post `message` to every configured webhook concurrently.
+
+    The screenshot is captured and encoded once, in memory; every upload (and
+    retry) shares the same bytes.
+
+    :param image: Optional (filename, bytes) to attach instead of capturing a
+                  screenshot.
+    :return: List of posted-message records (see post_to_webhook) in webhook
+             order; pass them to delete_messages or edit_messages.
+    """
+    config = None
+    if webhooks is None or (image is None and not noimage):
+        config = load_yaml_config()
+    if image is None and not noimage:
+        image = take_screenshot_of_app(APP_WINDOW_TITLE, win, options=get_screenshot_options(config))
+
+    if debug and image:
+        _save_debug_image(image)
+
+    if webhooks is None:
+        webhooks = config['webhooks']  # Load webhooks from config.yaml
+
+    return run_concurrently(lambda webhook: post_to_webhook(webhook, message, image)[0], webhooks)
+
+@profiled
+def send_message_with_retries(message, noimage, win, debug, retries=DEFAULT_POST_RETRIES,
+                              retry_delay=DEFAULT_POST_RETRY_DELAY, webhooks=None, image=None,
+                              on_posted=None, sleep=time.sleep):
+    """
+    send_message_to_discord for unattended runs: the webhooks whose post
+    failed transiently (POST_TRANSIENT_FAILURE) are posted to again, as
+    often as `retries`, waiting `retry_delay` seconds and doubling the wait
+    after every attempt. Permanent failures are not retried, and a delivered
+    post without a message id is not re-posted (that would duplicate it).
+    The screenshot is taken once and attached to every attempt.
+
+    :param on_posted: Called with the records of every attempt as soon as it
+                      completes, e.g. to record them in the ledger before the
+                      next wait.
+    :return: Tuple of (posted-message records, outcomes), both in webhook order.
+    """
+    if webhooks is None:
+        webhooks = load_webhooks()
+    if image is None and not noimage:
+        image = take_screenshot_of_app(APP_WINDOW_TITLE, win, options=get_screenshot_options(load_yaml_config()))
+    if debug and image:
+        _save_debug_image(image)
+
+    def attempt(indexes):
+        results = run_concurrently(lambda i: post_to_webhook(webhooks[i], message, image), indexes)
+        for i, (posted, outcome) in zip(indexes, results):
+            posted_messages[i], outcomes[i] = posted, outcome
+        if on_posted is not None:
+            on_posted([posted for posted, _ in results])
+
+    posted_messages, outcomes = [None] * len(webhooks), [None] * len(webhooks)
+    attempt(list(range(len(webhooks))))
+    delay = retry_delay
+    for attempt_number in range(retries):
+        failed = [i for i, outcome in enumerate(outcomes) if outcome == POST_TRANSIENT_FAILURE]
+        if not failed:
+            break
+        print(f"{len(failed)} post(s) failed, retrying in {delay:g}s ({attempt_number + 1}/{retries}).")
+        sleep(delay)
+        delay *= 2
+        attempt(failed)
+    return posted_messages, outcomes
+
+def _as_posted_messages(posted_messages):
+    """
+    Accept posted-message records, or bare message ids as returned by older
+    versions (those are assumed to belong to the first webhook).
+    """
+    records = []
+    for posted in posted_messages:
+        if isinstance(posted, dict):
+            records.append(posted)
+        elif posted:
+            records.append({"url": load_webhooks()[0]["url"], "thread_id": None, "id": posted})
+    return [posted for posted in records if posted.get("id")]
+
+def _message_request(method, posted, **kwargs):
+    url = f"{posted['url']}/messages/{posted['id']}"
+    try:
+        response = request_with_rate_limit(method, url, params=thread_params(posted.get("thread_id")), **kwargs)
+    except Exception as e:
+        print(f"Error during {method} of message {posted['id']}: {e}")
+        return False
+    if response.status_code not in [200, 204]:
+        print(f"Failed {method} of message {posted['id']}. Status code: {response.status_code}")
+        return False
+    return True
 
 # Delete messages from Discord
-def delete_messages(message_ids):
-    webhooks = load_webhooks()  # Load webhooks from config.yaml
-    for msg_id in message_ids:
-        url = f"{webhooks[0]['url']}/messages/{msg_id}"
-        requests.delete(url)
\ No newline at end of file
+@profiled
+def delete_messages(posted_messages):
+    """
+    Delete posted messages through the webhook (and thread) each one was
+    posted with, concurrently.
+
+    :return: List of booleans, one per message with an id.
+    """
+    return run_concurrently(lambda posted: _message_request("DELETE", posted), _as_posted_messages(posted_messages))
+
+@profiled
+def edit_messages(posted_messages, message):
+    """
+    Replace the content of already posted messages in place (PATCH) instead of
+    deleting and re-posting them. The attached image, if any, is kept.
+
+    :return: List of booleans, one per message with an id.
+    """
+    return run_concurrently(
+        lambda posted: _message_request("PATCH", posted, json={"content": message}),
+        _as_posted_messages(posted_messages)
+    )
+
+def get_ledger_path(config=None):
+    """
+    Path of the ledger of posted messages: `message_ledger_path` from
+    config.yaml, or a file next to config.yaml.
+    """
+    config = config if config is not None else load_yaml_config()
+    return config.get('message_ledger_path') or os.path.join(
+        os.path.dirname(get_config_path()), LEDGER_FILENAME
+    )
+
+def _read_ledger(ledger_path):
+    if not os.path.exists(ledger_path):
+        return {}
+    with open(ledger_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def _write_ledger(ledger_path, ledger):
+    temp_path = f"{ledger_path}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(ledger, f, indent=2)
+    os.replace(temp_path, ledger_path)
+
+def load_posted_messages(report_key, ledger_path=None):
+    """
+    Posted-message records stored in the ledger for `report_key` (e.g. the
+    report date as YYYYMMDD).
+    """
+    return _read_ledger(ledger_path or get_ledger_path()).get(report_key, [])
+
+def record_posted_messages(report_key, posted_messages, ledger_path=None):
+    """
+    Append the successfully posted messages of a report to the ledger.
+    """
+    ledger_path = ledger_path or get_ledger_path()
+    ledger = _read_ledger(ledger_path)
+    ledger.setdefault(report_key, []).extend(posted for posted in posted_messages if posted.get("id"))
+    _write_ledger(ledger_path, ledger)
+
+def forget_posted_messages(report_key, posted_messages=None, ledger_path=None):
+    """
+    Remove a report's messages from the ledger, e.g. after deleting them.
+    Only the given posted messages are removed when `posted_messages` is set.
+    """
+    ledger_path = ledger_path or get_ledger_path()
+    ledger = _read_ledger(ledger_path)
+    if report_key not in ledger:
+        return
+
+    if posted_messages is None:
+        del ledger[report_key]
+    else:
+        forgotten = {(posted["url"], posted["id"]) for posted in posted_messages}
+        remaining = [posted for posted in ledger[report_key] if (posted["url"], posted["id"]) not in forgotten]
+        if remaining:
+            ledger[report_key] = remaining
+        else:
+            del ledger[report_key]
+    _write_ledger(ledger_path, ledger)
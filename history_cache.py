@@ -0,0 +1,325 @@
+"""
+Columnar cache of the decoded Trade and DailyLog history: one Arrow IPC
+(Feather v2) file per finished day and table, written once and read back
+memory-mapped, so historical analyses skip SQLite and the FILETIME decoding.
+
+Needs the optional pyarrow package.
+
+Usage:
+    python history_cache.py    # export the finished days not cached yet
+"""
+import json
+import os
+import shutil
+from datetime import datetime, timedelta
+
+from db_handler import (
+    TRADE_COLUMNS, compact_trade_dtypes, connect_db, get_trades_range, iter_daily_log, read_transaction
+)
+from profiler import add_rows, profiled
+from utils import date_key, day_runs, filetime_series_to_day, get_config_path, load_yaml_config
+
+CACHE_DIRNAME = 'history_cache'
+CACHE_VERSION = 1
+MANIFEST_FILENAME = 'manifest.json'
+TRADES_TABLE = 'trades'
+DAILY_LOG_TABLE = 'daily_log'
+DAILY_LOG_COLUMNS = ['DailyLogID', 'LogDay', 'LogDate', 'PL', 'SPX']
+DAILY_LOG_DTYPES = {'DailyLogID': 'int64', 'LogDay': 'datetime64[ns]', 'LogDate': 'datetime64[ns]',
+                    'PL': 'float64', 'SPX': 'float64'}
+
+def _import_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.ipc
+    except ImportError as e:
+        raise ImportError("The history cache needs pyarrow: pip install pyarrow") from e
+    return pyarrow
+
+def _trade_schema(pa):
+    types = {
+        'TradeID': pa.int64(), 'DateOpened': pa.timestamp('ns'), 'TradeType': pa.string(),
+        'ShortPut': pa.float32(), 'LongPut': pa.float32(), 'ShortCall': pa.float32(), 'LongCall': pa.float32(),
+        'Qty': pa.int16(), 'StopType': pa.string(), 'DateClosed': pa.timestamp('ns'), 'ClosingProcessed': pa.int8(),
+    }
+    fields = [pa.field(column, types.get(column, pa.float64())) for column in TRADE_COLUMNS]
+    return pa.schema(fields + [pa.field('TradeDate', pa.timestamp('ns'))])
+
+def _daily_log_schema(pa):
+    return pa.schema([
+        pa.field('DailyLogID', pa.int64()), pa.field('LogDay', pa.timestamp('ns')),
+        pa.field('LogDate', pa.timestamp('ns')), pa.field('PL', pa.float64()), pa.field('SPX', pa.float64()),
+    ])
+
+def get_history_cache_path(config):
+    """
+    Directory of the history cache: `history_cache_path` from config.yaml, or
+    a folder next to config.yaml.
+    """
+    return config.get('history_cache_path') or os.path.join(
+        os.path.dirname(get_config_path()), CACHE_DIRNAME
+    )
+
+def _partition_path(cache_dir, table, day):
+    return os.path.join(cache_dir, table, f"{day:%Y-%m-%d}.arrow")
+
+def read_manifest(cache_dir):
+    """
+    The cache's manifest: days through `synced_through` are cached, except
+    the `pending` ones (exported once their open trades are closed). Days
+    without a partition in that range had no data.
+
+    The cached dates are decoded with the year forced to `decoded_year` (see
+    utils.filetime_series_to_datetime); the cache is rebuilt in a new year.
+    """
+    path = os.path.join(cache_dir, MANIFEST_FILENAME)
+    if not os.path.exists(path):
+        return {'version': CACHE_VERSION, 'decoded_year': datetime.now().year,
+                'synced_through': None, 'pending': []}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def _write_manifest(cache_dir, manifest):
+    path = os.path.join(cache_dir, MANIFEST_FILENAME)
+    with open(f"{path}.tmp", 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(f"{path}.tmp", path)
+
+def _write_partition(pa, path, df, schema):
+    table = pa.Table.from_pandas(df, schema=schema, preserve_index=False)
+    with pa.OSFile(f"{path}.tmp", 'wb') as sink:
+        with pa.ipc.new_file(sink, schema) as writer:
+            writer.write_table(table)
+    os.replace(f"{path}.tmp", path)
+
+def _as_date(value):
+    return value.date() if isinstance(value, datetime) else value
+
+def _as_datetime(day):
+    return datetime.combine(day, datetime.min.time())
+
+def _parse_day(text):
+    return datetime.strptime(text, "%Y-%m-%d").date()
+
+def _first_history_day(connection):
+    first_trade_key = connection.execute(
+        "SELECT MIN(Year * 10000 + Month * 100 + Day) FROM Trade WHERE TATTradeID IS NOT NULL;"
+    ).fetchone()[0]
+    first_log = connection.execute("SELECT MIN(LogDate) FROM DailyLog;").fetchone()[0]
+
+    days = []
+    if first_trade_key:
+        days.append(datetime.strptime(str(first_trade_key), "%Y%m%d").date())
+    if first_log:
+        days.append(filetime_series_to_day([first_log]).iloc[0].date())
+    return min(days) if days else None
+
+def _month_windows(first_day, last_day):
+    windows = []
+    window_start = first_day
+    while window_start <= last_day:
+        next_month = (window_start.replace(day=1) + timedelta(days=32)).replace(day=1)
+        window_end = min(next_month - timedelta(days=1), last_day)
+        windows.append((window_start, window_end))
+        window_start = window_end + timedelta(days=1)
+    return windows
+
+def _open_trade_days(connection, first_day, last_day):
+    rows = connection.execute(
+        """
+        SELECT DISTINCT Year * 10000 + Month * 100 + Day FROM Trade
+        WHERE ClosingProcessed IS NULL AND TATTradeID IS NOT NULL
+          AND (Year * 10000 + Month * 100 + Day) BETWEEN ? AND ?;
+        """,
+        (date_key(first_day), date_key(last_day))
+    ).fetchall()
+    return {datetime.strptime(str(row[0]), "%Y%m%d").date() for row in rows}
+
+def _export_days(pa, connection, cache_dir, first_day, last_day):
+    """
+    Write the partitions of the days from first_day through last_day that
+    have data and no open trades.
+
+    The days with open trades are not read at all: their NULL DateClosed
+    values would turn the column into floats, which cannot hold FILETIMEs to
+    the microsecond, for the whole frame.
+
+    :return: Tuple of (exported days, days left pending).
+    """
+    import pandas as pd
+
+    pending = _open_trade_days(connection, first_day, last_day)
+    days = [first_day + timedelta(days=offset) for offset in range((last_day - first_day).days + 1)]
+    trade_parts = [get_trades_range(connection, _as_datetime(first), _as_datetime(last))
+                   for first, last in day_runs([day for day in days if day not in pending])]
+    log_parts = list(iter_daily_log(connection, _as_datetime(first_day), _as_datetime(last_day)))
+
+    trades_by_day = {day.date(): group for part in trade_parts for day, group in part.groupby('TradeDate')}
+    logs_by_day = {day.date(): group for part in log_parts for day, group in part.groupby('LogDay')}
+    empty_trades = trade_parts[0].iloc[:0] if trade_parts else None
+    empty_log = pd.DataFrame(columns=DAILY_LOG_COLUMNS).astype(DAILY_LOG_DTYPES)
+
+    exported = []
+    trade_schema, daily_log_schema = _trade_schema(pa), _daily_log_schema(pa)
+    for day in sorted((set(trades_by_day) | set(logs_by_day)) - pending):
+        _write_partition(pa, _partition_path(cache_dir, TRADES_TABLE, day),
+                         trades_by_day.get(day, empty_trades), trade_schema)
+        _write_partition(pa, _partition_path(cache_dir, DAILY_LOG_TABLE, day),
+                         logs_by_day.get(day, empty_log)[DAILY_LOG_COLUMNS], daily_log_schema)
+        exported.append(day)
+    return exported, sorted(pending)
+
+@profiled
+def sync_history_cache(connection, cache_dir, today=None):
+    """
+    Export the finished days (before `today`) that are not cached yet. The
+    first sync exports the whole history month by month; later ones only the
+    days since the previous sync and those that were pending.
+
+    A day with open trades (ClosingProcessed NULL) stays pending and is read
+    from SQLite until a later sync exports it. Partitions are never rewritten.
+
+    :return: Sorted list of the days exported by this sync.
+    """
+    pa = _import_pyarrow()
+    today = _as_date(today or datetime.now())
+    last_day = today - timedelta(days=1)
+
+    manifest = read_manifest(cache_dir)
+    if manifest.get('version') != CACHE_VERSION or manifest.get('decoded_year') != datetime.now().year:
+        print(f"Rebuilding the history cache at {cache_dir}.")
+        for table in (TRADES_TABLE, DAILY_LOG_TABLE):
+            shutil.rmtree(os.path.join(cache_dir, table), ignore_errors=True)
+        manifest = {'version': CACHE_VERSION, 'decoded_year': datetime.now().year,
+                    'synced_through': None, 'pending': []}
+    for table in (TRADES_TABLE, DAILY_LOG_TABLE):
+        os.makedirs(os.path.join(cache_dir, table), exist_ok=True)
+
+    pending_days = {_parse_day(day) for day in manifest['pending']}
+    synced_through = _parse_day(manifest['synced_through']) if manifest['synced_through'] else None
+    first_day = synced_through + timedelta(days=1) if synced_through else _first_history_day(connection)
+
+    exported, still_pending = [], set()
+    for day in sorted(pending_days):
+        day_exported, day_pending = _export_days(pa, connection, cache_dir, day, day)
+        exported += day_exported
+        still_pending.update(day_pending)
+    if first_day is not None:
+        for window_start, window_end in _month_windows(first_day, last_day):
+            window_exported, window_pending = _export_days(pa, connection, cache_dir, window_start, window_end)
+            exported += window_exported
+            still_pending.update(window_pending)
+
+    if first_day is not None or synced_through is not None:
+        manifest['synced_through'] = max(filter(None, [synced_through, last_day])).strftime("%Y-%m-%d")
+    manifest['pending'] = sorted(day.strftime("%Y-%m-%d") for day in still_pending)
+    _write_manifest(cache_dir, manifest)
+    return sorted(exported)
+
+def _split_cached(cache_dir, table, start_date, end_date):
+    """
+    Split start_date through end_date into the cached partitions of `table`
+    and the ranges of days that must be read from SQLite: the pending days
+    and those after the last sync.
+
+    :return: Tuple of (partition paths in date order, list of (first, last)
+             date ranges).
+    """
+    manifest = read_manifest(cache_dir)
+    synced_through = _parse_day(manifest['synced_through']) if manifest.get('synced_through') else None
+    pending = {_parse_day(day) for day in manifest.get('pending', [])}
+    start_day, end_day = _as_date(start_date), _as_date(end_date)
+
+    paths = []
+    table_dir = os.path.join(cache_dir, table)
+    # Only days with data have a partition; list them instead of probing every day
+    for filename in sorted(os.listdir(table_dir)) if synced_through and os.path.isdir(table_dir) else []:
+        day = _parse_day(filename[:-len('.arrow')]) if filename.endswith('.arrow') else None
+        if day and start_day <= day <= min(end_day, synced_through) and day not in pending:
+            paths.append(os.path.join(table_dir, filename))
+
+    live_ranges = day_runs(sorted(day for day in pending if start_day <= day <= end_day))
+    first_live_day = max(start_day, synced_through + timedelta(days=1)) if synced_through else start_day
+    if first_live_day <= end_day:
+        live_ranges.append((first_live_day, end_day))
+    return paths, live_ranges
+
+def _read_partitions(pa, paths, columns):
+    """
+    Memory-map the partitions at `paths` and read `columns` of them into one
+    DataFrame, or None when they hold no rows.
+    """
+    tables = []
+    for path in paths:
+        with pa.memory_map(path, 'r') as source:
+            partition = pa.ipc.open_file(source).read_all().select(columns)
+        if partition.num_rows:
+            tables.append(partition)
+    if not tables:
+        return None
+    df = pa.concat_tables(tables).to_pandas()
+    add_rows(len(df))
+    return df
+
+@profiled
+def load_trades(connection, cache_dir, start_date, end_date, columns=None):
+    """
+    get_trades_range from the cache: cached days are read from their
+    memory-mapped partitions (only `columns`), the other days (today,
+    pending days and anything not synced yet) from SQLite.
+
+    :return: DataFrame like db_handler.get_trades_range, in date order.
+    """
+    import pandas as pd
+
+    pa = _import_pyarrow()
+    columns = list(columns) if columns is not None else list(TRADE_COLUMNS)
+    unknown = [column for column in columns if column not in TRADE_COLUMNS]
+    if unknown:
+        raise ValueError(f"Unknown trade column(s): {', '.join(unknown)}")
+
+    paths, live_ranges = _split_cached(cache_dir, TRADES_TABLE, start_date, end_date)
+    parts = [_read_partitions(pa, paths, columns + ['TradeDate'])]
+    parts += [get_trades_range(connection, _as_datetime(first), _as_datetime(last), columns)
+              for first, last in live_ranges]
+    parts = [part for part in parts if part is not None and not part.empty]
+    if not parts:
+        return get_trades_range(connection, _as_datetime(_as_date(start_date)), _as_datetime(_as_date(start_date)),
+                                columns).iloc[:0]
+
+    df_trades = pd.concat(parts, ignore_index=True) if len(parts) > 1 else parts[0]
+    df_trades = df_trades.sort_values('TradeDate', kind='stable', ignore_index=True)
+    return compact_trade_dtypes(df_trades)[columns + ['TradeDate']]
+
+@profiled
+def load_daily_log(connection, cache_dir, start_date, end_date):
+    """
+    The DailyLog rows from start_date through end_date, cached days from
+    their memory-mapped partitions and the others from SQLite.
+
+    :return: DataFrame with DAILY_LOG_COLUMNS (see db_handler.iter_daily_log),
+             in date order.
+    """
+    import pandas as pd
+
+    pa = _import_pyarrow()
+    paths, live_ranges = _split_cached(cache_dir, DAILY_LOG_TABLE, start_date, end_date)
+    parts = [_read_partitions(pa, paths, DAILY_LOG_COLUMNS)]
+    for first, last in live_ranges:
+        parts += list(iter_daily_log(connection, _as_datetime(first), _as_datetime(last)))
+    parts = [part for part in parts if part is not None and not part.empty]
+    if not parts:
+        return pd.DataFrame({column: pd.Series(dtype=dtype) for column, dtype in DAILY_LOG_DTYPES.items()})
+
+    df_daily_log = pd.concat(parts, ignore_index=True)
+    return df_daily_log.sort_values(['LogDay', 'LogDate'], kind='stable', ignore_index=True)[DAILY_LOG_COLUMNS]
+
+def main():
+    config = load_yaml_config()
+    cache_dir = get_history_cache_path(config)
+    with connect_db() as connection, read_transaction(connection):
+        exported = sync_history_cache(connection, cache_dir)
+    print(f"Exported {len(exported)} day(s) to {os.path.abspath(cache_dir)}.")
+
+if __name__ == "__main__":
+    main()
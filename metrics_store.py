@@ -0,0 +1,316 @@
+import os
+import sqlite3
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from db_handler import SQLITE_MAX_PARAMS, iter_trades_on_days, iter_trades_range
+from profiler import profiled
+from utils import (
+    METRIC_COLUMNS, METRIC_INPUT_COLUMNS, FILETIME_TICKS_PER_DAY, calculate_daily_metrics_chunked,
+    execute_with_retry, get_config_path, get_metrics_backend, load_yaml_config, query_daily_metrics
+)
+
+STORE_FILENAME = 'metrics_store.db3'
+FILETIME_DAY_ZERO = datetime(1601, 1, 1)  # LogDate // FILETIME_TICKS_PER_DAY counts days from here
+
+STORE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS daily_metrics (
+    TradeDate TEXT PRIMARY KEY,
+    premium_sold REAL, premium_captured REAL, pcr REAL, win_rate REAL,
+    expired_trades INTEGER, stops INTEGER, bad_slip INTEGER,
+    bad_slip_max REAL, negative_exp INTEGER
+);
+CREATE TABLE IF NOT EXISTS daily_log_last (
+    LogDay TEXT PRIMARY KEY,
+    LogDate INTEGER, PL REAL, SPX REAL
+);
+CREATE TABLE IF NOT EXISTS open_trades (
+    TradeID INTEGER PRIMARY KEY,
+    TradeDate TEXT
+);
+CREATE TABLE IF NOT EXISTS watermarks (
+    name TEXT PRIMARY KEY,
+    value INTEGER
+);
+"""
+
+class MetricsStore:
+    """
+    Local SQLite sidecar holding per-day metrics and last-of-day DailyLog rows
+    of finished days (before `today`), so reports only read today's rows from
+    the TAT database.
+
+    refresh() is incremental. A day is recomputed when it gains a trade with a
+    TradeID above the stored watermark, when one of its trades that was still
+    open (ClosingProcessed NULL) changes state, or when it was the in-progress
+    day at the previous refresh. DailyLog is append-only, so only rows above
+    the DailyLogID watermark are read.
+    """
+
+    def __init__(self, path, today=None):
+        self.path = path
+        self.today = _as_date(today or datetime.now())
+        self.connection = sqlite3.connect(path)
+        self.connection.executescript(STORE_SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    def is_finished(self, date):
+        return _as_date(date) < self.today
+
+    @profiled
+    def refresh(self, connection):
+        """
+        Bring the store up to date with the TAT database behind `connection`.
+
+        :return: Sorted list of the finished days whose metrics were recomputed.
+        """
+        dirty_days = self._find_dirty_trade_days(connection)
+        finished_days = sorted(day for day in dirty_days if self.is_finished(day))
+        if finished_days:
+            self._recompute_trade_days(connection, finished_days)
+
+        self._refresh_daily_log(connection)
+        self._set_watermark('refreshed_through', _day_number(self.today))
+        self.connection.commit()
+        return finished_days
+
+    def get_daily_metrics(self, start_date, end_date):
+        """
+        Stored per-day metrics from start_date through end_date, in the shape
+        of utils.calculate_daily_metrics.
+        """
+        df = pd.read_sql_query(
+            f"SELECT TradeDate, {', '.join(METRIC_COLUMNS)} FROM daily_metrics "
+            "WHERE TradeDate BETWEEN ? AND ? ORDER BY TradeDate;",
+            self.connection,
+            params=(_day_text(start_date), _day_text(end_date)),
+        )
+        df['TradeDate'] = pd.to_datetime(df['TradeDate'])
+        return df.set_index('TradeDate')[METRIC_COLUMNS]
+
+    def get_last_of_day_logs(self, start_date, end_date):
+        """
+        Stored last DailyLog row of each day from start_date through end_date.
+
+        :return: DataFrame with LogDay (Timestamp), LogDate (FILETIME), PL and SPX.
+        """
+        df = pd.read_sql_query(
+            "SELECT LogDay, LogDate, PL, SPX FROM daily_log_last "
+            "WHERE LogDay BETWEEN ? AND ? ORDER BY LogDay;",
+            self.connection,
+            params=(_day_text(start_date), _day_text(end_date)),
+        )
+        df['LogDay'] = pd.to_datetime(df['LogDay'])
+        return df
+
+    def get_last_spx(self, date):
+        row = self.connection.execute(
+            "SELECT SPX FROM daily_log_last WHERE LogDay = ?;", (_day_text(date),)
+        ).fetchone()
+        return row[0] if row else None
+
+    def _find_dirty_trade_days(self, connection):
+        dirty_days = set()
+
+        # Trades added since the last refresh
+        trade_watermark = self._get_watermark('trade_id')
+        new_trades = execute_with_retry(
+            connection, "SELECT TradeID, Year, Month, Day FROM Trade WHERE TradeID > ?;", (trade_watermark,)
+        )
+        for trade_id, year, month, day in new_trades:
+            if year and month and day:
+                dirty_days.add(datetime(year, month, day).date())
+        if new_trades:
+            self._set_watermark('trade_id', max(row[0] for row in new_trades))
+
+        # Trades that were still open and have since been processed or removed
+        open_trades = dict(self.connection.execute("SELECT TradeID, TradeDate FROM open_trades;").fetchall())
+        still_open = set()
+        open_ids = list(open_trades)
+        for i in range(0, len(open_ids), SQLITE_MAX_PARAMS):
+            chunk = open_ids[i:i + SQLITE_MAX_PARAMS]
+            placeholders = ', '.join('?' * len(chunk))
+            still_open.update(row[0] for row in execute_with_retry(
+                connection,
+                f"SELECT TradeID FROM Trade WHERE TradeID IN ({placeholders}) AND ClosingProcessed IS NULL;",
+                chunk,
+            ))
+        for trade_id, trade_date in open_trades.items():
+            if trade_id not in still_open:
+                dirty_days.add(datetime.strptime(trade_date, "%Y-%m-%d").date())
+
+        # The day that was still in progress at the previous refresh
+        refreshed_through = self._get_watermark('refreshed_through')
+        if refreshed_through:
+            dirty_days.add(_day_from_number(refreshed_through))
+
+        return dirty_days
+
+    def _recompute_trade_days(self, connection, days):
+        # The first refresh covers the whole history, so the trades are read in chunks;
+        # later ones only read the dirty days, however far apart they are
+        open_parts = []
+
+        def dirty_day_chunks():
+            for df_trades in iter_trades_on_days(connection, days, columns=['TradeID'] + METRIC_INPUT_COLUMNS):
+                open_parts.append(df_trades.loc[df_trades['ClosingProcessed'].isna(), ['TradeID', 'TradeDate']])
+                yield df_trades
+
+        daily_metrics = calculate_daily_metrics_chunked(dirty_day_chunks())
+
+        day_texts = [_day_text(day) for day in days]
+        self.connection.executemany("DELETE FROM daily_metrics WHERE TradeDate = ?;", [(d,) for d in day_texts])
+        self.connection.executemany("DELETE FROM open_trades WHERE TradeDate = ?;", [(d,) for d in day_texts])
+
+        self.connection.executemany(
+            f"INSERT INTO daily_metrics (TradeDate, {', '.join(METRIC_COLUMNS)}) "
+            f"VALUES (?, {', '.join('?' * len(METRIC_COLUMNS))});",
+            [
+                (_day_text(trade_date), *(_to_python(value) for value in row))
+                for trade_date, row in zip(daily_metrics.index, daily_metrics.itertuples(index=False))
+            ],
+        )
+
+        open_rows = pd.concat(open_parts)
+        self.connection.executemany(
+            "INSERT OR REPLACE INTO open_trades (TradeID, TradeDate) VALUES (?, ?);",
+            [(int(trade_id), _day_text(trade_date))
+             for trade_id, trade_date in zip(open_rows['TradeID'], open_rows['TradeDate'])],
+        )
+
+    def _refresh_daily_log(self, connection):
+        log_watermark = self._get_watermark('daily_log_id')
+        max_log_id = execute_with_retry(connection, "SELECT MAX(DailyLogID) FROM DailyLog;")[0][0]
+        if max_log_id is None or max_log_id <= log_watermark:
+            return
+
+        # SQLite returns the bare PL/SPX columns from the row holding MAX(LogDate)
+        rows = execute_with_retry(
+            connection,
+            """
+            SELECT LogDate / ? AS DayNumber, MAX(LogDate), PL, SPX
+            FROM DailyLog
+            WHERE DailyLogID > ? AND DailyLogID <= ? AND LogDate IS NOT NULL
+            GROUP BY DayNumber;
+            """,
+            (FILETIME_TICKS_PER_DAY, log_watermark, max_log_id),
+        )
+        self.connection.executemany(
+            """
+            INSERT INTO daily_log_last (LogDay, LogDate, PL, SPX) VALUES (?, ?, ?, ?)
+            ON CONFLICT(LogDay) DO UPDATE SET LogDate = excluded.LogDate, PL = excluded.PL, SPX = excluded.SPX
+            WHERE excluded.LogDate >= daily_log_last.LogDate;
+            """,
+            [(_day_text(_filetime_day(day_number)), log_date, pl, spx)
+             for day_number, log_date, pl, spx in rows],
+        )
+        self._set_watermark('daily_log_id', max_log_id)
+
+    def _get_watermark(self, name):
+        row = self.connection.execute("SELECT value FROM watermarks WHERE name = ?;", (name,)).fetchone()
+        return row[0] if row else 0
+
+    def _set_watermark(self, name, value):
+        self.connection.execute(
+            "INSERT OR REPLACE INTO watermarks (name, value) VALUES (?, ?);", (name, int(value))
+        )
+
+def get_metrics_store_path(config):
+    """
+    Path of the metrics store: `metrics_store_path` from config.yaml, or a file
+    next to config.yaml.
+    """
+    return config.get('metrics_store_path') or os.path.join(
+        os.path.dirname(get_config_path()), STORE_FILENAME
+    )
+
+@contextmanager
+def open_metrics_store(config=None):
+    """
+    Context manager yielding the MetricsStore configured in config.yaml, or
+    None when `metrics_store` is not enabled.
+    Usage:
+        with open_metrics_store() as store:
+            # 'store' may be None
+    """
+    config = config if config is not None else load_yaml_config()
+    if not config.get('metrics_store'):
+        yield None
+        return
+
+    store = MetricsStore(get_metrics_store_path(config))
+    try:
+        yield store
+    finally:
+        store.close()
+
+def split_finished_range(start_date, end_date, store):
+    """
+    Split [start_date, end_date] into the part the store can answer (finished
+    days) and the part that must be read live.
+
+    :return: Tuple of (finished_range, live_range); each is a (start, end)
+             date tuple or None when empty.
+    """
+    start_day, end_day = _as_date(start_date), _as_date(end_date)
+    if end_day < start_day:
+        return None, None
+    if store is None:
+        return None, (start_day, end_day)
+
+    last_finished = store.today - timedelta(days=1)
+    finished = (start_day, min(end_day, last_finished)) if start_day <= last_finished else None
+    live = (max(start_day, store.today), end_day) if end_day >= store.today else None
+    return finished, live
+
+def compute_daily_metrics(connection, start_date, end_date, backend=None):
+    """
+    Per-day metrics of the live database from start_date through end_date,
+    with the configured backend (see utils.get_metrics_backend): the trade
+    rows the metrics need streamed through pandas in chunks, or aggregates
+    computed by SQLite.
+    """
+    if (backend or get_metrics_backend()) == 'sql':
+        return query_daily_metrics(connection, start_date, end_date)
+    return calculate_daily_metrics_chunked(
+        iter_trades_range(connection, start_date, end_date, columns=METRIC_INPUT_COLUMNS)
+    )
+
+@profiled
+def load_daily_metrics(connection, start_date, end_date, store=None, backend=None):
+    """
+    Per-day metrics (see utils.calculate_daily_metrics) from start_date through
+    end_date: finished days come from the store, the rest from the live
+    database.
+    """
+    finished, live = split_finished_range(start_date, end_date, store)
+    parts = []
+    if finished:
+        parts.append(store.get_daily_metrics(*finished))
+    if live:
+        parts.append(compute_daily_metrics(connection, *live, backend))
+    if not parts:
+        return compute_daily_metrics(connection, start_date, end_date, backend)
+    return pd.concat(parts) if len(parts) > 1 else parts[0]
+
+def _as_date(value):
+    return value.date() if isinstance(value, datetime) else value
+
+def _day_text(value):
+    return _as_date(value).strftime("%Y-%m-%d")
+
+def _day_number(day):
+    return day.toordinal()
+
+def _day_from_number(number):
+    return datetime.fromordinal(number).date()
+
+def _filetime_day(day_number):
+    return (FILETIME_DAY_ZERO + timedelta(days=day_number)).date()
+
+def _to_python(value):
+    return value.item() if hasattr(value, 'item') else value
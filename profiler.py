@@ -0,0 +1,195 @@
+import cProfile
+import functools
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+
+_active = None  # The running Profiler, or None when profiling is off
+
+class Profiler:
+    """
+    Records one entry per executed stage: wall time, rows read from the
+    database and peak memory allocated above the stage's starting point.
+
+    Stages nest per thread; rows and peak memory of a stage include those of
+    the stages inside it.
+    """
+
+    def __init__(self, trace_memory=True):
+        self.trace_memory = trace_memory
+        self.started = datetime.now()
+        self.start_time = time.perf_counter()
+        self.end_time = None
+        self.records = []
+        self.lock = threading.Lock()
+        self.local = threading.local()
+
+    def _stack(self):
+        if not hasattr(self.local, 'stack'):
+            self.local.stack = []
+        return self.local.stack
+
+    @contextmanager
+    def stage(self, name):
+        stack = self._stack()
+        parent = stack[-1] if stack else None
+        record = {
+            'name': name,
+            'parent': parent['name'] if parent else None,
+            'depth': len(stack),
+            'thread': threading.current_thread().name,
+            'start': time.perf_counter() - self.start_time,
+            'seconds': None,
+            'rows': 0,
+            'peak_memory_bytes': None,
+            '_inner_peak': 0,
+        }
+        if self.trace_memory:
+            current, peak = tracemalloc.get_traced_memory()
+            if parent:
+                parent['_inner_peak'] = max(parent['_inner_peak'], peak)
+            record['_memory_start'] = current
+            tracemalloc.reset_peak()
+
+        with self.lock:
+            self.records.append(record)
+        stack.append(record)
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record['seconds'] = time.perf_counter() - start
+            stack.pop()
+            if self.trace_memory:
+                peak = max(tracemalloc.get_traced_memory()[1], record['_inner_peak'])
+                record['peak_memory_bytes'] = max(peak - record['_memory_start'], 0)
+                if parent:
+                    parent['_inner_peak'] = max(parent['_inner_peak'], peak)
+                tracemalloc.reset_peak()
+            if parent:
+                parent['rows'] += record['rows']
+
+    def add_rows(self, rows):
+        stack = self._stack()
+        if stack:
+            stack[-1]['rows'] += rows
+
+    def summary(self):
+        """
+        Totals per stage name: calls, seconds, rows and the largest peak.
+        """
+        totals = {}
+        for record in self.records:
+            if record['seconds'] is None:
+                continue
+            total = totals.setdefault(record['name'], {'calls': 0, 'seconds': 0.0, 'rows': 0, 'peak_memory_bytes': 0})
+            total['calls'] += 1
+            total['seconds'] += record['seconds']
+            total['rows'] += record['rows']
+            total['peak_memory_bytes'] = max(total['peak_memory_bytes'], record['peak_memory_bytes'] or 0)
+        return totals
+
+    def to_dict(self):
+        end_time = self.end_time or time.perf_counter()
+        return {
+            'started': self.started.isoformat(timespec='seconds'),
+            'argv': sys.argv,
+            'total_seconds': end_time - self.start_time,
+            'stages': [{key: value for key, value in record.items() if not key.startswith('_')}
+                       for record in self.records],
+            'summary': self.summary(),
+        }
+
+    def write_trace(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    def print_summary(self):
+        print(f"{'stage':<48} {'calls':>5} {'seconds':>9} {'rows':>9} {'peak MB':>8}")
+        for name, total in sorted(self.summary().items(), key=lambda item: -item[1]['seconds']):
+            print(f"{name:<48} {total['calls']:>5} {total['seconds']:>9.3f} {total['rows']:>9} "
+                  f"{total['peak_memory_bytes'] / 1e6:>8.1f}")
+
+def start_profiling(trace_memory=True):
+    global _active
+    _active = Profiler(trace_memory)
+    _active.started_tracing = trace_memory and not tracemalloc.is_tracing()
+    if _active.started_tracing:
+        tracemalloc.start()
+    return _active
+
+def stop_profiling():
+    global _active
+    profiler, _active = _active, None
+    if profiler is not None:
+        profiler.end_time = time.perf_counter()
+        if profiler.started_tracing:
+            tracemalloc.stop()
+    return profiler
+
+@contextmanager
+def stage(name):
+    """
+    Time the enclosed block as stage `name` when profiling is on.
+    """
+    if _active is None:
+        yield None
+    else:
+        with _active.stage(name) as record:
+            yield record
+
+def add_rows(rows):
+    """
+    Count `rows` read from the database towards the current stage.
+    """
+    if _active is not None:
+        _active.add_rows(rows)
+
+def profiled(func):
+    """
+    Decorator recording every call of `func` as a stage named after its module
+    and name. Costs one check per call while profiling is off.
+    """
+    module = func.__module__
+    if module == '__main__':
+        # Name stages of a script run directly after its file, e.g. Trade_Scout
+        module = os.path.splitext(os.path.basename(sys.modules[module].__file__))[0]
+    name = f"{module}.{func.__qualname__}"
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if _active is None:
+            return func(*args, **kwargs)
+        with _active.stage(name):
+            return func(*args, **kwargs)
+    return wrapper
+
+@contextmanager
+def profiling(trace_path=None, cprofile_path=None):
+    """
+    Profile the enclosed block: write the JSON stage trace to `trace_path`
+    and, optionally, a cProfile dump (readable with pstats or snakeviz) to
+    `cprofile_path`.
+    """
+    profiler = start_profiling()
+    cprofiler = cProfile.Profile() if cprofile_path else None
+    if cprofiler:
+        cprofiler.enable()
+    try:
+        with profiler.stage('total'):
+            yield profiler
+    finally:
+        if cprofiler:
+            cprofiler.disable()
+            cprofiler.dump_stats(cprofile_path)
+            print(f"cProfile stats written to {os.path.abspath(cprofile_path)}.")
+        stop_profiling()
+        profiler.print_summary()
+        if trace_path:
+            profiler.write_trace(trace_path)
+            print(f"Profile trace written to {os.path.abspath(trace_path)}.")
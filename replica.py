@@ -0,0 +1,212 @@
+import os
+import sqlite3
+import time
+from pathlib import Path
+
+from profiler import profiled
+from utils import get_config_path, is_database_locked_error, run_with_lock_retry
+
+REPLICA_FILENAME = 'tat_replica.db3'
+DEFAULT_REPLICA_CHECK_HOURS = 24  # hours between two comparisons of REPLICA_CHECKSUMS
+
+# Indexes for TradeScout's queries; TAT's own file only has the rowid keys.
+# The day-key index covers the metric columns, so the range reports and the
+# SQL metrics backend never touch the table rows.
+REPLICA_INDEXES = """
+CREATE INDEX IF NOT EXISTS idx_trade_day ON Trade (Year, Month, Day);
+CREATE INDEX IF NOT EXISTS idx_trade_day_key_metrics ON Trade (
+    (Year * 10000 + Month * 100 + Day), Year, Month, Day, TATTradeID,
+    TotalPremium, ProfitLoss, ClosingProcessed, PriceClose, PriceStopTarget
+);
+CREATE INDEX IF NOT EXISTS idx_trade_unsettled ON Trade (TradeID)
+    WHERE ClosingProcessed IS NULL OR TATTradeID IS NULL;
+CREATE INDEX IF NOT EXISTS idx_daily_log_date ON DailyLog (LogDate, PL, SPX);
+"""
+
+REPLICA_STATE = "CREATE TABLE IF NOT EXISTS main.replica_sync (checked_at REAL NOT NULL);"
+
+# Fingerprints of the tables' contents. The incremental sync only revisits new
+# and unsettled rows; TAT editing or deleting any other row changes these, and
+# the replica is then rebuilt. NOT INDEXED sums both sides in rowid order, so
+# equal contents give bit-identical totals. An edit that leaves every summed
+# column unchanged (e.g. only StopType) goes unnoticed until the next rebuild.
+# Computing them reads every row of both files, so it is only done once per
+# `replica_check_hours` (see get_replica_check_interval); the time of the last
+# comparison is kept in the replica's replica_sync table.
+REPLICA_CHECKSUMS = {
+    'Trade': "COUNT(*), TOTAL(TATTradeID), TOTAL(ProfitLoss), TOTAL(TotalPremium), TOTAL(PriceClose), "
+             "TOTAL(PriceStopTarget), TOTAL(ClosingProcessed), TOTAL(DateOpened), TOTAL(DateClosed)",
+    'DailyLog': "COUNT(*), TOTAL(LogDate), TOTAL(PL), TOTAL(SPX)",
+}
+
+def get_replica_path(config):
+    """
+    Path of the replica: `replica_path` from config.yaml, or a file next to
+    config.yaml.
+    """
+    return config.get('replica_path') or os.path.join(
+        os.path.dirname(get_config_path()), REPLICA_FILENAME
+    )
+
+def get_replica_check_interval(config):
+    """
+    Seconds between two checksum comparisons of the replica with TAT's file:
+    `replica_check_hours` from config.yaml, DEFAULT_REPLICA_CHECK_HOURS by
+    default. 0 compares them on every sync.
+    """
+    return float(config.get('replica_check_hours', DEFAULT_REPLICA_CHECK_HOURS)) * 3600
+
+def _source_uri(source_path):
+    return f"{Path(source_path).resolve().as_uri()}?mode=ro"
+
+def _copy_database(source_path, replica_path, busy_timeout_ms):
+    """
+    Full copy with the online backup API into a temporary file, indexed and
+    analyzed, then moved over `replica_path`.
+    """
+    temp_path = f"{replica_path}.tmp"
+    if os.path.exists(temp_path):
+        os.remove(temp_path)
+
+    source = sqlite3.connect(_source_uri(source_path), uri=True, timeout=busy_timeout_ms / 1000)
+    replica = sqlite3.connect(temp_path)
+    try:
+        run_with_lock_retry(lambda: source.backup(replica))
+        replica.executescript(REPLICA_INDEXES)
+        replica.execute("ANALYZE;")
+        # A fresh copy is in sync by definition
+        _record_check(replica)
+        replica.commit()
+    finally:
+        replica.close()
+        source.close()
+    os.replace(temp_path, replica_path)
+
+def _max_id(connection, table, column):
+    return connection.execute(f"SELECT COALESCE(MAX({column}), 0) FROM {table};").fetchone()[0]
+
+def _checksums(connection, schema):
+    return [
+        connection.execute(f"SELECT {columns} FROM {schema}.{table} NOT INDEXED;").fetchone()
+        for table, columns in REPLICA_CHECKSUMS.items()
+    ]
+
+def _last_check(replica):
+    replica.execute(REPLICA_STATE)
+    return replica.execute("SELECT MAX(checked_at) FROM main.replica_sync;").fetchone()[0]
+
+def _record_check(replica):
+    replica.execute(REPLICA_STATE)
+    replica.execute("DELETE FROM main.replica_sync;")
+    replica.execute("INSERT INTO main.replica_sync (checked_at) VALUES (?);", (time.time(),))
+
+def _copy_new_rows(replica):
+    """
+    Bring the replica's Trade and DailyLog up to date with the attached TAT
+    database `tat`.
+
+    :return: Number of rows copied or replaced.
+    """
+    changed = 0
+    last_trade_id = _max_id(replica, 'main.Trade', 'TradeID')
+    last_log_id = _max_id(replica, 'main.DailyLog', 'DailyLogID')
+
+    # Trades TAT may still update: open ones and ones without a TAT trade id yet
+    unsettled = [row[0] for row in replica.execute(
+        "SELECT TradeID FROM main.Trade WHERE ClosingProcessed IS NULL OR TATTradeID IS NULL;"
+    )]
+    if unsettled:
+        replica.execute("CREATE TEMP TABLE IF NOT EXISTS unsettled (TradeID INTEGER PRIMARY KEY);")
+        replica.execute("DELETE FROM temp.unsettled;")
+        replica.executemany("INSERT INTO temp.unsettled (TradeID) VALUES (?);", [(i,) for i in unsettled])
+        replica.execute(
+            "DELETE FROM main.Trade WHERE TradeID IN (SELECT TradeID FROM temp.unsettled);"
+        )
+        changed += replica.execute(
+            "INSERT INTO main.Trade SELECT * FROM tat.Trade "
+            "WHERE TradeID IN (SELECT TradeID FROM temp.unsettled);"
+        ).rowcount
+
+    changed += replica.execute(
+        "INSERT INTO main.Trade SELECT * FROM tat.Trade WHERE TradeID > ?;", (last_trade_id,)
+    ).rowcount
+
+    # DailyLog is append-only
+    changed += replica.execute(
+        "INSERT INTO main.DailyLog SELECT * FROM tat.DailyLog WHERE DailyLogID > ?;", (last_log_id,)
+    ).rowcount
+    return changed
+
+def _sync_incremental(source_path, replica_path, busy_timeout_ms, check_interval):
+    """
+    Copy rows added or changed since the last sync, attaching the TAT database
+    read-only. Returns False when the replica cannot be brought up to date
+    this way (TAT's database was replaced, its schema changed, or settled
+    rows were edited or deleted, see REPLICA_CHECKSUMS). The checksums are
+    only compared when the last comparison is `check_interval` seconds old.
+    """
+    replica = sqlite3.connect(replica_path, uri=True, timeout=busy_timeout_ms / 1000)
+    try:
+        replica.execute(f"PRAGMA busy_timeout = {int(busy_timeout_ms)};")
+        replica.execute("ATTACH DATABASE ? AS tat;", (_source_uri(source_path),))
+
+        # A source behind the replica has been replaced or restored from a backup
+        if (_max_id(replica, 'tat.Trade', 'TradeID') < _max_id(replica, 'main.Trade', 'TradeID')
+                or _max_id(replica, 'tat.DailyLog', 'DailyLogID') < _max_id(replica, 'main.DailyLog', 'DailyLogID')):
+            return False
+
+        last_check = _last_check(replica)
+        verify = last_check is None or time.time() - last_check >= check_interval
+
+        def copy():
+            # One transaction: committed as a whole or rolled back for the retry. The
+            # checksums are read in it too, from the same snapshot of TAT's file.
+            with replica:
+                changed = _copy_new_rows(replica)
+                if not verify:
+                    return changed, True
+                in_sync = _checksums(replica, 'tat') == _checksums(replica, 'main')
+                if in_sync:
+                    _record_check(replica)
+                return changed, in_sync
+
+        changed, in_sync = run_with_lock_retry(copy)
+        if not in_sync:
+            print("Rows of the TAT database were edited or deleted since the last sync.")
+            return False
+        if changed:
+            replica.execute("PRAGMA optimize;")
+        return True
+    except sqlite3.OperationalError as e:
+        if is_database_locked_error(e):
+            raise
+        print(f"Incremental replica sync failed: {e}")
+        return False
+    finally:
+        replica.close()
+
+@profiled
+def sync_replica(source_path, replica_path, busy_timeout_ms=5000,
+                 check_interval=DEFAULT_REPLICA_CHECK_HOURS * 3600):
+    """
+    Bring the indexed local replica of the TAT database at `source_path` up
+    to date. The first sync copies the whole file with SQLite's online backup
+    API and adds REPLICA_INDEXES and ANALYZE statistics; later syncs copy new
+    rows and re-copy the trades TAT may still update, by rowid, and fall back
+    to a full copy when the table checksums show any other change. The
+    checksums scan both files, so they are only compared every
+    `check_interval` seconds; in between a sync only reads the new and
+    unsettled rows. TAT's file is only ever opened read-only.
+
+    :return: `replica_path`.
+    """
+    if not os.path.exists(source_path):
+        raise FileNotFoundError(f"Database file not found at {source_path}")
+
+    if (os.path.exists(replica_path)
+            and _sync_incremental(source_path, replica_path, busy_timeout_ms, check_interval)):
+        return replica_path
+
+    print(f"Creating the database replica at {replica_path}.")
+    _copy_database(source_path, replica_path, busy_timeout_ms)
+    return replica_path
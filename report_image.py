@@ -0,0 +1,194 @@
+import pandas as pd
+from PIL import Image, ImageDraw, ImageFont
+
+from db_handler import get_trades
+from PL_Summary import get_daily_log
+from profiler import profiled
+from screenshot import encode_image
+
+IMAGE_WIDTH = 960
+PADDING = 16
+FONT_SIZE = 14
+ROW_HEIGHT = 22
+CHART_HEIGHT = 260
+MAX_TABLE_ROWS = 40
+
+BACKGROUND = (24, 26, 31)
+ROW_SHADE = (33, 36, 43)
+GRID = (60, 64, 74)
+TEXT = (220, 222, 228)
+MUTED = (140, 145, 156)
+GAIN = (84, 200, 120)
+LOSS = (232, 92, 92)
+SPX_LINE = (110, 160, 240)
+
+# (header, width in pixels, right aligned)
+TABLE_COLUMNS = [
+    ("Opened", 70, False),
+    ("Type", 110, False),
+    ("Strikes", 150, False),
+    ("Qty", 40, True),
+    ("Open", 70, True),
+    ("Stop", 70, True),
+    ("Close", 70, True),
+    ("P/L", 90, True),
+    ("Status", 90, False),
+]
+
+# Fonts tried before falling back to Pillow's built-in bitmap font
+FONT_CANDIDATES = ["consola.ttf", "DejaVuSansMono.ttf", "LiberationMono-Regular.ttf"]
+
+_font = None
+
+def get_font():
+    global _font
+    if _font is None:
+        for name in FONT_CANDIDATES:
+            try:
+                _font = ImageFont.truetype(name, FONT_SIZE)
+                break
+            except OSError:
+                continue
+        else:
+            _font = ImageFont.load_default()
+    return _font
+
+def get_intraday_log(connection, date):
+    """
+    DailyLog rows (LogDate, PL, SPX) of `date` in time order.
+    """
+    return get_daily_log(connection, date, date)[['LogDate', 'PL', 'SPX']]
+
+def _strikes(trade):
+    legs = [(trade['ShortPut'], trade['LongPut']), (trade['ShortCall'], trade['LongCall'])]
+    return "  ".join(f"{short:g}/{long:g}" for short, long in legs if short)
+
+def _status(trade):
+    if pd.isna(trade['ClosingProcessed']) or pd.isna(trade['DateClosed']):
+        return "Open"
+    return {0: "Expired", 1: "Stopped"}.get(int(trade['ClosingProcessed']), "Closed")
+
+def _money(value):
+    return "" if pd.isna(value) else f"{value:,.2f}"
+
+def _table_rows(df_trades):
+    rows = []
+    for _, trade in df_trades.sort_values('DateOpened').iterrows():
+        opened = trade['DateOpened']
+        rows.append(([
+            "" if pd.isna(opened) else f"{opened:%H:%M}",
+            str(trade['TradeType'] or ""),
+            _strikes(trade),
+            "" if pd.isna(trade['Qty']) else f"{int(trade['Qty'])}",
+            _money(trade['PriceOpen']),
+            _money(trade['PriceStopTarget']),
+            _money(trade['PriceClose']),
+            _money(trade['ProfitLoss']),
+            _status(trade),
+        ], trade['ProfitLoss']))
+    return rows
+
+def _draw_text(draw, x, y, text, width, right, fill):
+    if right:
+        x += width - 8 - draw.textlength(text, font=get_font())
+    draw.text((x, y), text, font=get_font(), fill=fill)
+
+def _draw_table(draw, top, df_trades):
+    rows = _table_rows(df_trades)
+    x = PADDING
+    for header, width, right in TABLE_COLUMNS:
+        _draw_text(draw, x, top, header, width, right, MUTED)
+        x += width
+    y = top + ROW_HEIGHT
+    draw.line((PADDING, y - 4, IMAGE_WIDTH - PADDING, y - 4), fill=GRID)
+
+    for i, (cells, profit_loss) in enumerate(rows[:MAX_TABLE_ROWS]):
+        if i % 2:
+            draw.rectangle((PADDING, y - 2, IMAGE_WIDTH - PADDING, y + ROW_HEIGHT - 4), fill=ROW_SHADE)
+        x = PADDING
+        for (header, width, right), cell in zip(TABLE_COLUMNS, cells):
+            fill = TEXT
+            if header == "P/L" and not pd.isna(profit_loss) and profit_loss != 0:
+                fill = GAIN if profit_loss > 0 else LOSS
+            _draw_text(draw, x, y, cell, width, right, fill)
+            x += width
+        y += ROW_HEIGHT
+
+    if len(rows) > MAX_TABLE_ROWS:
+        draw.text((PADDING, y), f"... {len(rows) - MAX_TABLE_ROWS} more trade(s)", font=get_font(), fill=MUTED)
+        y += ROW_HEIGHT
+    if not rows:
+        draw.text((PADDING, y), "No trades.", font=get_font(), fill=MUTED)
+        y += ROW_HEIGHT
+    return y
+
+def _scale(values, low_px, high_px):
+    low, high = min(values), max(values)
+    span = (high - low) or 1.0
+    return [high_px - (value - low) / span * (high_px - low_px) for value in values]
+
+def _draw_chart(draw, top, df_log):
+    left, right = PADDING + 60, IMAGE_WIDTH - PADDING - 60
+    bottom = top + CHART_HEIGHT
+    draw.rectangle((left, top, right, bottom), outline=GRID)
+
+    df_log = df_log.dropna(subset=['LogDate'])
+    if len(df_log) < 2:
+        draw.text((left + 8, top + 8), "No intraday log.", font=get_font(), fill=MUTED)
+        return bottom + PADDING
+
+    seconds = (df_log['LogDate'] - df_log['LogDate'].iloc[0]).dt.total_seconds().tolist()
+    xs = [left + s / (seconds[-1] or 1.0) * (right - left) for s in seconds]
+
+    for column, color, label_x in (('SPX', SPX_LINE, right + 6), ('PL', None, PADDING)):
+        values = df_log[column].fillna(method='ffill').fillna(0).tolist()
+        ys = _scale(values, top + 8, bottom - 8)
+        if color is None:
+            color = GAIN if values[-1] >= 0 else LOSS
+            if min(values) < 0 < max(values):
+                zero_y = _scale(values + [0.0], top + 8, bottom - 8)[-1]
+                draw.line((left, zero_y, right, zero_y), fill=GRID)
+        draw.line(list(zip(xs, ys)), fill=color, width=2)
+        draw.text((label_x, top), f"{max(values):,.0f}", font=get_font(), fill=color)
+        draw.text((label_x, bottom - FONT_SIZE), f"{min(values):,.0f}", font=get_font(), fill=color)
+
+    first, last = df_log['LogDate'].iloc[0], df_log['LogDate'].iloc[-1]
+    draw.text((left, bottom + 4), f"{first:%H:%M}", font=get_font(), fill=MUTED)
+    _draw_text(draw, right - 80, bottom + 4, f"{last:%H:%M}", 88, True, MUTED)
+    draw.text((left + 8, top + 8), "PL", font=get_font(), fill=TEXT)
+    _draw_text(draw, right - 80, top + 8, "SPX", 80, True, SPX_LINE)
+    return bottom + ROW_HEIGHT + PADDING
+
+def render_report_image(df_trades, df_log, date):
+    """
+    Draw the day's trade table and intraday PL/SPX curve offscreen.
+
+    :param df_trades: Trades of the day as returned by db_handler.get_trades.
+    :param df_log: DailyLog rows of the day (see get_intraday_log).
+    :return: PIL image.
+    """
+    table_rows = min(len(df_trades), MAX_TABLE_ROWS) + 2
+    height = PADDING * 3 + ROW_HEIGHT * (table_rows + 2) + CHART_HEIGHT + ROW_HEIGHT * 2
+    image = Image.new('RGB', (IMAGE_WIDTH, height), BACKGROUND)
+    draw = ImageDraw.Draw(image)
+
+    total_pl = df_trades['ProfitLoss'].sum()
+    draw.text((PADDING, PADDING), f"Trades {date:%Y-%m-%d}", font=get_font(), fill=TEXT)
+    _draw_text(draw, IMAGE_WIDTH // 2, PADDING, f"{len(df_trades)} trade(s)   P/L {total_pl:,.2f}",
+               IMAGE_WIDTH // 2 - PADDING, True, GAIN if total_pl >= 0 else LOSS)
+    y = _draw_table(draw, PADDING + ROW_HEIGHT * 2, df_trades)
+    bottom = _draw_chart(draw, y + PADDING, df_log)
+    return image.crop((0, 0, IMAGE_WIDTH, min(height, bottom)))
+
+@profiled
+def build_report_image(connection, date, options=None):
+    """
+    Render the report image of `date` from the TAT database and encode it.
+
+    :param options: Encoding options (see screenshot.DEFAULT_SCREENSHOT_OPTIONS).
+    :return: Tuple of (filename, bytes).
+    """
+    df_trades = get_trades(connection, date.year, date.month, date.day)
+    image = render_report_image(df_trades, get_intraday_log(connection, date), date)
+    filename, data = encode_image(image, {**(options or {}), 'crop': None})
+    return filename.replace('screenshot', f"report_{date:%Y%m%d}"), data
@@ -0,0 +1,47 @@
+import time
+from datetime import datetime
+
+DEFAULT_POST_TIME = "16:15"  # local time, after the 16:00 ET close on a US/Eastern box
+
+def parse_post_time(text):
+    """
+    Parse a time of day given as HH:MM.
+    """
+    try:
+        return datetime.strptime(text.strip(), "%H:%M").time()
+    except (AttributeError, ValueError):
+        raise ValueError(f"Invalid post time {text!r}; use HH:MM (e.g. 16:15).")
+
+def get_post_time(config, override=None):
+    """
+    Time of day of the scheduled post: `override` (from --schedule), else
+    `schedule_time` from config.yaml, else DEFAULT_POST_TIME.
+    """
+    return parse_post_time(override or config.get('schedule_time') or DEFAULT_POST_TIME)
+
+def get_market_holidays(config):
+    """
+    Dates listed under `market_holidays` in config.yaml (YYYYMMDD), on which
+    scheduled runs post nothing.
+    """
+    return {datetime.strptime(str(day), "%Y%m%d").date() for day in config.get('market_holidays') or []}
+
+def is_trading_day(date, holidays=()):
+    """
+    True for a weekday that is not one of `holidays`.
+    """
+    day = date.date() if isinstance(date, datetime) else date
+    return day.weekday() < 5 and day not in holidays
+
+def wait_until(target, now=datetime.now, sleep=time.sleep):
+    """
+    Sleep until `target` (a datetime); returns at once if it has passed.
+    Sleeps in steps of at most a minute so a changed system clock (sleep,
+    DST) only delays the wake-up by that much.
+    """
+    remaining = (target - now()).total_seconds()
+    if remaining > 0:
+        print(f"Waiting until {target:%H:%M} to post.")
+    while remaining > 0:
+        sleep(min(remaining, 60))
+        remaining = (target - now()).total_seconds()
@@ -0,0 +1,146 @@
+import time
+from io import BytesIO
+
+from profiler import profiled
+
+APP_WINDOW_TITLE = "Trade Automation Toolbox"
+WINDOW_READY_TIMEOUT = 2.0  # seconds to wait for the window to become active
+WINDOW_POLL_INTERVAL = 0.05
+
+DEFAULT_SCREENSHOT_OPTIONS = {
+    'backend': 'pyautogui',
+    'format': 'png',       # png or jpeg
+    'optimize': False,     # slower encode, smaller upload
+    'quality': 85,         # jpeg only
+    'max_width': None,     # downscale wider captures to this many pixels
+    'crop': None,          # [left, top, right, bottom] within the window
+}
+
+class PyAutoGuiBackend:
+    """
+    Captures desktop windows with pygetwindow and pyautogui (Windows only).
+
+    A capture backend provides find_window(title), prepare_window(window, win),
+    is_ready(window) and grab(window) -> PIL.Image.
+    """
+
+    def __init__(self):
+        import pygetwindow
+        import pyautogui
+        self.gw = pygetwindow
+        self.pyautogui = pyautogui
+
+    def find_window(self, title):
+        # Filter windows to match exactly the specified app name
+        windows = [w for w in self.gw.getWindowsWithTitle(title) if w.title == title]
+        return windows[0] if windows else None
+
+    def prepare_window(self, window, win):
+        if win == 'max' and not window.isMaximized:
+            window.maximize()
+        elif win == 'restore' and window.isMinimized:
+            window.restore()
+        window.activate()
+
+    def is_ready(self, window):
+        return window.isActive
+
+    def grab(self, window):
+        return self.pyautogui.screenshot(region=(window.left, window.top, window.width, window.height))
+
+CAPTURE_BACKENDS = {
+    'pyautogui': PyAutoGuiBackend,
+}
+
+def get_capture_backend(name=None):
+    """
+    Instantiate the capture backend registered under `name`.
+    """
+    name = name or DEFAULT_SCREENSHOT_OPTIONS['backend']
+    if name not in CAPTURE_BACKENDS:
+        raise ValueError(f"Unknown screenshot backend '{name}'. Choose from: {', '.join(CAPTURE_BACKENDS)}.")
+    return CAPTURE_BACKENDS[name]()
+
+def get_screenshot_options(config):
+    """
+    Screenshot settings from the optional `screenshot` section of config.yaml,
+    completed with the defaults.
+    """
+    return {**DEFAULT_SCREENSHOT_OPTIONS, **(config.get('screenshot') or {})}
+
+def wait_until(predicate, timeout=WINDOW_READY_TIMEOUT, interval=WINDOW_POLL_INTERVAL,
+               clock=time.monotonic, sleep=time.sleep):
+    """
+    Poll `predicate` until it returns True or `timeout` seconds have passed.
+
+    :return: The last result of `predicate`.
+    """
+    deadline = clock() + timeout
+    while True:
+        if predicate():
+            return True
+        if clock() >= deadline:
+            return False
+        sleep(interval)
+
+@profiled
+def encode_image(image, options=None):
+    """
+    Crop, downscale and encode a PIL image in memory.
+
+    :return: Tuple of (filename, bytes), ready to be attached to an upload.
+    """
+    from PIL import Image
+
+    options = {**DEFAULT_SCREENSHOT_OPTIONS, **(options or {})}
+
+    if options['crop']:
+        image = image.crop(tuple(options['crop']))
+
+    max_width = options['max_width']
+    if max_width and image.width > max_width:
+        height = max(1, round(image.height * max_width / image.width))
+        image = image.resize((max_width, height), Image.Resampling.LANCZOS)
+
+    buffer = BytesIO()
+    if options['format'].lower() in ('jpg', 'jpeg'):
+        image.convert('RGB').save(buffer, format='JPEG', quality=options['quality'], optimize=options['optimize'])
+        filename = 'screenshot.jpg'
+    else:
+        image.save(buffer, format='PNG', optimize=options['optimize'])
+        filename = 'screenshot.png'
+    return filename, buffer.getvalue()
+
+@profiled
+def take_screenshot_of_app(app_name, win, backend=None, options=None, timeout=WINDOW_READY_TIMEOUT):
+    """
+    Capture the window titled `app_name` into memory.
+
+    The capture is taken as soon as the window reports being active, or gives
+    up after `timeout` seconds.
+
+    :param backend: Capture backend; defaults to the one named in `options`.
+    :param options: Screenshot options (see DEFAULT_SCREENSHOT_OPTIONS).
+    :return: Tuple of (filename, bytes), or None if the window could not be captured.
+    """
+    options = {**DEFAULT_SCREENSHOT_OPTIONS, **(options or {})}
+    try:
+        backend = backend or get_capture_backend(options['backend'])
+
+        app_window = backend.find_window(app_name)
+        if app_window is None:
+            print(f"Application window '{app_name}' not found.")
+            return None
+
+        backend.prepare_window(app_window, win)
+
+        # Ensure the window is active before taking a screenshot
+        if not wait_until(lambda: backend.is_ready(app_window), timeout):
+            print(f"Application window '{app_name}' is not active.")
+            return None
+
+        return encode_image(backend.grab(app_window), options)
+
+    except Exception as e:
+        print(f"An error occurred while capturing the screenshot: {e}")
+        return None
@@ -0,0 +1,204 @@
+"""
+Helpers for building TAT databases inside unit tests and benchmarks: small
+hand-written ones, or synthetic histories from generate_tat_database.
+
+Only the tables and columns TradeScout reads are created: Trade and DailyLog.
+"""
+import sqlite3
+from datetime import datetime, timedelta
+
+FILETIME_EPOCH_OFFSET = 116444736000000000
+
+TRADE_SCHEMA = """
+CREATE TABLE Trade (
+    TradeID INTEGER PRIMARY KEY AUTOINCREMENT,
+    TATTradeID INTEGER,
+    Year INTEGER, Month INTEGER, Day INTEGER,
+    DateOpened INTEGER, DateClosed INTEGER,
+    TradeType TEXT,
+    ShortPut REAL, LongPut REAL, ShortCall REAL, LongCall REAL,
+    Qty INTEGER, StopType TEXT,
+    PriceOpen REAL, PriceStopTarget REAL,
+    ProfitLoss REAL, PriceClose REAL,
+    ClosingProcessed INTEGER,
+    TotalPremium REAL, Commission REAL, CommissionClose REAL
+);
+"""
+
+DAILY_LOG_SCHEMA = """
+CREATE TABLE DailyLog (
+    DailyLogID INTEGER PRIMARY KEY AUTOINCREMENT,
+    LogDate INTEGER,
+    PL REAL,
+    SPX REAL
+);
+"""
+
+
+def to_filetime(dt):
+    return int((dt - datetime(1970, 1, 1)).total_seconds() * 10000000) + FILETIME_EPOCH_OFFSET
+
+
+def create_tat_database(path=":memory:"):
+    connection = sqlite3.connect(path)
+    connection.executescript(TRADE_SCHEMA + DAILY_LOG_SCHEMA)
+    return connection
+
+
+def insert_trade(connection, opened, profit_loss, total_premium, closing_processed=0,
+                 price_close=0.0, price_stop_target=0.0, trade_type="PutSpread",
+                 stop_type="Vertical", qty=1, tat_trade_id=1):
+    """
+    Insert one closed trade opened at `opened` (a datetime) and closed an hour later.
+    """
+    closed = opened + timedelta(hours=1)
+    connection.execute(
+        """
+        INSERT INTO Trade (
+            TATTradeID, Year, Month, Day, DateOpened, DateClosed, TradeType,
+            ShortPut, LongPut, ShortCall, LongCall, Qty, StopType,
+            PriceOpen, PriceStopTarget, ProfitLoss, PriceClose, ClosingProcessed,
+            TotalPremium, Commission, CommissionClose
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, 5700, 5650, 0, 0, ?, ?, 1.0, ?, ?, ?, ?, ?, 1.0, 1.0)
+        """,
+        (tat_trade_id, opened.year, opened.month, opened.day,
+         to_filetime(opened), to_filetime(closed), trade_type, qty, stop_type,
+         price_stop_target, profit_loss, price_close, closing_processed, total_premium),
+    )
+
+
+def insert_daily_log(connection, log_date, pl, spx):
+    connection.execute(
+        "INSERT INTO DailyLog (LogDate, PL, SPX) VALUES (?, ?, ?);",
+        (to_filetime(log_date), pl, spx),
+    )
+
+
+TRADE_TYPES = ["PutSpread", "CallSpread", "IronCondor"]
+STOP_TYPES = ["Vertical", "ShortOnly", "Single"]
+INSERT_BATCH_SIZE = 100000
+GENERATED_START_DATE = datetime(2024, 9, 2)
+
+TRADE_INSERT = """
+INSERT INTO Trade (
+    TATTradeID, Year, Month, Day, DateOpened, DateClosed, TradeType,
+    ShortPut, LongPut, ShortCall, LongCall, Qty, StopType,
+    PriceOpen, PriceStopTarget, ProfitLoss, PriceClose, ClosingProcessed,
+    TotalPremium, Commission, CommissionClose
+) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+def trading_days(start_date, days):
+    """
+    The first `days` weekdays from start_date on. Feb 29 is skipped: TradeScout
+    forces decoded timestamps to the current year, which a leap day cannot take
+    in most years.
+    """
+    result = []
+    day = datetime(start_date.year, start_date.month, start_date.day)
+    while len(result) < days:
+        if day.weekday() < 5 and not (day.month == 2 and day.day == 29):
+            result.append(day)
+        day += timedelta(days=1)
+    return result
+
+
+def generate_tat_database(path, start_date=GENERATED_START_DATE, days=1, trades_per_day=20,
+                          log_interval_seconds=60, orphan_ratio=0.02, open_last_day=True, seed=0):
+    """
+    Create a TAT database filled with a realistic synthetic history, for tests
+    and benchmarks at any scale (one day up to years of minute-level logs and
+    millions of trades).
+
+    Every trading day gets `trades_per_day` trades opened between 09:45 and
+    15:30 around a random-walk SPX: about 70% expire (ClosingProcessed 0) and
+    the rest are stopped (ClosingProcessed 1) with some slippage, a few beyond
+    the bad-slip threshold. A share `orphan_ratio` has no TATTradeID. When
+    `open_last_day` is set, the last day's trades opened after 14:00 are
+    still open (ClosingProcessed and DateClosed NULL).
+
+    DailyLog gets one row every `log_interval_seconds` from 09:30 to 16:00
+    with the SPX value and the day's realized PL of the trades closed so far.
+
+    :return: The open sqlite3 connection (committed).
+    """
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    connection = create_tat_database(path)
+    day_list = trading_days(start_date, days)
+    spx = 5600.0
+
+    trade_rows, log_rows = [], []
+    log_offsets = np.arange(0, 6.5 * 3600 + 1, log_interval_seconds)  # seconds after 09:30
+    for day_index, day in enumerate(day_list):
+        market_open = to_filetime(day.replace(hour=9, minute=30))
+        ticks_per_second = 10000000
+
+        # SPX random walk over the day's log timestamps
+        spx_path = spx + np.cumsum(rng.normal(0, 0.8, len(log_offsets)))
+        spx = float(spx_path[-1])
+
+        n = trades_per_day
+        opened = np.sort(rng.uniform(15 * 60, 6 * 3600, n))  # 09:45 .. 15:30
+        is_call = rng.random(n) < 0.5
+        qty = rng.integers(1, 4, n)
+        price_open = np.round(rng.uniform(0.8, 3.0, n), 2)
+        stop_target = np.round(price_open * 2, 2)
+        stopped = rng.random(n) < 0.3
+        slippage = np.where(rng.random(n) < 0.1, rng.uniform(0.5, 1.5, n), rng.uniform(0.0, 0.3, n))
+        price_close = np.where(stopped, -np.round(stop_target + slippage, 2), 0.0)
+        closed = np.where(stopped, np.minimum(opened + rng.uniform(60, 3 * 3600, n), 6.5 * 3600), 6.5 * 3600)
+        commission = 1.0 * qty * 2
+        commission_close = np.where(stopped, commission, 0.0)
+        total_premium = np.round(price_open * 100 * qty, 2)
+        profit_loss = np.round(
+            np.where(stopped, (price_open + price_close) * 100 * qty, total_premium) - commission - commission_close, 2
+        )
+        still_open = (day_index == len(day_list) - 1) & open_last_day & (opened > 4.5 * 3600)
+        tat_trade_id = np.where(rng.random(n) < orphan_ratio, -1, np.arange(1, n + 1) + day_index * n)
+
+        strike = np.round(spx_path[np.searchsorted(log_offsets, opened)] / 5) * 5
+        for i in range(n):
+            call = bool(is_call[i])
+            short_strike = float(strike[i] + 30 if call else strike[i] - 30)
+            long_strike = short_strike + 50 if call else short_strike - 50
+            trade_rows.append((
+                None if tat_trade_id[i] < 0 else int(tat_trade_id[i]),
+                day.year, day.month, day.day,
+                market_open + int(opened[i] * ticks_per_second),
+                None if still_open[i] else market_open + int(closed[i] * ticks_per_second),
+                TRADE_TYPES[1] if call else TRADE_TYPES[0],
+                0.0 if call else short_strike, 0.0 if call else long_strike,
+                short_strike if call else 0.0, long_strike if call else 0.0,
+                int(qty[i]), STOP_TYPES[int(rng.integers(0, len(STOP_TYPES)))],
+                float(price_open[i]), float(stop_target[i]),
+                0.0 if still_open[i] else float(profit_loss[i]),
+                0.0 if still_open[i] else float(price_close[i]),
+                None if still_open[i] else int(stopped[i]),
+                float(total_premium[i]), float(commission[i]), float(commission_close[i]),
+            ))
+
+        # Realized PL at each log time: trades closed so far (ignoring orphans)
+        realized = np.where((tat_trade_id >= 0) & ~still_open, profit_loss, 0.0)
+        order = np.argsort(closed)
+        closed_pl = np.concatenate([[0.0], np.cumsum(realized[order])])
+        pl_path = closed_pl[np.searchsorted(closed[order], log_offsets, side='right')]
+        log_rows.extend(zip(
+            (market_open + log_offsets * ticks_per_second).astype('int64').tolist(),
+            np.round(pl_path, 2).tolist(),
+            np.round(spx_path, 2).tolist(),
+        ))
+
+        if len(trade_rows) >= INSERT_BATCH_SIZE:
+            connection.executemany(TRADE_INSERT, trade_rows)
+            trade_rows = []
+        if len(log_rows) >= INSERT_BATCH_SIZE:
+            connection.executemany("INSERT INTO DailyLog (LogDate, PL, SPX) VALUES (?, ?, ?);", log_rows)
+            log_rows = []
+
+    connection.executemany(TRADE_INSERT, trade_rows)
+    connection.executemany("INSERT INTO DailyLog (LogDate, PL, SPX) VALUES (?, ?, ?);", log_rows)
+    connection.commit()
+    return connection
@@ -0,0 +1,94 @@
+import sys
+import os
+import tempfile
+import threading
+import unittest
+from datetime import datetime
+from unittest import mock
+
+# Add parent directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import accounts
+from accounts import build_accounts_report, combine_account_reports
+from db_handler import get_databases, get_db_settings, get_trades, open_connection
+from tat_fixtures import generate_tat_database, trading_days
+from utils import calculate_metrics
+
+class TestAccounts(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.days = trading_days(datetime(2024, 9, 2), 5)
+        self.date = self.days[-1]
+        self.databases = []
+        for seed, name in enumerate(['Main', 'IRA']):
+            path = os.path.join(self.tmp.name, f"{name}.db3")
+            generate_tat_database(path, start_date=self.days[0], days=5, trades_per_day=10 + 10 * seed,
+                                  log_interval_seconds=1800, seed=seed).close()
+            self.databases.append({'name': name, 'db_path': path})
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_get_databases(self):
+        self.assertEqual(get_databases({'db_path': 'tat.db3'}), [{'name': None, 'db_path': 'tat.db3'}])
+        config = {'databases': [{'name': 'Main', 'db_path': 'a.db3'}, {'db_path': 'b.db3'}]}
+        self.assertEqual(get_databases(config), [
+            {'name': 'Main', 'db_path': 'a.db3'}, {'name': 'Account 2', 'db_path': 'b.db3'}
+        ])
+        self.assertEqual(get_db_settings(config)[0], 'a.db3')
+        with self.assertRaises(ValueError):
+            get_databases({'databases': [{'name': 'Main'}]})
+        with self.assertRaises(ValueError):
+            get_databases({'databases': [{'name': 'A', 'db_path': 'a'}, {'name': 'A', 'db_path': 'b'}]})
+
+    def test_combined_metrics_use_all_trades(self):
+        reports = [accounts.build_account_report(database, self.date) for database in self.databases]
+        metrics, weekly_pl, monthly_pl = combine_account_reports(reports)
+
+        all_trades = []
+        for database in self.databases:
+            connection = open_connection(database['db_path'])
+            try:
+                all_trades.append(get_trades(connection, self.date.year, self.date.month, self.date.day))
+            finally:
+                connection.close()
+        import pandas as pd
+        expected = calculate_metrics(pd.concat(all_trades, ignore_index=True))
+
+        for value, expected_value in zip(metrics, expected):
+            self.assertAlmostEqual(value, expected_value)
+        self.assertAlmostEqual(weekly_pl, sum(report['weekly_pl'] for report in reports))
+        self.assertAlmostEqual(monthly_pl, sum(report['monthly_pl'] for report in reports))
+
+    def test_report_has_a_column_per_account(self):
+        message = build_accounts_report(self.databases, self.date)
+        header = [line for line in message.splitlines() if 'Main' in line][0]
+        self.assertEqual(header.split(), ['|', 'Main', '|', 'IRA', '|', 'Total'])
+        self.assertIn('SPX Last', message)
+        self.assertNotIn('n/a', message)
+
+    def test_failing_account_is_reported_and_others_still_read(self):
+        databases = self.databases + [{'name': 'Gone', 'db_path': os.path.join(self.tmp.name, 'missing.db3')}]
+        message = build_accounts_report(databases, self.date)
+        self.assertIn('Gone: not available', message)
+        prem_sold = [line for line in message.splitlines() if line.startswith('Prem Sold')][0]
+        self.assertEqual(prem_sold.split('|')[3].strip(), 'n/a')
+        self.assertNotEqual(prem_sold.split('|')[4].strip(), 'n/a')
+
+    def test_accounts_are_read_concurrently(self):
+        # Each read waits until both accounts have started, which only happens in parallel
+        started = threading.Barrier(len(self.databases), timeout=5)
+        build_account_report = accounts.build_account_report
+
+        def wait_for_others(database, date):
+            started.wait()
+            return build_account_report(database, date)
+
+        with mock.patch.object(accounts, 'build_account_report', side_effect=wait_for_others):
+            message = build_accounts_report(self.databases, self.date)
+        self.assertNotIn('not available', message)
+
+if __name__ == '__main__':
+    unittest.main()
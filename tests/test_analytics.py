@@ -0,0 +1,84 @@
+import sys
+import os
+import tempfile
+import unittest
+from datetime import datetime
+from unittest import mock
+
+import pandas as pd
+
+# Add parent directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tat_fixtures import generate_tat_database, trading_days
+import analytics
+import db_handler
+from analytics import analyze_range, month_ranges, summarize_by_year
+from metrics_store import compute_daily_metrics
+from PL_Summary import get_last_of_day_pl
+
+class TestAnalytics(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.TemporaryDirectory()
+        cls.db_path = os.path.join(cls.tmp.name, 'tat.db3')
+        # Late November into early January: three months and two years
+        cls.days = trading_days(datetime(2024, 11, 25), 30)
+        generate_tat_database(cls.db_path, start_date=cls.days[0], days=30, trades_per_day=10,
+                              log_interval_seconds=3600).close()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp.cleanup()
+
+    def test_month_ranges(self):
+        self.assertEqual(month_ranges(datetime(2024, 1, 15), datetime(2024, 3, 2)), [
+            (datetime(2024, 1, 15), datetime(2024, 1, 31)),
+            (datetime(2024, 2, 1), datetime(2024, 2, 29)),
+            (datetime(2024, 3, 1), datetime(2024, 3, 2)),
+        ])
+        self.assertEqual(month_ranges(datetime(2024, 3, 2), datetime(2024, 3, 1)), [])
+
+    def test_parallel_matches_one_pass(self):
+        start, end = self.days[0], self.days[-1]
+        serial = analyze_range(start, end, db_path=self.db_path, workers=1)
+        parallel = analyze_range(start, end, db_path=self.db_path, workers=3)
+
+        pd.testing.assert_frame_equal(parallel[0], serial[0])
+        pd.testing.assert_frame_equal(parallel[1], serial[1])
+
+        from db_handler import open_connection
+        connection = open_connection(self.db_path)
+        try:
+            pd.testing.assert_frame_equal(serial[0], compute_daily_metrics(connection, start, end, 'pandas'))
+            pd.testing.assert_frame_equal(serial[1], get_last_of_day_pl(connection, start, end))
+        finally:
+            connection.close()
+
+    def test_months_share_one_connection(self):
+        with mock.patch.object(db_handler, 'open_connection', wraps=db_handler.open_connection) as open_connection:
+            analyze_range(self.days[0], self.days[-1], db_path=self.db_path, workers=1)
+
+        self.assertEqual(open_connection.call_count, 1)
+        self.assertEqual(analytics._pools, {})
+
+    def test_empty_months_are_skipped(self):
+        daily_metrics, df_last_of_day = analyze_range(datetime(2024, 9, 1), self.days[3], db_path=self.db_path,
+                                                      workers=1)
+        self.assertEqual(len(daily_metrics), 4)
+        self.assertEqual(daily_metrics['premium_sold'].dtype, 'float64')
+        self.assertEqual(len(df_last_of_day), 4)
+
+    def test_summary_by_year(self):
+        daily_metrics, df_last_of_day = analyze_range(self.days[0], self.days[-1], db_path=self.db_path, workers=1)
+        summary = summarize_by_year(daily_metrics, df_last_of_day)
+
+        self.assertEqual(list(summary.index), [2024, 2025])
+        self.assertEqual(summary['days'].sum(), len(self.days))
+        self.assertAlmostEqual(summary['premium_captured'].sum(), daily_metrics['premium_captured'].sum())
+        self.assertAlmostEqual(summary['pl'].sum(), df_last_of_day['PL'].sum())
+        self.assertTrue((summary['max_drawdown'] <= 0).all())
+
+if __name__ == '__main__':
+    unittest.main()
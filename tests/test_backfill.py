@@ -0,0 +1,35 @@
+import sys
+import os
+import unittest
+from datetime import datetime
+
+# Add parent directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tat_fixtures import create_tat_database, insert_trade, insert_daily_log
+from Trade_Scout import build_backfill_reports, build_daily_report
+
+class TestBackfill(unittest.TestCase):
+    def setUp(self):
+        self.connection = create_tat_database()
+        for day in (2, 3, 4, 5, 6, 9, 10, 30):
+            insert_trade(self.connection, datetime(2024, 9, day, 10, 0), 40.0 * day - 200, 300.0,
+                         closing_processed=day % 2, price_close=-4.9, price_stop_target=4.1)
+            insert_daily_log(self.connection, datetime(2024, 9, day, 15, 59), 10.0, 5600.0 + day)
+        # SPX logged on a day without trades
+        insert_daily_log(self.connection, datetime(2024, 10, 1, 15, 59), 0.0, 5700.0)
+
+    def tearDown(self):
+        self.connection.close()
+
+    def test_backfill_matches_single_reports(self):
+        reports = build_backfill_reports(self.connection, datetime(2024, 9, 1), datetime(2024, 10, 2))
+        dates = [date for date, _ in reports]
+        self.assertEqual([d.day for d in dates], [2, 3, 4, 5, 6, 9, 10, 30, 1])
+
+        for date, message in reports:
+            with self.subTest(date=date.date()):
+                self.assertEqual(message, build_daily_report(self.connection, date))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,70 @@
+import sys
+import os
+import unittest
+from datetime import datetime
+from unittest import mock
+
+import pandas as pd
+
+# Add parent directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tat_fixtures import create_tat_database, generate_tat_database, insert_trade, trading_days
+from breakdown import (
+    BREAKDOWN_INPUT_COLUMNS, breakdown_range, calculate_breakdown, entry_time_buckets, format_breakdown_messages
+)
+from db_handler import get_trades_range, iter_trades_range
+from utils import calculate_metrics
+
+class TestBreakdown(unittest.TestCase):
+
+    def test_entry_time_buckets(self):
+        opened = pd.Series(pd.to_datetime(['2024-09-03 09:45:10', '2024-09-03 10:17:00', '2024-09-03 10:30:00']))
+        self.assertEqual(list(entry_time_buckets(opened)), ['09:30', '10:00', '10:30'])
+        self.assertEqual(list(entry_time_buckets(opened, 60)), ['09:00', '10:00', '10:00'])
+
+    def test_groups_match_filtered_metrics(self):
+        days = trading_days(datetime(2024, 9, 2), 5)
+        connection = generate_tat_database(':memory:', start_date=days[0], days=5, trades_per_day=40)
+        try:
+            df_trades = get_trades_range(connection, days[0], days[-1], columns=BREAKDOWN_INPUT_COLUMNS)
+            breakdown = calculate_breakdown(df_trades)
+            # Small chunks fold the same groups from several reads
+            small_chunks = lambda *args, **kwargs: iter_trades_range(*args, chunk_rows=17, **kwargs)
+            with mock.patch('breakdown.iter_trades_range', small_chunks):
+                chunked = breakdown_range(connection, days[0], days[-1])
+        finally:
+            connection.close()
+
+        pd.testing.assert_frame_equal(chunked, breakdown)
+        for (dimension, key) in [('TradeType', df_trades['TradeType']), ('StopType', df_trades['StopType']),
+                                 ('EntryTime', entry_time_buckets(df_trades['DateOpened']))]:
+            for group in breakdown.loc[dimension].index:
+                expected = calculate_metrics(df_trades[key == group])
+                row = breakdown.loc[(dimension, group)]
+                self.assertEqual(row['trades'], (key == group).sum())
+                self.assertAlmostEqual(row['pcr'], expected[2])
+                self.assertAlmostEqual(row['win_rate'], expected[3])
+                self.assertEqual(row['stops'], expected[5])
+                self.assertEqual(row['bad_slip'], expected[6])
+
+        total = breakdown.loc[('Total', 'All')]
+        self.assertEqual(total['trades'], len(df_trades))
+        self.assertAlmostEqual(total['premium_captured'], df_trades['ProfitLoss'].sum())
+
+    def test_missing_stop_type_and_messages(self):
+        connection = create_tat_database()
+        try:
+            insert_trade(connection, datetime(2024, 9, 3, 10, 5), 50.0, 100.0, stop_type=None)
+            insert_trade(connection, datetime(2024, 9, 3, 10, 40), -80.0, 100.0, closing_processed=1)
+            breakdown = breakdown_range(connection, datetime(2024, 9, 3), datetime(2024, 9, 3))
+        finally:
+            connection.close()
+
+        self.assertEqual(list(breakdown.loc['StopType'].index), ['(none)', 'Vertical'])
+        messages = format_breakdown_messages(breakdown, datetime(2024, 9, 3), datetime(2024, 9, 3))
+        self.assertEqual(len(messages), 4)
+        self.assertIn('10:30      |      1 |      ($80) |  -80.0% |    0.0% |    1 |    0', messages[2])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+import sys
+import os
+import unittest
+from datetime import datetime
+
+import pandas as pd
+
+# Add parent directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tat_fixtures import generate_tat_database, trading_days
+from db_handler import get_trades_range, iter_daily_log, iter_trades_on_days, iter_trades_range, read_transaction
+from PL_Summary import get_daily_log, get_last_of_day_pl, stream_last_of_day_pl
+from utils import METRIC_INPUT_COLUMNS, calculate_daily_metrics, calculate_daily_metrics_chunked
+
+class TestChunkedReaders(unittest.TestCase):
+
+    def setUp(self):
+        self.days = trading_days(datetime(2024, 9, 2), 10)
+        self.connection = generate_tat_database(':memory:', start_date=self.days[0], days=10, trades_per_day=30,
+                                                 log_interval_seconds=600, orphan_ratio=0.1)
+
+    def tearDown(self):
+        self.connection.close()
+
+    def test_trade_chunks_cover_the_range(self):
+        start, end = self.days[2], self.days[6]
+        chunks = list(iter_trades_range(self.connection, start, end, chunk_rows=25))
+        df_trades = get_trades_range(self.connection, start, end)
+
+        self.assertGreater(len(chunks), 1)
+        self.assertTrue(all(len(chunk) <= 25 for chunk in chunks))
+        pd.testing.assert_frame_equal(
+            pd.concat(chunks, ignore_index=True).astype({'TradeType': object, 'StopType': object}),
+            df_trades.sort_values('TradeID', ignore_index=True).astype({'TradeType': object, 'StopType': object}),
+        )
+
+    def test_trade_chunks_of_scattered_days(self):
+        days = [self.days[1], self.days[4], self.days[8]]
+        chunks = list(iter_trades_on_days(self.connection, days, chunk_rows=20))
+        df_trades = pd.concat(chunks, ignore_index=True)
+
+        self.assertTrue(all(len(chunk) <= 20 for chunk in chunks))
+        self.assertEqual(set(df_trades['TradeDate']), set(days))
+        expected = pd.concat([get_trades_range(self.connection, day, day) for day in days], ignore_index=True)
+        pd.testing.assert_frame_equal(
+            df_trades.astype({'TradeType': object, 'StopType': object}),
+            expected.sort_values('TradeID', ignore_index=True).astype({'TradeType': object, 'StopType': object}),
+        )
+        self.assertTrue(next(iter_trades_on_days(self.connection, [])).empty)
+
+    def test_empty_range_yields_one_empty_chunk(self):
+        chunks = list(iter_trades_range(self.connection, datetime(2023, 1, 2), datetime(2023, 1, 3),
+                                        columns=METRIC_INPUT_COLUMNS))
+        self.assertEqual(len(chunks), 1)
+        self.assertTrue(chunks[0].empty)
+        self.assertEqual(list(chunks[0].columns), METRIC_INPUT_COLUMNS + ['TradeDate'])
+        self.assertTrue(calculate_daily_metrics_chunked(chunks).empty)
+
+    def test_daily_metrics_from_chunks(self):
+        start, end = self.days[0], self.days[-1]
+        expected = calculate_daily_metrics(get_trades_range(self.connection, start, end, columns=METRIC_INPUT_COLUMNS))
+        # Chunks of 7 trades split most days across chunks
+        chunked = calculate_daily_metrics_chunked(
+            iter_trades_range(self.connection, start, end, columns=METRIC_INPUT_COLUMNS, chunk_rows=7)
+        )
+        pd.testing.assert_frame_equal(chunked, expected)
+
+    def test_daily_log_chunks(self):
+        start, end = self.days[3], self.days[4]
+        with read_transaction(self.connection):
+            chunks = list(iter_daily_log(self.connection, start, end, chunk_rows=10))
+        df_daily_log = pd.concat(chunks, ignore_index=True)
+
+        self.assertTrue(all(len(chunk) <= 10 for chunk in chunks))
+        pd.testing.assert_frame_equal(df_daily_log.drop(columns='LogDay'), get_daily_log(self.connection, start, end))
+        self.assertEqual(sorted(df_daily_log['LogDay'].dt.date.unique()), [start.date(), end.date()])
+
+    def test_last_of_day_from_chunks(self):
+        start, end = self.days[0], self.days[-1]
+        pd.testing.assert_frame_equal(
+            stream_last_of_day_pl(self.connection, start, end, chunk_rows=13),
+            get_last_of_day_pl(self.connection, start, end),
+        )
+        self.assertTrue(stream_last_of_day_pl(self.connection, datetime(2023, 1, 2), datetime(2023, 1, 3)).empty)
+
+if __name__ == '__main__':
+    unittest.main()
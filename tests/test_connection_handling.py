@@ -0,0 +1,96 @@
+import sys
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import unittest
+from datetime import datetime
+
+# Add parent directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tat_fixtures import create_tat_database, insert_daily_log
+from db_handler import open_connection, read_transaction, ConnectionPool
+from utils import execute_with_retry, read_sql_with_retry
+
+class TestConnectionHandling(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.temp_dir.name, 'data.db3')
+        self.writer = create_tat_database(self.db_path)
+        insert_daily_log(self.writer, datetime(2024, 9, 23, 15, 59), 10.0, 5718.57)
+        self.writer.commit()
+
+    def tearDown(self):
+        self.writer.close()
+        self.temp_dir.cleanup()
+
+    def test_read_only_connection_cannot_write(self):
+        connection = open_connection(self.db_path, read_only=True)
+        try:
+            with self.assertRaises(sqlite3.OperationalError):
+                connection.execute("DELETE FROM DailyLog;")
+        finally:
+            connection.close()
+
+    def test_query_retries_until_writer_releases_lock(self):
+        locked = threading.Event()
+
+        def hold_exclusive_lock():
+            writer = sqlite3.connect(self.db_path)
+            writer.execute("BEGIN EXCLUSIVE;")
+            locked.set()
+            time.sleep(0.4)
+            writer.commit()
+            writer.close()
+
+        holder = threading.Thread(target=hold_exclusive_lock)
+        holder.start()
+        locked.wait()
+        connection = open_connection(self.db_path, read_only=True, busy_timeout_ms=50)
+        try:
+            rows = execute_with_retry(connection, "SELECT COUNT(*) FROM DailyLog;")
+            self.assertEqual(rows[0][0], 1)
+        finally:
+            holder.join()
+            connection.close()
+
+    def test_non_lock_errors_are_not_retried(self):
+        connection = open_connection(self.db_path, read_only=True)
+        try:
+            start = time.perf_counter()
+            with self.assertRaises(Exception):
+                read_sql_with_retry("SELECT * FROM MissingTable;", connection)
+            self.assertLess(time.perf_counter() - start, 0.2)
+        finally:
+            connection.close()
+
+    def test_read_transaction_sees_one_snapshot(self):
+        self.writer.execute("PRAGMA journal_mode=WAL;")
+        connection = open_connection(self.db_path, read_only=True)
+        try:
+            with read_transaction(connection):
+                self.assertEqual(connection.execute("SELECT COUNT(*) FROM DailyLog;").fetchone()[0], 1)
+                insert_daily_log(self.writer, datetime(2024, 9, 24, 15, 59), 20.0, 5732.93)
+                self.writer.commit()
+                self.assertEqual(connection.execute("SELECT COUNT(*) FROM DailyLog;").fetchone()[0], 1)
+            self.assertEqual(connection.execute("SELECT COUNT(*) FROM DailyLog;").fetchone()[0], 2)
+        finally:
+            connection.close()
+
+    def test_pool_reuses_connections(self):
+        pool = ConnectionPool(self.db_path, size=2, read_only=True, busy_timeout_ms=1000)
+        try:
+            with pool.connection() as first:
+                pass
+            with pool.connection() as second:
+                self.assertIs(first, second)
+                with pool.connection() as third:
+                    self.assertIsNot(second, third)
+            self.assertEqual(pool._created, 2)
+        finally:
+            pool.close()
+
+if __name__ == "__main__":
+    unittest.main()
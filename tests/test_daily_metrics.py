@@ -0,0 +1,65 @@
+import sys
+import os
+import unittest
+from datetime import datetime
+
+# Add parent directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tat_fixtures import create_tat_database, insert_trade
+from db_handler import get_trades, get_trades_range
+from utils import calculate_metrics, calculate_daily_metrics, get_day_metrics
+
+class TestDailyMetrics(unittest.TestCase):
+    def setUp(self):
+        self.connection = create_tat_database()
+        # (opened, ProfitLoss, TotalPremium, ClosingProcessed, PriceClose, PriceStopTarget)
+        trades = [
+            (datetime(2024, 9, 23, 10, 0), 180.0, 200.0, 0, 0.0, 2.40),
+            (datetime(2024, 9, 23, 10, 30), -250.0, 220.0, 1, -4.65, 4.10),  # slip 0.55
+            (datetime(2024, 9, 23, 11, 0), -30.0, 180.0, 0, 0.0, 2.00),      # negative expired
+            (datetime(2024, 9, 23, 11, 30), -190.0, 210.0, 1, -5.10, 4.20),  # slip 0.90
+            (datetime(2024, 9, 24, 10, 0), -120.0, 190.0, 1, -4.00, 3.80),
+            (datetime(2024, 9, 24, 10, 30), 0.0, 0.0, 2, 0.0, 0.0),
+            (datetime(2024, 9, 26, 10, 0), 0.0, 0.0, 0, 0.0, 0.0),           # no premium
+        ]
+        for opened, pl, premium, closing, price_close, stop_target in trades:
+            insert_trade(self.connection, opened, pl, premium, closing_processed=closing,
+                         price_close=price_close, price_stop_target=stop_target)
+
+    def tearDown(self):
+        self.connection.close()
+
+    def test_matches_single_day_metrics(self):
+        df_trades = get_trades_range(self.connection, datetime(2024, 9, 23), datetime(2024, 9, 27))
+        daily_metrics = calculate_daily_metrics(df_trades)
+        self.assertEqual(len(daily_metrics), 3)
+
+        for day in range(23, 28):
+            date = datetime(2024, 9, day)
+            with self.subTest(date=date.date()):
+                expected = calculate_metrics(get_trades(self.connection, 2024, 9, day))
+                result = get_day_metrics(daily_metrics, date)
+                self.assertEqual(len(result), len(expected))
+                for exp, got in zip(expected, result):
+                    self.assertAlmostEqual(float(got), float(exp))
+
+    def test_known_values(self):
+        df_trades = get_trades_range(self.connection, datetime(2024, 9, 23), datetime(2024, 9, 23))
+        (premium_sold, premium_captured, pcr, win_rate, expired_trades, stops,
+         bad_slip, bad_slip_max, negative_exp) = get_day_metrics(calculate_daily_metrics(df_trades), datetime(2024, 9, 23))
+        self.assertAlmostEqual(premium_sold, 810.0)
+        self.assertAlmostEqual(premium_captured, -290.0)
+        self.assertAlmostEqual(win_rate, 25.0)
+        self.assertEqual((expired_trades, stops, bad_slip, negative_exp), (2, 2, 2, 1))
+        self.assertAlmostEqual(bad_slip_max, 0.90)
+        self.assertEqual(f"{expired_trades}:{stops}", "2:2")
+
+    def test_empty_range(self):
+        df_trades = get_trades_range(self.connection, datetime(2024, 10, 1), datetime(2024, 10, 31))
+        daily_metrics = calculate_daily_metrics(df_trades)
+        self.assertTrue(daily_metrics.empty)
+        self.assertEqual(get_day_metrics(daily_metrics, datetime(2024, 10, 1)), (0,) * 9)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,204 @@
+import sys
+import os
+import json
+import tempfile
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Add parent directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from discord_messenger import (
+    POST_DELIVERED, POST_PERMANENT_FAILURE, POST_TRANSIENT_FAILURE, send_message_to_discord, send_message_with_retries, delete_messages, edit_messages,
+    load_posted_messages, record_posted_messages, forget_posted_messages
+)
+
+class StubWebhookHandler(BaseHTTPRequestHandler):
+    """
+    Minimal Discord webhook stand-in. Every request takes `delay` seconds; the
+    first request to a path listed in `rate_limited` gets a 429, the first
+    `failing[path]` POST or DELETE requests to a path get a 500, and every
+    one to a path in `statuses` gets that status with an empty body.
+    """
+
+    def log_message(self, format, *args):
+        pass
+
+    def forced_status(self, path):
+        server = self.server
+        if server.failing.get(path, 0) > 0:
+            server.failing[path] -= 1
+            return 500
+        return server.statuses.get(path)
+
+    def send_empty(self, status):
+        self.send_response(status)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def do_POST(self):
+        server = self.server
+        length = int(self.headers.get('Content-Length', 0))
+        body = self.rfile.read(length)
+        path = self.path.split('?')[0]
+        with server.lock:
+            server.requests.append((self.command, self.path, body))
+            limited = path in server.rate_limited and path not in server.limited_once
+            if limited:
+                server.limited_once.add(path)
+            status = self.forced_status(path)
+        time.sleep(server.delay)
+
+        if status is not None:
+            self.send_empty(status)
+            return
+
+        if limited:
+            self.send_response(429)
+            self.send_header('Retry-After', '0.2')
+            self.end_headers()
+            return
+
+        response = json.dumps({"id": f"msg-{path.rsplit('/', 1)[-1]}"}).encode()
+        self.send_json(response)
+
+    def do_DELETE(self):
+        with self.server.lock:
+            self.server.requests.append((self.command, self.path, b''))
+            status = self.forced_status(self.path.split('?')[0])
+        self.send_empty(status or 204)
+
+    def do_PATCH(self):
+        length = int(self.headers.get('Content-Length', 0))
+        body = self.rfile.read(length)
+        with self.server.lock:
+            self.server.requests.append((self.command, self.path, body))
+        self.send_json(body)
+
+    def send_json(self, response):
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(response)))
+        self.end_headers()
+        self.wfile.write(response)
+
+def start_stub_server():
+    """
+    Serve StubWebhookHandler on a free local port from a daemon thread.
+
+    :return: Tuple of (server, base webhook URL).
+    """
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubWebhookHandler)
+    server.lock = threading.Lock()
+    server.requests = []
+    server.rate_limited = set()
+    server.limited_once = set()
+    server.failing = {}
+    server.statuses = {}
+    server.delay = 0.0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/api/webhooks"
+
+class TestDiscordMessenger(unittest.TestCase):
+    def setUp(self):
+        self.server, self.base_url = start_stub_server()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def webhooks(self, count):
+        return [{"url": f"{self.base_url}/{i}", "thread_id": "42" if i % 2 else None} for i in range(count)]
+
+    def test_posts_concurrently_in_webhook_order(self):
+        self.server.delay = 0.3
+        start = time.perf_counter()
+        posted = send_message_to_discord("hello", True, None, False, webhooks=self.webhooks(6))
+        elapsed = time.perf_counter() - start
+
+        self.assertEqual([p["id"] for p in posted], [f"msg-{i}" for i in range(6)])
+        self.assertEqual([p["url"] for p in posted], [w["url"] for w in self.webhooks(6)])
+        self.assertLess(elapsed, 6 * 0.3)
+        thread_posts = [path for _, path, _ in self.server.requests if 'thread_id=42' in path]
+        self.assertEqual(len(thread_posts), 3)
+
+    def test_honors_retry_after(self):
+        self.server.rate_limited = {"/api/webhooks/1"}
+        posted = send_message_to_discord("hello", True, None, False, webhooks=self.webhooks(3))
+        self.assertEqual([p["id"] for p in posted], ["msg-0", "msg-1", "msg-2"])
+        posts_to_limited = [p for _, p, _ in self.server.requests if p.startswith("/api/webhooks/1")]
+        self.assertEqual(len(posts_to_limited), 2)
+
+    def test_failed_webhook_gives_none(self):
+        webhooks = self.webhooks(2) + [{"url": "http://127.0.0.1:9/api/webhooks/unreachable"}]
+        posted = send_message_to_discord("hello", True, None, False, webhooks=webhooks)
+        self.assertEqual([p["id"] for p in posted], ["msg-0", "msg-1", None])
+
+    def post_paths(self):
+        return sorted(p.split('?')[0] for method, p, _ in self.server.requests if method == "POST")
+
+    def test_retries_only_transient_failures(self):
+        self.server.failing = {"/api/webhooks/1": 2}
+        self.server.statuses = {"/api/webhooks/2": 404}
+        sleeps, batches = [], []
+        posted, outcomes = send_message_with_retries(
+            "hello", True, None, False, retries=3, retry_delay=30, webhooks=self.webhooks(4),
+            on_posted=batches.append, sleep=sleeps.append
+        )
+
+        self.assertEqual([p["id"] for p in posted], ["msg-0", "msg-1", None, "msg-3"])
+        self.assertEqual(outcomes, [POST_DELIVERED, POST_DELIVERED, POST_PERMANENT_FAILURE, POST_DELIVERED])
+        self.assertEqual(self.post_paths(), ["/api/webhooks/0"] + ["/api/webhooks/1"] * 3
+                         + ["/api/webhooks/2", "/api/webhooks/3"])
+        self.assertEqual(sleeps, [30, 60])
+        # Every attempt is handed over as soon as it completes
+        self.assertEqual([len(batch) for batch in batches], [4, 1, 1])
+
+    def test_delivered_without_id_is_not_reposted(self):
+        self.server.statuses = {"/api/webhooks/0": 200}
+        posted, outcomes = send_message_with_retries("hello", True, None, False, retries=3, retry_delay=30,
+                                                     webhooks=self.webhooks(2), sleep=self.fail)
+
+        self.assertEqual([p["id"] for p in posted], [None, "msg-1"])
+        self.assertEqual(outcomes, [POST_DELIVERED, POST_DELIVERED])
+        self.assertEqual(self.post_paths(), ["/api/webhooks/0", "/api/webhooks/1"])
+
+    def test_gives_up_after_the_retries(self):
+        self.server.failing = {"/api/webhooks/0": 5}
+        posted, outcomes = send_message_with_retries("hello", True, None, False, retries=2, retry_delay=0.01,
+                                                     webhooks=self.webhooks(2), sleep=lambda seconds: None)
+        self.assertEqual([p["id"] for p in posted], [None, "msg-1"])
+        self.assertEqual(outcomes, [POST_TRANSIENT_FAILURE, POST_DELIVERED])
+
+    def test_delete_and_edit_go_to_the_posting_webhook(self):
+        posted = send_message_to_discord("hello", True, None, False, webhooks=self.webhooks(3))
+
+        self.assertEqual(edit_messages(posted, "updated"), [True, True, True])
+        self.assertEqual(delete_messages(posted), [True, True, True])
+
+        patches = sorted(p for method, p, _ in self.server.requests if method == "PATCH")
+        deletes = sorted(p for method, p, _ in self.server.requests if method == "DELETE")
+        expected = ["/api/webhooks/0/messages/msg-0",
+                    "/api/webhooks/1/messages/msg-1?thread_id=42",
+                    "/api/webhooks/2/messages/msg-2"]
+        self.assertEqual(patches, expected)
+        self.assertEqual(deletes, expected)
+        patch_bodies = [json.loads(b) for method, _, b in self.server.requests if method == "PATCH"]
+        self.assertTrue(all(body == {"content": "updated"} for body in patch_bodies))
+
+    def test_ledger_round_trip(self):
+        posted = send_message_to_discord("hello", True, None, False, webhooks=self.webhooks(2))
+        with tempfile.TemporaryDirectory() as temp_dir:
+            ledger_path = os.path.join(temp_dir, 'posted_messages.json')
+            record_posted_messages("20240923", posted, ledger_path)
+            self.assertEqual(load_posted_messages("20240923", ledger_path), posted)
+
+            forget_posted_messages("20240923", posted[:1], ledger_path)
+            self.assertEqual(load_posted_messages("20240923", ledger_path), posted[1:])
+            forget_posted_messages("20240923", ledger_path=ledger_path)
+            self.assertEqual(load_posted_messages("20240923", ledger_path), [])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,99 @@
+import sys
+import os
+import io
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from datetime import datetime
+
+import pandas as pd
+
+# Add parent directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tat_fixtures import generate_tat_database, trading_days
+from metrics_store import MetricsStore
+from PL_Summary import (
+    build_equity_curve, calculate_total_PL, get_daily_log, get_equity_curve,
+    get_last_of_day_pl, load_last_of_day_pl, max_drawdown
+)
+
+class TestLastOfDayPL(unittest.TestCase):
+
+    def setUp(self):
+        self.days = trading_days(datetime(2024, 9, 2), 8)
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp.name, 'tat.db3')
+        self.connection = generate_tat_database(self.db_path, start_date=self.days[0], days=8, trades_per_day=20)
+
+    def tearDown(self):
+        self.connection.close()
+        self.tmp.cleanup()
+
+    def test_one_row_per_day_matches_full_scan(self):
+        start, end = self.days[0], self.days[-1]
+        df_last_of_day = get_last_of_day_pl(self.connection, start, end)
+
+        df_daily_log = get_daily_log(self.connection, start, end)
+        expected = df_daily_log.groupby(df_daily_log['LogDate'].dt.date).tail(1)
+
+        self.assertEqual(len(df_last_of_day), len(self.days))
+        self.assertEqual(list(df_last_of_day['LogDay'].dt.date), [day.date() for day in self.days])
+        self.assertEqual(list(df_last_of_day['PL']), list(expected['PL']))
+        self.assertEqual(list(df_last_of_day['LogDate']), list(expected['LogDate']))
+
+    def test_store_and_live_parts_agree(self):
+        store = MetricsStore(':memory:', today=self.days[5])
+        store.refresh(self.connection)
+        try:
+            merged = load_last_of_day_pl(self.connection, self.days[0], self.days[-1], store)
+        finally:
+            store.close()
+        live = load_last_of_day_pl(self.connection, self.days[0], self.days[-1])
+
+        pd.testing.assert_frame_equal(merged, live)
+
+    def test_total_pl_prints_rows_only_in_debug(self):
+        start, end = f"{self.days[0]:%Y%m%d}", f"{self.days[-1]:%Y%m%d}"
+        expected = get_last_of_day_pl(self.connection, self.days[0], self.days[-1])['PL'].sum()
+
+        quiet, verbose = io.StringIO(), io.StringIO()
+        with redirect_stdout(quiet):
+            total = calculate_total_PL(start, end, db_path=self.db_path)
+        with redirect_stdout(verbose):
+            calculate_total_PL(start, end, db_path=self.db_path, debug=True)
+
+        self.assertAlmostEqual(total, expected)
+        self.assertNotIn("PL values being summed", quiet.getvalue())
+        self.assertIn("PL values being summed", verbose.getvalue())
+
+    def test_equity_curve_from_database(self):
+        curve = get_equity_curve(self.connection, self.days[0], self.days[-1])
+
+        self.assertEqual(len(curve), len(self.days))
+        self.assertAlmostEqual(curve['Equity'].iloc[-1], curve['PL'].sum())
+        self.assertTrue((curve['Drawdown'] <= 0).all())
+
+class TestEquityCurve(unittest.TestCase):
+
+    def test_drawdown_from_running_peak(self):
+        days = pd.date_range('2024-09-02', periods=5, freq='D')
+        df_last_of_day = pd.DataFrame({'LogDay': days, 'PL': [100.0, -50.0, -80.0, 200.0, -10.0]})
+        curve = build_equity_curve(df_last_of_day)
+
+        self.assertEqual(list(curve['Equity']), [100.0, 50.0, -30.0, 170.0, 160.0])
+        self.assertEqual(list(curve['Peak']), [100.0, 100.0, 100.0, 170.0, 170.0])
+        self.assertEqual(list(curve['Drawdown']), [0.0, -50.0, -130.0, 0.0, -10.0])
+        self.assertEqual(max_drawdown(curve), (-130.0, days[0], days[2]))
+
+    def test_losing_start_and_no_drawdown(self):
+        days = pd.date_range('2024-09-02', periods=2, freq='D')
+        curve = build_equity_curve(pd.DataFrame({'LogDay': days, 'PL': [-20.0, 50.0]}))
+        self.assertEqual(list(curve['Drawdown']), [-20.0, 0.0])
+        self.assertEqual(max_drawdown(curve), (-20.0, None, days[0]))
+
+        rising = build_equity_curve(pd.DataFrame({'LogDay': days, 'PL': [20.0, 50.0]}))
+        self.assertEqual(max_drawdown(rising), (0.0, None, None))
+
+if __name__ == '__main__':
+    unittest.main()
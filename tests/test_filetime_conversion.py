@@ -0,0 +1,47 @@
+import sys
+import os
+import unittest
+from datetime import datetime
+
+import pandas as pd
+
+# Add parent directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils import convert_to_human_readable, filetime_series_to_datetime
+
+class TestFiletimeConversion(unittest.TestCase):
+    def test_matches_per_row_conversion(self):
+        """
+        The vectorized decoder must give exactly what convert_to_human_readable
+        gives, including sub-microsecond rounding and the forced current year.
+        """
+        filetimes = [
+            133716168000000000,  # 2024-09-23 12:00:00
+            133716168000000005,  # half a microsecond: ties to even
+            133716168000000015,
+            133716168123456789,
+            132223104000000000,  # 2020-01-01 00:00:00
+            133401600000000000,  # 2023-09-23 (different year)
+        ]
+        expected = [convert_to_human_readable(ft) for ft in filetimes]
+        result = filetime_series_to_datetime(pd.Series(filetimes))
+
+        self.assertEqual(str(result.dtype), 'datetime64[ns]')
+        for ft, exp, got in zip(filetimes, expected, result):
+            with self.subTest(filetime=ft):
+                self.assertEqual(got.to_pydatetime(), exp)
+                self.assertEqual(got.year, datetime.now().year)
+
+    def test_missing_values_become_nat(self):
+        result = filetime_series_to_datetime(pd.Series([133716168000000000, None], index=[5, 7]))
+        self.assertEqual(list(result.index), [5, 7])
+        self.assertTrue(pd.isna(result.loc[7]))
+        self.assertEqual(result.loc[5].to_pydatetime(), convert_to_human_readable(133716168000000000))
+
+    def test_empty_column(self):
+        result = filetime_series_to_datetime(pd.Series([], dtype='int64'))
+        self.assertTrue(result.empty)
+
+if __name__ == "__main__":
+    unittest.main()
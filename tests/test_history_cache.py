@@ -0,0 +1,89 @@
+import sys
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import datetime
+
+import pandas as pd
+
+# Add parent directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tat_fixtures import generate_tat_database, insert_trade, trading_days
+from db_handler import get_trades_range, iter_daily_log
+from history_cache import load_daily_log, load_trades, read_manifest, sync_history_cache
+
+class TestHistoryCache(unittest.TestCase):
+
+    def setUp(self):
+        self.days = trading_days(datetime(2024, 9, 2), 8)
+        self.connection = generate_tat_database(':memory:', start_date=self.days[0], days=8, trades_per_day=25,
+                                                 log_interval_seconds=900)
+        self.cache_dir = tempfile.mkdtemp()
+        # The last day still has open trades; "today" is the day after it
+        self.today = self.days[-1] + pd.Timedelta(days=1)
+
+    def tearDown(self):
+        self.connection.close()
+        shutil.rmtree(self.cache_dir)
+
+    def assert_same_trades(self, cached, expected):
+        pd.testing.assert_frame_equal(
+            cached.sort_values('TradeID', ignore_index=True).astype({'TradeType': object, 'StopType': object}),
+            expected.sort_values('TradeID', ignore_index=True).astype({'TradeType': object, 'StopType': object}),
+        )
+
+    def test_sync_exports_finished_days(self):
+        exported = sync_history_cache(self.connection, self.cache_dir, today=self.today)
+        manifest = read_manifest(self.cache_dir)
+
+        self.assertEqual(exported, [day.date() for day in self.days[:-1]])
+        self.assertEqual(manifest['pending'], [f"{self.days[-1]:%Y-%m-%d}"])
+        self.assertEqual(manifest['synced_through'], f"{self.days[-1]:%Y-%m-%d}")
+        # Nothing new: a second sync exports nothing
+        self.assertEqual(sync_history_cache(self.connection, self.cache_dir, today=self.today), [])
+
+    def test_loaded_trades_match_sqlite(self):
+        sync_history_cache(self.connection, self.cache_dir, today=self.today)
+        start, end = self.days[1], self.days[-2]
+
+        self.assert_same_trades(load_trades(self.connection, self.cache_dir, start, end),
+                                get_trades_range(self.connection, start, end))
+        columns = ['TotalPremium', 'ProfitLoss']
+        loaded = load_trades(self.connection, self.cache_dir, start, end, columns=columns)
+        self.assertEqual(list(loaded.columns), columns + ['TradeDate'])
+
+    def test_uncached_days_read_from_sqlite(self):
+        sync_history_cache(self.connection, self.cache_dir, today=self.today)
+        # A trade added to a cached day is not seen; the pending day is read live
+        insert_trade(self.connection, self.days[-1].replace(hour=15), 100.0, 150.0)
+        df_trades = load_trades(self.connection, self.cache_dir, self.days[-2], self.days[-1])
+
+        self.assertEqual(len(df_trades[df_trades['TradeDate'] == self.days[-1]]),
+                         len(get_trades_range(self.connection, self.days[-1], self.days[-1])))
+        self.assertTrue(df_trades['TradeDate'].is_monotonic_increasing)
+
+    def test_pending_day_exported_once_closed(self):
+        sync_history_cache(self.connection, self.cache_dir, today=self.today)
+        self.connection.execute("UPDATE Trade SET ClosingProcessed = 0, DateClosed = DateOpened "
+                                "WHERE ClosingProcessed IS NULL;")
+        exported = sync_history_cache(self.connection, self.cache_dir, today=self.today)
+
+        self.assertEqual(exported, [self.days[-1].date()])
+        self.assertEqual(read_manifest(self.cache_dir)['pending'], [])
+
+    def test_daily_log_matches_sqlite(self):
+        sync_history_cache(self.connection, self.cache_dir, today=self.today)
+        start, end = self.days[0], self.days[-1]
+        expected = pd.concat(iter_daily_log(self.connection, start, end), ignore_index=True)
+
+        pd.testing.assert_frame_equal(load_daily_log(self.connection, self.cache_dir, start, end), expected)
+
+    def test_empty_range(self):
+        sync_history_cache(self.connection, self.cache_dir, today=self.today)
+        self.assertTrue(load_trades(self.connection, self.cache_dir, datetime(2023, 1, 2), datetime(2023, 1, 3)).empty)
+        self.assertTrue(load_daily_log(self.connection, self.cache_dir, datetime(2023, 1, 2), datetime(2023, 1, 3)).empty)
+
+if __name__ == '__main__':
+    unittest.main()
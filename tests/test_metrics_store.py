@@ -0,0 +1,105 @@
+import sys
+import os
+import unittest
+from datetime import datetime, date
+
+# Add parent directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from unittest import mock
+
+from tat_fixtures import create_tat_database, insert_trade, insert_daily_log
+from db_handler import get_trades_range, iter_trades_on_days
+from metrics_store import MetricsStore, load_daily_metrics
+from PL_Summary import calculate_premium_captured_over_range
+from utils import calculate_daily_metrics, get_last_spx_value
+
+class TestMetricsStore(unittest.TestCase):
+    def setUp(self):
+        self.connection = create_tat_database()
+        for day in (23, 24, 25):
+            insert_trade(self.connection, datetime(2024, 9, day, 10, 0), 100.0 * day - 2400, 300.0,
+                         closing_processed=day % 2, price_close=-4.7, price_stop_target=4.0)
+            insert_daily_log(self.connection, datetime(2024, 9, day, 9, 31), 5.0, 5700.0 + day)
+            insert_daily_log(self.connection, datetime(2024, 9, day, 15, 59), 10.0 * day, 5800.0 + day)
+        self.connection.commit()
+        self.store = MetricsStore(":memory:", today=datetime(2024, 9, 25))
+
+    def tearDown(self):
+        self.store.close()
+        self.connection.close()
+
+    def live_metrics(self, start, end):
+        return calculate_daily_metrics(get_trades_range(self.connection, start, end))
+
+    def test_initial_refresh_stores_finished_days_only(self):
+        recomputed = self.store.refresh(self.connection)
+        self.assertEqual(recomputed, [date(2024, 9, 23), date(2024, 9, 24)])
+
+        stored = self.store.get_daily_metrics(datetime(2024, 9, 1), datetime(2024, 9, 30))
+        live = self.live_metrics(datetime(2024, 9, 23), datetime(2024, 9, 24))
+        self.assertTrue(stored.equals(live.astype(stored.dtypes)))
+
+        merged = load_daily_metrics(self.connection, datetime(2024, 9, 23), datetime(2024, 9, 25), self.store)
+        self.assertEqual(len(merged), 3)
+
+    def test_incremental_refresh_touches_changed_days(self):
+        self.store.refresh(self.connection)
+
+        # Nothing changed: only the previously in-progress day (today) is re-examined
+        self.assertEqual(self.store.refresh(self.connection), [])
+
+        # A late trade on the 23rd and an open trade on the 24th
+        insert_trade(self.connection, datetime(2024, 9, 23, 14, 0), 50.0, 100.0)
+        insert_trade(self.connection, datetime(2024, 9, 24, 14, 0), 0.0, 100.0, closing_processed=None)
+        self.assertEqual(self.store.refresh(self.connection), [date(2024, 9, 23), date(2024, 9, 24)])
+        self.assertEqual(self.store.refresh(self.connection), [])
+
+        # Closing the open trade dirties its day again
+        self.connection.execute("UPDATE Trade SET ClosingProcessed = 1, ProfitLoss = -80 WHERE ClosingProcessed IS NULL;")
+        self.assertEqual(self.store.refresh(self.connection), [date(2024, 9, 24)])
+
+        stored = self.store.get_daily_metrics(datetime(2024, 9, 23), datetime(2024, 9, 24))
+        live = self.live_metrics(datetime(2024, 9, 23), datetime(2024, 9, 24))
+        self.assertTrue(stored.equals(live.astype(stored.dtypes)))
+
+    def test_sparse_dirty_days_read_only_those_days(self):
+        self.store.refresh(self.connection)
+        # A late edit far back in the month and one on the 24th; the 23rd stays clean
+        insert_trade(self.connection, datetime(2024, 9, 3, 11, 0), 20.0, 100.0)
+        insert_trade(self.connection, datetime(2024, 9, 24, 14, 0), 30.0, 100.0)
+
+        read_days = set()
+
+        def tracked(*args, **kwargs):
+            for chunk in iter_trades_on_days(*args, **kwargs):
+                read_days.update(chunk['TradeDate'].dt.date)
+                yield chunk
+
+        with mock.patch('metrics_store.iter_trades_on_days', tracked):
+            recomputed = self.store.refresh(self.connection)
+
+        self.assertEqual(recomputed, [date(2024, 9, 3), date(2024, 9, 24)])
+        self.assertEqual(read_days, {date(2024, 9, 3), date(2024, 9, 24)})
+        stored = self.store.get_daily_metrics(datetime(2024, 9, 1), datetime(2024, 9, 24))
+        live = self.live_metrics(datetime(2024, 9, 1), datetime(2024, 9, 24))
+        self.assertTrue(stored.equals(live.astype(stored.dtypes)))
+
+    def test_readers_match_live_results(self):
+        self.store.refresh(self.connection)
+        start, end = datetime(2024, 9, 1), datetime(2024, 9, 25)
+        self.assertAlmostEqual(
+            calculate_premium_captured_over_range(start, end, self.connection, self.store),
+            calculate_premium_captured_over_range(start, end, self.connection),
+        )
+        for day in (23, 24, 25):
+            with self.subTest(day=day):
+                self.assertEqual(
+                    get_last_spx_value(self.connection, 2024, 9, day, self.store),
+                    get_last_spx_value(self.connection, 2024, 9, day),
+                )
+        logs = self.store.get_last_of_day_logs(datetime(2024, 9, 1), datetime(2024, 9, 30))
+        self.assertEqual(list(logs['PL']), [230.0, 240.0, 250.0])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,58 @@
+import sys
+import os
+import unittest
+from datetime import datetime
+
+# Add parent directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tat_fixtures import create_tat_database, insert_trade
+from PL_Summary import (
+    get_daily_premium_captured, build_cumulative_pl, premium_captured_between,
+    calculate_premium_captured_over_range, calculate_wtd_mtd_pl
+)
+
+class TestPremiumCapturedRange(unittest.TestCase):
+    def setUp(self):
+        self.connection = create_tat_database()
+        # (opened, ProfitLoss)
+        trades = [
+            (datetime(2024, 8, 30, 10, 0), 500.0),   # Friday of the previous month
+            (datetime(2024, 9, 3, 10, 0), 100.0),
+            (datetime(2024, 9, 3, 11, 0), -40.0),
+            (datetime(2024, 9, 9, 10, 0), 250.0),    # Monday
+            (datetime(2024, 9, 11, 10, 0), -75.5),
+        ]
+        for opened, profit_loss in trades:
+            insert_trade(self.connection, opened, profit_loss, total_premium=200.0)
+        # Trades without a TATTradeID are ignored
+        insert_trade(self.connection, datetime(2024, 9, 10, 10, 0), 999.0, 200.0, tat_trade_id=None)
+
+    def tearDown(self):
+        self.connection.close()
+
+    def test_daily_series_covers_every_calendar_day(self):
+        daily_pl = get_daily_premium_captured(self.connection, datetime(2024, 9, 1), datetime(2024, 9, 11))
+        self.assertEqual(len(daily_pl), 11)
+        self.assertAlmostEqual(daily_pl.loc[datetime(2024, 9, 3).date()], 60.0)
+        self.assertEqual(daily_pl.loc[datetime(2024, 9, 10).date()], 0)
+
+    def test_windows_from_one_cumulative_series(self):
+        cumulative_pl = build_cumulative_pl(
+            get_daily_premium_captured(self.connection, datetime(2024, 8, 26), datetime(2024, 9, 11))
+        )
+        self.assertAlmostEqual(premium_captured_between(cumulative_pl, datetime(2024, 8, 26), datetime(2024, 8, 31)), 500.0)
+        self.assertAlmostEqual(premium_captured_between(cumulative_pl, datetime(2024, 9, 1), datetime(2024, 9, 11)), 234.5)
+        self.assertAlmostEqual(premium_captured_between(cumulative_pl, datetime(2024, 9, 9), datetime(2024, 9, 10)), 250.0)
+        with self.assertRaises(ValueError):
+            premium_captured_between(cumulative_pl, datetime(2024, 8, 1), datetime(2024, 9, 11))
+
+    def test_range_matches_wtd_mtd(self):
+        date = datetime(2024, 9, 11)
+        weekly_pl, monthly_pl = calculate_wtd_mtd_pl(self.connection, date)
+        self.assertAlmostEqual(monthly_pl, calculate_premium_captured_over_range(datetime(2024, 9, 1), date, self.connection))
+        self.assertAlmostEqual(monthly_pl, 234.5)
+        self.assertAlmostEqual(weekly_pl, 174.5)
+
+if __name__ == "__main__":
+    unittest.main()
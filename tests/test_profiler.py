@@ -0,0 +1,62 @@
+import sys
+import os
+import json
+import tempfile
+import threading
+import unittest
+
+# Add parent directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import profiler
+from profiler import add_rows, profiled, profiling, stage
+
+@profiled
+def read_rows(count):
+    add_rows(count)
+    return bytearray(2000000)
+
+class TestProfiler(unittest.TestCase):
+
+    def test_inactive_profiler_is_transparent(self):
+        self.assertIsNone(profiler._active)
+        with stage('unused') as record:
+            self.assertIsNone(record)
+        self.assertEqual(len(read_rows(5)), 2000000)
+
+    def test_nested_stages_accumulate_rows_and_memory(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            trace_path = os.path.join(tmp, 'trace.json')
+            with profiling(trace_path) as active:
+                with stage('report'):
+                    read_rows(10)
+                    read_rows(5)
+                worker = threading.Thread(target=read_rows, args=(3,), name='poster')
+                worker.start()
+                worker.join()
+
+            with open(trace_path) as f:
+                trace = json.load(f)
+
+        self.assertIsNone(profiler._active)
+        summary = trace['summary']
+        self.assertEqual(summary['test_profiler.read_rows']['calls'], 3)
+        self.assertEqual(summary['report']['rows'], 15)
+        self.assertEqual(summary['total']['rows'], 15)  # the thread has its own stack
+        self.assertGreaterEqual(summary['report']['peak_memory_bytes'], 2000000)
+
+        stages = {(record['name'], record['thread']): record for record in trace['stages']}
+        self.assertEqual(stages[('test_profiler.read_rows', 'poster')]['depth'], 0)
+        self.assertEqual(stages[('report', 'MainThread')]['parent'], 'total')
+        self.assertGreater(trace['total_seconds'], 0)
+        self.assertEqual(active.records[0]['name'], 'total')
+
+    def test_cprofile_dump(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            cprofile_path = os.path.join(tmp, 'run.prof')
+            with profiling(cprofile_path=cprofile_path):
+                read_rows(1)
+            self.assertGreater(os.path.getsize(cprofile_path), 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,125 @@
+import sys
+import os
+import sqlite3
+import tempfile
+import time
+import unittest
+from datetime import datetime
+from unittest import mock
+
+# Add parent directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import db_handler
+from tat_fixtures import generate_tat_database, insert_trade, trading_days
+from replica import sync_replica
+from utils import DAILY_METRICS_QUERY
+
+def table_rows(path, table):
+    connection = sqlite3.connect(path)
+    try:
+        return connection.execute(f"SELECT * FROM {table} ORDER BY 1;").fetchall()
+    finally:
+        connection.close()
+
+class TestReplica(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.source_path = os.path.join(self.tmp.name, 'tat.db3')
+        self.replica_path = os.path.join(self.tmp.name, 'replica.db3')
+        self.days = trading_days(datetime(2024, 9, 2), 3)
+        self.source = generate_tat_database(self.source_path, start_date=self.days[0], days=3, trades_per_day=20,
+                                            log_interval_seconds=1800, orphan_ratio=0.1)
+
+    def tearDown(self):
+        self.source.close()
+        self.tmp.cleanup()
+
+    def assert_in_sync(self):
+        for table in ('Trade', 'DailyLog'):
+            self.assertEqual(table_rows(self.replica_path, table), table_rows(self.source_path, table))
+
+    def test_first_sync_copies_indexes_and_analyzes(self):
+        self.assertEqual(sync_replica(self.source_path, self.replica_path), self.replica_path)
+        self.assert_in_sync()
+
+        replica = sqlite3.connect(self.replica_path)
+        try:
+            indexes = {row[0] for row in replica.execute("SELECT name FROM sqlite_master WHERE type = 'index';")}
+            self.assertIn('idx_trade_day_key_metrics', indexes)
+            self.assertIn('idx_daily_log_date', indexes)
+            self.assertGreater(replica.execute("SELECT COUNT(*) FROM sqlite_stat1;").fetchone()[0], 0)
+
+            plan = replica.execute("EXPLAIN QUERY PLAN " + DAILY_METRICS_QUERY,
+                                   {'threshold': 0.5, 'start': 20240902, 'end': 20240904}).fetchall()
+            self.assertIn('COVERING INDEX idx_trade_day_key_metrics', ' '.join(row[-1] for row in plan))
+        finally:
+            replica.close()
+
+    def test_incremental_sync_picks_up_new_and_closed_trades(self):
+        sync_replica(self.source_path, self.replica_path)
+
+        # TAT closes the open trades, removes an orphan and adds new rows
+        self.source.execute("UPDATE Trade SET ClosingProcessed = 0, ProfitLoss = 12.5 WHERE ClosingProcessed IS NULL;")
+        self.source.execute("DELETE FROM Trade WHERE TradeID = (SELECT MIN(TradeID) FROM Trade WHERE TATTradeID IS NULL);")
+        insert_trade(self.source, self.days[-1].replace(hour=15), profit_loss=40.0, total_premium=100.0)
+        self.source.execute("INSERT INTO DailyLog (LogDate, PL, SPX) SELECT MAX(LogDate) + 1, 1.0, 5600.0 FROM DailyLog;")
+        self.source.commit()
+
+        with mock.patch('replica._copy_database') as full_copy:
+            sync_replica(self.source_path, self.replica_path)
+        full_copy.assert_not_called()
+        self.assert_in_sync()
+
+    def test_edited_history_rebuilds_the_replica(self):
+        sync_replica(self.source_path, self.replica_path)
+
+        # Edits to settled trades and old log rows are not revisited by the incremental copy
+        self.source.execute("UPDATE Trade SET ProfitLoss = ProfitLoss + 1 "
+                            "WHERE TradeID = (SELECT MIN(TradeID) FROM Trade WHERE ClosingProcessed IS NOT NULL "
+                            "AND TATTradeID IS NOT NULL);")
+        self.source.execute("DELETE FROM DailyLog WHERE DailyLogID = (SELECT MIN(DailyLogID) FROM DailyLog);")
+        self.source.commit()
+
+        sync_replica(self.source_path, self.replica_path, check_interval=0)
+        self.assert_in_sync()
+
+    def test_checksums_are_compared_once_per_interval(self):
+        sync_replica(self.source_path, self.replica_path)
+        self.source.execute("UPDATE Trade SET ProfitLoss = ProfitLoss + 1 "
+                            "WHERE TradeID = (SELECT MIN(TradeID) FROM Trade WHERE ClosingProcessed IS NOT NULL "
+                            "AND TATTradeID IS NOT NULL);")
+        self.source.commit()
+
+        # The copy was checked when it was made: no full scan within the interval
+        with mock.patch('replica._checksums') as checksums:
+            sync_replica(self.source_path, self.replica_path)
+        checksums.assert_not_called()
+        self.assertNotEqual(table_rows(self.replica_path, 'Trade'), table_rows(self.source_path, 'Trade'))
+
+        with mock.patch('replica.time.time', return_value=time.time() + 25 * 3600):
+            sync_replica(self.source_path, self.replica_path)
+        self.assert_in_sync()
+
+    def test_replaced_source_rebuilds_the_replica(self):
+        sync_replica(self.source_path, self.replica_path)
+
+        self.source.close()
+        os.remove(self.source_path)
+        self.source = generate_tat_database(self.source_path, start_date=self.days[0], days=1, trades_per_day=5)
+        sync_replica(self.source_path, self.replica_path)
+        self.assert_in_sync()
+
+    def test_connect_db_opens_the_replica(self):
+        config = {'db_path': self.source_path, 'replica': True, 'replica_path': self.replica_path}
+        with mock.patch.object(db_handler, 'load_config', return_value=config):
+            with db_handler.connect_db() as connection:
+                database_file = connection.execute("PRAGMA database_list;").fetchone()[2]
+                trade_count = connection.execute("SELECT COUNT(*) FROM Trade;").fetchone()[0]
+
+        self.assertEqual(os.path.realpath(database_file), os.path.realpath(self.replica_path))
+        self.assertEqual(trade_count, 60)
+
+if __name__ == '__main__':
+    unittest.main()
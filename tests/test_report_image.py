@@ -0,0 +1,65 @@
+import sys
+import os
+import time
+import unittest
+from datetime import datetime, timedelta
+from io import BytesIO
+
+from PIL import Image
+
+# Add parent directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tat_fixtures import create_tat_database, insert_trade, insert_daily_log
+from report_image import IMAGE_WIDTH, MAX_TABLE_ROWS, build_report_image, get_intraday_log
+
+class TestReportImage(unittest.TestCase):
+
+    def setUp(self):
+        self.date = datetime(datetime.now().year, 9, 20)
+        self.connection = create_tat_database()
+        opened = self.date.replace(hour=10)
+        for i in range(MAX_TABLE_ROWS + 5):
+            insert_trade(self.connection, opened + timedelta(minutes=5 * i), profit_loss=(-1) ** i * 50.0,
+                         total_premium=120.0, closing_processed=i % 2, price_close=-1.2, price_stop_target=1.0)
+        for minute in range(0, 390, 1):
+            log_time = self.date.replace(hour=9, minute=30) + timedelta(minutes=minute)
+            insert_daily_log(self.connection, log_time, pl=minute * 2.0 - 200, spx=5600 + minute / 10)
+        self.connection.commit()
+
+    def tearDown(self):
+        self.connection.close()
+
+    def test_renders_trades_and_curve_quickly(self):
+        start = time.perf_counter()
+        filename, data = build_report_image(self.connection, self.date)
+        elapsed = time.perf_counter() - start
+
+        self.assertEqual(filename, f"report_{self.date:%Y%m%d}.png")
+        image = Image.open(BytesIO(data))
+        self.assertEqual(image.width, IMAGE_WIDTH)
+        self.assertGreater(image.height, 400)
+        self.assertLess(elapsed, 1.0)
+
+    def test_day_without_data_still_renders(self):
+        filename, data = build_report_image(self.connection, self.date + timedelta(days=1), {'format': 'jpeg'})
+
+        self.assertTrue(filename.endswith('.jpg'))
+        self.assertEqual(Image.open(BytesIO(data)).format, 'JPEG')
+
+    def test_intraday_log_is_limited_to_the_day(self):
+        insert_daily_log(self.connection, self.date + timedelta(days=1, hours=10), pl=1.0, spx=1.0)
+        df_log = get_intraday_log(self.connection, self.date)
+
+        self.assertEqual(len(df_log), 390)
+        self.assertTrue(df_log['LogDate'].is_monotonic_increasing)
+
+    def test_intraday_log_of_a_date_with_time_of_day(self):
+        # --render of today passes datetime.now(): the whole day is drawn
+        df_log = get_intraday_log(self.connection, self.date.replace(hour=15, minute=45))
+
+        self.assertEqual(len(df_log), 390)
+        self.assertEqual(df_log['LogDate'].iloc[0], self.date.replace(hour=9, minute=30))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,172 @@
+import sys
+import os
+import json
+import tempfile
+import unittest
+from datetime import date, datetime, time, timedelta
+from unittest import mock
+
+# Add parent directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from test_discord_messenger import start_stub_server
+from discord_messenger import load_posted_messages, record_posted_messages
+from scheduler import get_market_holidays, get_post_time, is_trading_day, parse_post_time, wait_until
+from Trade_Scout import parse_args, run_delete, run_scheduled
+
+class TestScheduler(unittest.TestCase):
+
+    def test_trading_days(self):
+        holidays = get_market_holidays({'market_holidays': [20241128]})
+        self.assertTrue(is_trading_day(datetime(2024, 11, 27, 16, 15), holidays))
+        self.assertFalse(is_trading_day(date(2024, 11, 28), holidays))  # Thanksgiving
+        self.assertFalse(is_trading_day(date(2024, 11, 30), holidays))  # Saturday
+        self.assertEqual(get_market_holidays({}), set())
+
+    def test_post_time(self):
+        self.assertEqual(get_post_time({}), time(16, 15))
+        self.assertEqual(get_post_time({'schedule_time': '16:05'}), time(16, 5))
+        self.assertEqual(get_post_time({'schedule_time': '16:05'}, '17:00'), time(17, 0))
+        with self.assertRaises(ValueError):
+            parse_post_time('4pm')
+
+    def test_wait_until_sleeps_in_steps(self):
+        clock = [datetime(2024, 9, 23, 15, 57, 30)]
+        sleeps = []
+
+        def sleep(seconds):
+            sleeps.append(seconds)
+            clock[0] += timedelta(seconds=seconds)
+
+        wait_until(datetime(2024, 9, 23, 16, 0), now=lambda: clock[0], sleep=sleep)
+        self.assertEqual(sleeps, [60, 60, 30])
+
+        sleeps.clear()
+        wait_until(datetime(2024, 9, 23, 15, 0), now=lambda: clock[0], sleep=sleep)
+        self.assertEqual(sleeps, [])
+
+    def test_schedule_and_delete_arguments(self):
+        self.assertEqual(parse_args(['--schedule']).schedule, '')
+        self.assertEqual(parse_args(['--schedule', '16:30', '--noimage']).schedule, '16:30')
+        self.assertTrue(parse_args(['--delete', '--from', '20240901', '--to', '20240930']).delete)
+        for argv in (['--schedule', '--date', '20240923'], ['--schedule', '--watch'], ['--delete', '--edit']):
+            with self.subTest(argv=argv), self.assertRaises(SystemExit):
+                parse_args(argv)
+
+class TestScheduledRun(unittest.TestCase):
+    """
+    run_scheduled and run_delete against the stub webhook server, with a
+    temporary ledger and a fake clock.
+    """
+
+    def setUp(self):
+        self.server, base_url = start_stub_server()
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.ledger_path = os.path.join(self.temp_dir.name, 'posted_messages.json')
+        self.config = {
+            'webhooks': [{'url': f"{base_url}/0"}, {'url': f"{base_url}/1"}],
+            'message_ledger_path': self.ledger_path,
+            'market_holidays': [20240902],
+            'post_retry_delay': 30,
+        }
+        self.patches = [
+            mock.patch('Trade_Scout.load_yaml_config', return_value=self.config),
+            mock.patch('discord_messenger.load_yaml_config', return_value=self.config),
+            mock.patch('Trade_Scout.build_report', return_value=("report", None)),
+        ]
+        for patch in self.patches:
+            patch.start()
+        self.sleeps = []
+
+    def tearDown(self):
+        for patch in self.patches:
+            patch.stop()
+        self.server.shutdown()
+        self.server.server_close()
+        self.temp_dir.cleanup()
+
+    def run_at(self, start, argv=('--schedule', '16:15', '--noimage'), databases=()):
+        clock = [start]
+
+        def sleep(seconds):
+            self.sleeps.append(seconds)
+            clock[0] += timedelta(seconds=seconds)
+
+        run_scheduled(parse_args(list(argv)), list(databases), now=lambda: clock[0], sleep=sleep)
+
+    def requests(self, method):
+        return sorted(p.split('?')[0] for m, p, _ in self.server.requests if m == method)
+
+    def test_weekends_and_holidays_post_nothing(self):
+        self.run_at(datetime(2024, 9, 7, 16, 0))  # Saturday
+        self.run_at(datetime(2024, 9, 2, 16, 0))  # Labor Day, in market_holidays
+        self.assertEqual(self.server.requests, [])
+        self.assertEqual(self.sleeps, [])
+
+    def test_waits_then_posts_and_records(self):
+        self.run_at(datetime(2024, 9, 3, 16, 13, 30))
+
+        self.assertEqual(self.sleeps, [60, 30])
+        self.assertEqual(self.requests("POST"), ["/api/webhooks/0", "/api/webhooks/1"])
+        self.assertEqual([p["id"] for p in load_posted_messages("20240903", self.ledger_path)], ["msg-0", "msg-1"])
+
+    def test_replica_checked_before_waiting(self):
+        self.config.update({'db_path': 'tat.db3', 'replica': True, 'replica_path': 'replica.db3'})
+        def sync_replica(*args, check_interval):
+            self.sleeps.append(('sync', check_interval))
+
+        with mock.patch('replica.sync_replica', side_effect=sync_replica):
+            self.run_at(datetime(2024, 9, 3, 16, 14), databases=[{'name': None, 'db_path': 'tat.db3'}])
+
+        self.assertEqual(self.sleeps, [('sync', 0), 60])
+
+    def test_rerun_edits_and_posts_only_missing_webhooks(self):
+        record_posted_messages("20240903", [{'url': self.config['webhooks'][0]['url'], 'thread_id': None,
+                                             'id': 'msg-0'}], self.ledger_path)
+        self.run_at(datetime(2024, 9, 3, 16, 30))
+
+        self.assertEqual(self.requests("PATCH"), ["/api/webhooks/0/messages/msg-0"])
+        self.assertEqual(self.requests("POST"), ["/api/webhooks/1"])
+        self.assertEqual(len(load_posted_messages("20240903", self.ledger_path)), 2)
+
+    def test_failed_post_exits_with_error(self):
+        self.server.statuses = {"/api/webhooks/1": 404}
+        with self.assertRaises(SystemExit) as raised:
+            self.run_at(datetime(2024, 9, 3, 16, 30))
+
+        self.assertNotEqual(raised.exception.code, 0)
+        # A permanent failure is not retried; the acknowledged post is in the ledger
+        self.assertEqual(self.requests("POST"), ["/api/webhooks/0", "/api/webhooks/1"])
+        self.assertEqual([p["id"] for p in load_posted_messages("20240903", self.ledger_path)], ["msg-0"])
+
+    def test_acknowledged_posts_recorded_before_retrying(self):
+        self.server.failing = {"/api/webhooks/1": 1}
+        ledger_at_sleep = []
+
+        with mock.patch('Trade_Scout.record_posted_messages', wraps=record_posted_messages) as record:
+            clock = [datetime(2024, 9, 3, 16, 30)]
+
+            def sleep(seconds):
+                with open(self.ledger_path, encoding='utf-8') as f:
+                    ledger_at_sleep.append(json.load(f))
+                clock[0] += timedelta(seconds=seconds)
+
+            run_scheduled(parse_args(['--schedule', '16:15', '--noimage']), [], now=lambda: clock[0], sleep=sleep)
+
+        self.assertEqual([p["id"] for p in ledger_at_sleep[0]["20240903"]], ["msg-0"])
+        self.assertEqual(record.call_count, 2)
+        self.assertEqual(len(load_posted_messages("20240903", self.ledger_path)), 2)
+
+    def test_delete_keeps_failed_deletions_in_the_ledger(self):
+        urls = [webhook['url'] for webhook in self.config['webhooks']]
+        record_posted_messages("20240903", [{'url': url, 'thread_id': None, 'id': f"msg-{i}"}
+                                            for i, url in enumerate(urls)], self.ledger_path)
+        self.server.statuses = {"/api/webhooks/1/messages/msg-1": 404}
+
+        run_delete(parse_args(['--delete', '--date', '20240903']))
+
+        self.assertEqual(self.requests("DELETE"), ["/api/webhooks/0/messages/msg-0", "/api/webhooks/1/messages/msg-1"])
+        self.assertEqual([p["id"] for p in load_posted_messages("20240903", self.ledger_path)], ["msg-1"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+import sys
+import os
+import unittest
+from io import BytesIO
+
+from PIL import Image
+
+# Add parent directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from screenshot import encode_image, take_screenshot_of_app, wait_until
+
+class FakeWindow:
+    def __init__(self, title, polls_until_active=0):
+        self.title = title
+        self.polls_until_active = polls_until_active
+        self.activated = False
+
+class FakeBackend:
+    """
+    Capture backend serving a generated image; the window becomes active after
+    a given number of is_ready polls.
+    """
+
+    def __init__(self, image, window):
+        self.image = image
+        self.window = window
+        self.polls = 0
+        self.grabs = 0
+
+    def find_window(self, title):
+        return self.window if self.window and self.window.title == title else None
+
+    def prepare_window(self, window, win):
+        window.activated = True
+
+    def is_ready(self, window):
+        self.polls += 1
+        return window.activated and self.polls > window.polls_until_active
+
+    def grab(self, window):
+        self.grabs += 1
+        return self.image
+
+class TestScreenshot(unittest.TestCase):
+
+    def setUp(self):
+        self.image = Image.new('RGB', (400, 200), (30, 60, 90))
+
+    def test_capture_is_encoded_in_memory(self):
+        backend = FakeBackend(self.image, FakeWindow("TAT"))
+        filename, data = take_screenshot_of_app("TAT", None, backend=backend)
+
+        self.assertEqual(filename, 'screenshot.png')
+        self.assertEqual(backend.grabs, 1)
+        decoded = Image.open(BytesIO(data))
+        self.assertEqual(decoded.size, (400, 200))
+        self.assertEqual(decoded.getpixel((10, 10)), (30, 60, 90))
+
+    def test_capture_waits_only_until_window_is_active(self):
+        backend = FakeBackend(self.image, FakeWindow("TAT", polls_until_active=3))
+        result = take_screenshot_of_app("TAT", None, backend=backend, timeout=5)
+
+        self.assertIsNotNone(result)
+        self.assertEqual(backend.polls, 4)
+
+    def test_inactive_or_missing_window_returns_none(self):
+        backend = FakeBackend(self.image, FakeWindow("TAT", polls_until_active=10 ** 6))
+        self.assertIsNone(take_screenshot_of_app("TAT", None, backend=backend, timeout=0.1))
+        self.assertEqual(backend.grabs, 0)
+
+        self.assertIsNone(take_screenshot_of_app("Other", None, backend=backend))
+
+    def test_wait_until_gives_up_after_timeout(self):
+        now = [0.0]
+        sleeps = []
+
+        def sleep(seconds):
+            sleeps.append(seconds)
+            now[0] += seconds
+
+        self.assertFalse(wait_until(lambda: False, timeout=1.0, interval=0.25, clock=lambda: now[0], sleep=sleep))
+        self.assertEqual(sleeps, [0.25] * 4)
+
+    def test_encode_crops_downscales_and_compresses(self):
+        filename, data = encode_image(self.image, {
+            'format': 'jpeg', 'crop': [0, 0, 300, 200], 'max_width': 150, 'optimize': True
+        })
+
+        self.assertEqual(filename, 'screenshot.jpg')
+        decoded = Image.open(BytesIO(data))
+        self.assertEqual(decoded.format, 'JPEG')
+        self.assertEqual(decoded.size, (150, 100))
+
+if __name__ == '__main__':
+    unittest.main()
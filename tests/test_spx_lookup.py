@@ -0,0 +1,59 @@
+import sys
+import os
+import unittest
+from datetime import datetime, date
+from unittest import mock
+
+# Add parent directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tat_fixtures import create_tat_database, insert_daily_log
+from utils import get_last_spx_value, get_last_spx_values
+
+class TestSPXLookup(unittest.TestCase):
+    def setUp(self):
+        self.connection = create_tat_database()
+        # Rows are deliberately inserted out of time order
+        insert_daily_log(self.connection, datetime(2024, 9, 23, 15, 59), 100.0, 5718.57)
+        insert_daily_log(self.connection, datetime(2024, 9, 23, 9, 31), 10.0, 5702.55)
+        insert_daily_log(self.connection, datetime(2024, 9, 24, 0, 0), 0.0, 5710.00)
+        insert_daily_log(self.connection, datetime(2024, 9, 24, 23, 59, 59), 50.0, 5732.93)
+        insert_daily_log(self.connection, datetime(2023, 9, 23, 15, 59), 75.0, 4320.06)
+
+    def tearDown(self):
+        self.connection.close()
+
+    def test_last_row_of_the_day(self):
+        self.assertEqual(get_last_spx_value(self.connection, 2024, 9, 23), 5718.57)
+        self.assertEqual(get_last_spx_value(self.connection, 2024, 9, 24), 5732.93)
+        self.assertEqual(get_last_spx_value(self.connection, 2023, 9, 23), 4320.06)
+        self.assertIsNone(get_last_spx_value(self.connection, 2024, 9, 25))
+
+    def test_batch_matches_single_lookups(self):
+        dates = [datetime(2024, 9, 24), date(2024, 9, 23), date(2024, 9, 25), date(2023, 9, 23)]
+        result = get_last_spx_values(self.connection, dates)
+        self.assertEqual(result, {
+            date(2023, 9, 23): 4320.06,
+            date(2024, 9, 23): 5718.57,
+            date(2024, 9, 24): 5732.93,
+            date(2024, 9, 25): None,
+        })
+        self.assertEqual(get_last_spx_values(self.connection, []), {})
+
+    def test_batch_reads_only_requested_days(self):
+        # A row between the requested days must not be needed, nor returned
+        insert_daily_log(self.connection, datetime(2024, 3, 1, 15, 59), 0.0, 5100.00)
+        statements = []
+        self.connection.set_trace_callback(statements.append)
+        with mock.patch('utils.SPX_RANGES_PER_QUERY', 1):
+            result = get_last_spx_values(self.connection, [date(2023, 9, 23), date(2024, 9, 23), date(2024, 9, 24)])
+        self.connection.set_trace_callback(None)
+
+        self.assertEqual(result, {date(2023, 9, 23): 4320.06, date(2024, 9, 23): 5718.57, date(2024, 9, 24): 5732.93})
+        # Two runs of consecutive days, one LogDate range (and query) each
+        spx_queries = [statement for statement in statements if 'FROM DailyLog' in statement]
+        self.assertEqual(len(spx_queries), 2)
+        self.assertTrue(all(statement.count('BETWEEN') == 1 for statement in spx_queries))
+
+if __name__ == "__main__":
+    unittest.main()
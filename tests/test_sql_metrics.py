@@ -0,0 +1,67 @@
+import sys
+import os
+import unittest
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+# Add parent directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tat_fixtures import generate_tat_database, trading_days
+from db_handler import get_trades
+from metrics_store import load_daily_metrics
+from utils import (
+    METRIC_COLUMNS, calculate_metrics, format_message, get_day_metrics,
+    get_metrics_backend, query_day_metrics
+)
+
+class TestSqlMetrics(unittest.TestCase):
+
+    def setUp(self):
+        self.days = trading_days(datetime(2024, 9, 2), 15)
+        self.connection = generate_tat_database(
+            ':memory:', start_date=self.days[0], days=15, trades_per_day=60, orphan_ratio=0.05
+        )
+
+    def tearDown(self):
+        self.connection.close()
+
+    def test_daily_metrics_match_pandas(self):
+        start, end = self.days[0], self.days[-1] + timedelta(days=2)
+        pandas_metrics = load_daily_metrics(self.connection, start, end, backend='pandas')
+        sql_metrics = load_daily_metrics(self.connection, start, end, backend='sql')
+
+        pd.testing.assert_frame_equal(pandas_metrics, sql_metrics, check_exact=False, rtol=1e-12,
+                                      check_index_type=False, check_freq=False)
+        self.assertEqual(list(sql_metrics.columns), METRIC_COLUMNS)
+        self.assertGreater(sql_metrics['bad_slip'].sum(), 0)
+
+        # The formatted reports are identical
+        for day in self.days:
+            messages = {
+                format_message(day, *get_day_metrics(metrics, day)[:8], 5600.0,
+                               get_day_metrics(metrics, day)[8], 0, 0)
+                for metrics in (pandas_metrics, sql_metrics)
+            }
+            self.assertEqual(len(messages), 1)
+
+    def test_single_day_tuple_matches_calculate_metrics(self):
+        day = self.days[-1]  # has open trades
+        expected = calculate_metrics(get_trades(self.connection, day.year, day.month, day.day))
+        actual = query_day_metrics(self.connection, day)
+
+        for name, expected_value, actual_value in zip(METRIC_COLUMNS, expected, actual):
+            with self.subTest(metric=name):
+                self.assertAlmostEqual(expected_value, actual_value, places=9)
+
+        self.assertEqual(query_day_metrics(self.connection, datetime(2024, 9, 7)), (0,) * len(METRIC_COLUMNS))
+
+    def test_backend_is_selected_in_config(self):
+        self.assertEqual(get_metrics_backend({}), 'pandas')
+        self.assertEqual(get_metrics_backend({'metrics_backend': 'sql'}), 'sql')
+        with self.assertRaises(ValueError):
+            get_metrics_backend({'metrics_backend': 'polars'})
+
+if __name__ == '__main__':
+    unittest.main()
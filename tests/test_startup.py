@@ -0,0 +1,46 @@
+import sys
+import os
+import subprocess
+import tempfile
+import unittest
+from unittest import mock
+
+# Add parent directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import utils
+
+REPO_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+class TestStartup(unittest.TestCase):
+
+    def loaded_modules(self, code):
+        result = subprocess.run(
+            [sys.executable, '-c', f"{code}; import sys; print(' '.join(sys.modules))"],
+            cwd=REPO_DIR, capture_output=True, text=True, check=True
+        )
+        return set(result.stdout.split())
+
+    def test_entry_point_skips_gui_and_pandas(self):
+        loaded = self.loaded_modules("import Trade_Scout")
+        for module in ('pandas', 'numpy', 'PIL', 'pyautogui', 'pygetwindow'):
+            self.assertNotIn(module, loaded)
+
+    def test_config_is_parsed_once(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            config_path = os.path.join(tmp, 'config.yaml')
+            with open(config_path, 'w') as f:
+                f.write("db_path: data.db3\n")
+
+            with mock.patch.object(utils, 'get_config_path', return_value=config_path), \
+                 mock.patch.object(utils.yaml, 'safe_load', wraps=utils.yaml.safe_load) as safe_load:
+                first = utils.load_yaml_config()
+                second = utils.load_yaml_config()
+
+            utils._config_cache.pop(config_path, None)
+            self.assertIs(first, second)
+            self.assertEqual(first, {'db_path': 'data.db3'})
+            self.assertEqual(safe_load.call_count, 1)
+
+if __name__ == '__main__':
+    unittest.main()
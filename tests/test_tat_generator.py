@@ -0,0 +1,67 @@
+import sys
+import os
+import unittest
+from datetime import datetime
+
+# Add parent directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tat_fixtures import generate_tat_database, trading_days
+from db_handler import get_trades
+from PL_Summary import get_last_of_day_pl
+from utils import calculate_metrics, get_last_spx_value
+
+class TestTatGenerator(unittest.TestCase):
+
+    def setUp(self):
+        self.days = trading_days(datetime(2024, 9, 2), 5)
+        self.connection = generate_tat_database(':memory:', start_date=self.days[0], days=5, trades_per_day=50,
+                                                 orphan_ratio=0.1)
+
+    def tearDown(self):
+        self.connection.close()
+
+    def test_weekdays_only(self):
+        self.assertEqual(self.days[-1], datetime(2024, 9, 6))
+        self.assertEqual(trading_days(datetime(2024, 2, 28), 2), [datetime(2024, 2, 28), datetime(2024, 3, 1)])
+
+    def test_trade_mix(self):
+        total, orphans, still_open, stopped, expired = self.connection.execute(
+            "SELECT COUNT(*), SUM(TATTradeID IS NULL), SUM(ClosingProcessed IS NULL), "
+            "SUM(ClosingProcessed = 1), SUM(ClosingProcessed = 0) FROM Trade;"
+        ).fetchone()
+
+        self.assertEqual(total, 250)
+        self.assertGreater(stopped, 0)
+        self.assertGreater(expired, stopped)
+        self.assertGreater(still_open, 0)
+        self.assertGreater(orphans, 0)
+
+        # Only the last day has open trades
+        open_days = self.connection.execute(
+            "SELECT DISTINCT Day FROM Trade WHERE ClosingProcessed IS NULL;"
+        ).fetchall()
+        self.assertEqual(open_days, [(self.days[-1].day,)])
+
+    def test_day_columns_match_timestamps(self):
+        day = self.days[2]
+        df_trades = get_trades(self.connection, day.year, day.month, day.day)
+
+        with_tat_id = self.connection.execute(
+            "SELECT COUNT(*) FROM Trade WHERE Day = ? AND TATTradeID IS NOT NULL;", (day.day,)
+        ).fetchone()[0]
+        self.assertEqual(len(df_trades), with_tat_id)
+        self.assertTrue((df_trades['DateOpened'].dt.day == day.day).all())
+        self.assertTrue((df_trades['DateOpened'].dt.hour.between(9, 15)).all())
+        self.assertIsNotNone(get_last_spx_value(self.connection, day.year, day.month, day.day))
+
+    def test_last_log_pl_is_the_days_realized_pl(self):
+        day = self.days[1]
+        df_trades = get_trades(self.connection, day.year, day.month, day.day)
+        df_last_of_day = get_last_of_day_pl(self.connection, day, day)
+
+        premium_captured = calculate_metrics(df_trades)[1]
+        self.assertAlmostEqual(df_last_of_day['PL'].iloc[0], premium_captured, places=2)
+
+if __name__ == '__main__':
+    unittest.main()
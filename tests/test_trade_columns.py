@@ -0,0 +1,62 @@
+import sys
+import os
+import unittest
+from datetime import datetime
+
+import pandas as pd
+
+# Add parent directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tat_fixtures import generate_tat_database, trading_days
+from db_handler import TRADE_COLUMNS, get_trades, get_trades_range
+from utils import METRIC_INPUT_COLUMNS, calculate_daily_metrics, calculate_metrics
+
+class TestTradeColumns(unittest.TestCase):
+
+    def setUp(self):
+        self.days = trading_days(datetime(2024, 9, 2), 10)
+        self.connection = generate_tat_database(':memory:', start_date=self.days[0], days=10, trades_per_day=40)
+
+    def tearDown(self):
+        self.connection.close()
+
+    def test_projection_reads_only_requested_columns(self):
+        day = self.days[0]
+        df_trades = get_trades(self.connection, day.year, day.month, day.day, columns=['ProfitLoss', 'TradeType'])
+
+        self.assertEqual(list(df_trades.columns), ['ProfitLoss', 'TradeType'])
+        self.assertEqual(len(df_trades), len(get_trades(self.connection, day.year, day.month, day.day)))
+
+        df_range = get_trades_range(self.connection, self.days[0], self.days[-1], columns=['ProfitLoss'])
+        self.assertEqual(list(df_range.columns), ['ProfitLoss', 'TradeDate'])
+
+        with self.assertRaises(ValueError):
+            get_trades(self.connection, day.year, day.month, day.day, columns=['ProfitLoss; DROP TABLE Trade'])
+
+    def test_compact_dtypes(self):
+        df_trades = get_trades_range(self.connection, self.days[0], self.days[-1])
+
+        self.assertEqual(list(df_trades.columns), TRADE_COLUMNS + ['TradeDate'])
+        self.assertEqual(df_trades['TradeType'].dtype, 'category')
+        self.assertEqual(df_trades['StopType'].dtype, 'category')
+        self.assertEqual(df_trades['ClosingProcessed'].dtype, pd.Int8Dtype())
+        self.assertEqual(df_trades['Qty'].dtype, pd.Int16Dtype())
+        self.assertEqual(df_trades['ShortPut'].dtype, 'float32')
+        self.assertEqual(df_trades['ProfitLoss'].dtype, 'float64')
+        self.assertTrue(df_trades['ClosingProcessed'].isna().any())  # open trades of the last day
+
+    def test_projected_metrics_match_full_read(self):
+        full = get_trades_range(self.connection, self.days[0], self.days[-1])
+        projected = get_trades_range(self.connection, self.days[0], self.days[-1], columns=METRIC_INPUT_COLUMNS)
+
+        pd.testing.assert_frame_equal(calculate_daily_metrics(full), calculate_daily_metrics(projected))
+
+        last_day = full[full['TradeDate'] == self.days[-1]]
+        self.assertEqual(calculate_metrics(last_day), calculate_metrics(
+            projected[projected['TradeDate'] == self.days[-1]]
+        ))
+        self.assertEqual(calculate_daily_metrics(projected)['expired_trades'].dtype, 'int64')
+
+if __name__ == '__main__':
+    unittest.main()
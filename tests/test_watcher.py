@@ -0,0 +1,122 @@
+import sys
+import os
+import tempfile
+import unittest
+from argparse import Namespace
+from datetime import datetime
+from unittest import mock
+
+# Add parent directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tat_fixtures import create_tat_database, insert_trade, insert_daily_log
+from db_handler import open_connection
+from watcher import IntradayReport, watch
+import db_handler
+import metrics_store
+import watcher
+from Trade_Scout import build_daily_report, run_watch
+
+TODAY = datetime(2024, 9, 24, 12, 0)
+
+class TestWatcher(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db_path = db_path = os.path.join(self.temp_dir.name, 'data.db3')
+        self.writer = create_tat_database(db_path)
+        insert_trade(self.writer, datetime(2024, 9, 23, 10, 0), 150.0, 300.0)
+        insert_trade(self.writer, datetime(2024, 9, 24, 10, 0), -120.0, 250.0, closing_processed=1,
+                     price_close=-4.8, price_stop_target=4.1)
+        insert_trade(self.writer, datetime(2024, 9, 24, 10, 30), 0.0, 200.0, closing_processed=None)
+        insert_daily_log(self.writer, datetime(2024, 9, 24, 10, 31), -120.0, 5720.0)
+        self.writer.commit()
+        self.connection = open_connection(db_path, read_only=True)
+
+    def tearDown(self):
+        self.connection.close()
+        self.writer.close()
+        self.temp_dir.cleanup()
+
+    def tat_writes(self):
+        """Close the open trade, add a new one and log a new SPX value."""
+        self.writer.execute("UPDATE Trade SET ClosingProcessed = 0, ProfitLoss = 190 WHERE ClosingProcessed IS NULL;")
+        insert_trade(self.writer, datetime(2024, 9, 24, 11, 0), 80.0, 100.0)
+        insert_daily_log(self.writer, datetime(2024, 9, 24, 11, 1), 150.0, 5731.5)
+        self.writer.commit()
+
+    def test_incremental_update_matches_full_report(self):
+        report = IntradayReport(self.connection, TODAY)
+        self.assertEqual(report.message(), build_daily_report(self.connection, TODAY))
+
+        # Nothing written yet: the open trade is re-read but nothing differs
+        report.update()
+        self.assertEqual(report.message(), build_daily_report(self.connection, TODAY))
+
+        self.tat_writes()
+        self.assertTrue(report.update())
+        self.assertEqual(len(report.trades), 3)
+        self.assertEqual(report.spx_last, 5731.5)
+        self.assertEqual(report.message(), build_daily_report(self.connection, TODAY))
+
+    def test_trade_without_tat_trade_id_is_picked_up_later(self):
+        report = IntradayReport(self.connection, TODAY)
+
+        # TAT inserts the row first and sets its TATTradeID in a later commit
+        insert_trade(self.writer, datetime(2024, 9, 24, 11, 0), 80.0, 100.0, tat_trade_id=None)
+        self.writer.commit()
+        report.update()
+        self.assertEqual(len(report.trades), 2)
+
+        self.writer.execute("UPDATE Trade SET TATTradeID = 7 WHERE TATTradeID IS NULL;")
+        self.writer.commit()
+        self.assertTrue(report.update())
+        self.assertEqual(len(report.trades), 3)
+        self.assertEqual(report.pending_ids, [])
+        self.assertEqual(report.message(), build_daily_report(self.connection, TODAY))
+
+    def test_watch_publishes_only_on_change(self):
+        published = []
+        calls = []
+
+        def now():
+            calls.append(None)
+            if len(calls) == 3:
+                self.tat_writes()
+            return TODAY
+
+        watch(self.connection, lambda date, message: published.append(message),
+              interval=0, max_ticks=4, now=now)
+
+        self.assertEqual(len(published), 2)
+        self.assertIn("5,720.00", published[0])
+        self.assertEqual(published[1], build_daily_report(self.connection, TODAY))
+
+    def test_watch_reads_tat_database_with_replica_enabled(self):
+        replica_path = os.path.join(self.temp_dir.name, 'replica.db3')
+        config = {'db_path': self.db_path, 'replica': True, 'replica_path': replica_path}
+        published = []
+        database_files = []
+        calls = []
+
+        def now():
+            calls.append(None)
+            if len(calls) == 3:
+                self.tat_writes()
+            return TODAY
+
+        def run_watch_ticks(connection, publish, interval, store):
+            database_files.append(connection.execute("PRAGMA database_list;").fetchone()[2])
+            watch(connection, lambda date, message: published.append(message),
+                  interval=0, store=store, max_ticks=4, now=now)
+
+        with mock.patch.object(db_handler, 'load_config', return_value=config), \
+                mock.patch.object(metrics_store, 'load_yaml_config', return_value=config), \
+                mock.patch.object(watcher, 'watch', run_watch_ticks):
+            run_watch(Namespace(watch=0, noimage=True, win=False, debug=False))
+
+        self.assertEqual(os.path.realpath(database_files[0]), os.path.realpath(self.db_path))
+        self.assertEqual(len(published), 2)
+        self.assertEqual(published[1], build_daily_report(self.connection, TODAY))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,76 +1,45 @@
 import os
 import sys
 import yaml
-import pandas as pd
 import sqlite3
-import pygetwindow as gw
-import pyautogui
 from datetime import datetime, timedelta
 import threading
+import time
 import calendar
-from io import BytesIO
-import tempfile
+from profiler import add_rows, profiled
 
-def load_yaml_config():
+def get_config_path():
     """
-    Load the YAML configuration file from the correct path based on whether
-    the program is running as a script or as an executable.
+    Return the path of config.yaml based on whether the program is running as
+    a script or as an executable.
     """
     if hasattr(sys, '_MEIPASS'):
         # If running as an executable, load from the same directory as the executable
-        config_path = os.path.join(os.path.dirname(sys.executable), 'config.yaml')
+        return os.path.join(os.path.dirname(sys.executable), 'config.yaml')
     else:
         # If running as a script, load from the 'config' folder at the same level as the script
         script_dir = os.path.dirname(__file__)
-        config_path = os.path.join(script_dir, 'config', 'config.yaml')
-
-    if not os.path.exists(config_path):
-        raise FileNotFoundError(f"Configuration file not found at {config_path}")
-
-    with open(config_path, 'r') as f:
-        return yaml.safe_load(f)
-
-def take_screenshot_of_app(app_name, win):
-    try:
-        # Filter windows to match exactly the specified app name
-        app_windows = [w for w in gw.getWindowsWithTitle(app_name) if w.title == app_name]
-        
-        if not app_windows:
-            print(f"Application window '{app_name}' not found.")
-            return None
+        return os.path.join(script_dir, 'config', 'config.yaml')
 
-        app_window = app_windows[0]  # Use the first window that exactly matches the app name
-        
-        # Handle window adjustment
-        if win == 'max' and not app_window.isMaximized:
-            app_window.maximize()
-        elif win == 'restore' and app_window.isMinimized:
-            app_window.restore()
+_config_cache = {}
 
-        app_window.activate()
-        pyautogui.sleep(2)  # Give it time to activate
-
-        # Ensure the window is still visible before taking a screenshot
-        if not app_window.isActive:
-            print(f"Application window '{app_name}' is not active.")
-            return None
-
-        # Take the screenshot
-        screenshot = pyautogui.screenshot(region=(app_window.left, app_window.top, app_window.width, app_window.height))
+def load_yaml_config():
+    """
+    Load the YAML configuration file from the correct path based on whether
+    the program is running as a script or as an executable.
 
-        # Save the screenshot to a temporary file
-        temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.png')
-        screenshot.save(temp_file.name)
-        temp_file.close()
+    The file is parsed once per process; later calls return the same dict,
+    which callers must not modify.
+    """
+    config_path = get_config_path()
 
-        return temp_file.name  # Return the path of the temporary screenshot file
+    if config_path not in _config_cache:
+        if not os.path.exists(config_path):
+            raise FileNotFoundError(f"Configuration file not found at {config_path}")
 
-    except IndexError:
-        print(f"Application window '{app_name}' not found.")
-        return None
-    except Exception as e:
-        print(f"An error occurred while capturing the screenshot: {e}")
-        return None
+        with open(config_path, 'r') as f:
+            _config_cache[config_path] = yaml.safe_load(f)
+    return _config_cache[config_path]
 
 def convert_to_human_readable(bigint_timestamp):
     """
@@ -88,6 +57,100 @@ def convert_to_human_readable(bigint_timestamp):
 
     return dt_forced
 
+FILETIME_EPOCH_OFFSET = 116444736000000000  # 100ns ticks between 1601-01-01 and 1970-01-01
+FILETIME_TICKS_PER_DAY = 864000000000
+
+@profiled
+def filetime_series_to_datetime(filetimes):
+    """
+    Vectorized counterpart of convert_to_human_readable for a whole column of
+    FILETIME integers. Returns a datetime64[ns] Series with the same values
+    the per-row conversion produces: rounded to the microsecond and with the
+    year forced to the current system year. Missing values become NaT.
+    """
+    import numpy as np
+    import pandas as pd
+
+    filetimes = pd.Series(filetimes)
+    ticks = pd.to_numeric(filetimes, errors='coerce') - FILETIME_EPOCH_OFFSET
+    valid = ticks.notna()
+    ticks = ticks[valid].astype('int64').to_numpy()
+
+    # Mirror the float arithmetic of convert_to_human_readable so both agree to
+    # the microsecond: seconds as a float, then timedelta's round-half-even
+    # of the fractional microseconds.
+    whole_seconds, sub_second_ticks = np.divmod(ticks, 10000000)
+    seconds = whole_seconds + sub_second_ticks / 10000000
+    integral = np.trunc(seconds)
+    microseconds = (integral.astype('int64') * 1000000
+                    + np.rint((seconds - integral) * 1000000).astype('int64'))
+
+    decoded = pd.Series(
+        pd.to_datetime(microseconds, unit='us'), index=filetimes.index[valid]
+    )
+
+    # Replace the year with the current system year, keeping month, day and
+    # time. Only the distinct calendar days go through datetime.replace.
+    current_year = datetime.now().year
+    if len(decoded) and not (decoded.dt.year == current_year).all():
+        days = decoded.dt.normalize()
+        unique_days = pd.DatetimeIndex(days.unique())
+        forced_days = pd.DatetimeIndex([day.replace(year=current_year) for day in unique_days])
+        day_shift = pd.Series(forced_days - unique_days, index=unique_days)
+        decoded = decoded + days.map(day_shift)
+
+    return decoded.reindex(filetimes.index)
+
+def filetime_series_to_day(filetimes):
+    """
+    Calendar day of each FILETIME integer as a datetime64[ns] Series at
+    midnight. Unlike filetime_series_to_datetime the year is kept, matching
+    the day buckets LogDate / FILETIME_TICKS_PER_DAY used in SQL.
+    """
+    import pandas as pd
+
+    # Day numbers count from 1601-01-01; shift them to days since the Unix epoch
+    unix_day = pd.Series(filetimes) // FILETIME_TICKS_PER_DAY - FILETIME_EPOCH_OFFSET // FILETIME_TICKS_PER_DAY
+    return pd.to_datetime(unix_day, unit='D')
+
+def to_filetime(dt):
+    """
+    Convert a datetime object to a Windows FILETIME integer.
+    FILETIME represents the number of 100-nanosecond intervals since January 1, 1601 (UTC).
+    We use the formula:
+        filetime = (posix_time * 10,000,000) + 116444736000000000
+    """
+    posix_time = (dt - datetime(1970, 1, 1)).total_seconds()
+    return int(posix_time * 10000000 + FILETIME_EPOCH_OFFSET)
+
+def filetime_day_bounds(date):
+    """
+    Return the inclusive (start, end) FILETIME bounds of the calendar day of `date`.
+    """
+    day_start = datetime(date.year, date.month, date.day)
+    return to_filetime(day_start), to_filetime(day_start + timedelta(days=1)) - 1
+
+def date_key(dt):
+    """
+    Encode a date as the YYYYMMDD integer used to range-filter the Trade
+    table's Year/Month/Day columns.
+    """
+    return dt.year * 10000 + dt.month * 100 + dt.day
+
+def day_runs(days):
+    """
+    Group sorted days (dates or datetimes) into runs of consecutive days.
+
+    :return: List of (first, last) tuples.
+    """
+    runs = []
+    for day in days:
+        if runs and runs[-1][1] == day - timedelta(days=1):
+            runs[-1] = (runs[-1][0], day)
+        else:
+            runs.append((day, day))
+    return runs
+
 def get_most_recent_monday(date):
     days_ago = (date.weekday() + 1) % 7
     return date - timedelta(days=days_ago)
@@ -102,49 +165,98 @@ def get_specified_date(date_str=None):
     else:
         return datetime.now()
 
-def format_message(date, premium_sold, premium_captured, pcr, win_rate,
-                   expired_trades, stops, bad_slip, bad_slip_max, spx_last,
-                   negative_exp, weekly_pl, monthly_pl):
-    ALIGN_WIDTH = 12
+REPORT_ALIGN_WIDTH = 12
 
-    premium_sold_str = f"${premium_sold:,.2f}"
-    premium_captured_str = f"(${abs(premium_captured):,.2f})" if premium_captured < 0 else f"${premium_captured:,.2f}"
-    pcr_str = f"{pcr:.2f}%"
-    win_rate_str = f"{win_rate:.2f}%"
-    exp_stp_str = f"{expired_trades}:{stops}"
+def _format_money(value):
+    return f"(${abs(value):,.2f})" if value < 0 else f"${value:,.2f}"
+
+def format_report_rows(premium_sold, premium_captured, pcr, win_rate, expired_trades, stops,
+                       bad_slip, bad_slip_max, negative_exp, weekly_pl, monthly_pl):
+    """
+    The labelled values of a report below the SPX line, as (label, text) pairs.
+    """
     bad_slip_str = f"{int(bad_slip):,}"
     bad_slip_max_str = f"{abs(bad_slip_max):,.2f}" if bad_slip_max is not None else ""
-    spx_last_str = f"{spx_last:,.2f}" if spx_last is not None else ""
-
     combined_bad_slip_str = f"{bad_slip_str}({bad_slip_max_str} max)" if bad_slip_max else bad_slip_str
-    bad_slip_combined_str = f"{combined_bad_slip_str:>{ALIGN_WIDTH}}"
-
-    negative_exp_str = f"{negative_exp}"
-    weekly_pl_str = f"(${abs(weekly_pl):,.2f})" if weekly_pl < 0 else f"${weekly_pl:,.2f}"
-    monthly_pl_str = f"(${abs(monthly_pl):,.2f})" if monthly_pl < 0 else f"${monthly_pl:,.2f}"
 
+    return [
+        ("Prem Sold", f"${premium_sold:,.2f}"),
+        ("Prem Cap", _format_money(premium_captured)),
+        ("PCR", f"{pcr:.2f}%"),
+        ("Win %", f"{win_rate:.2f}%"),
+        ("Exp : Stp", f"{expired_trades}:{stops}"),
+        ("Bad Slip", combined_bad_slip_str),
+        ("-ve Exprd", f"{negative_exp}"),
+        ("WTD PL", _format_money(weekly_pl)),
+        ("MTD PL", _format_money(monthly_pl)),
+    ]
+
+def _format_date_header(date):
     formatted_date = date.strftime("%Y %b %d")
     day_of_week = calendar.day_name[date.weekday()]
-    full_date_header = f"{formatted_date} ({day_of_week})"
+    return f"{formatted_date} ({day_of_week})"
+
+def format_message(date, premium_sold, premium_captured, pcr, win_rate,
+                   expired_trades, stops, bad_slip, bad_slip_max, spx_last,
+                   negative_exp, weekly_pl, monthly_pl):
+    spx_last_str = f"{spx_last:,.2f}" if spx_last is not None else ""
+    rows = [("SPX Last", spx_last_str)] + format_report_rows(
+        premium_sold, premium_captured, pcr, win_rate, expired_trades, stops,
+        bad_slip, bad_slip_max, negative_exp, weekly_pl, monthly_pl
+    )
+    table = "\n".join(f"{label:<9} | {value:>{REPORT_ALIGN_WIDTH}}" for label, value in rows)
 
     message = f"""
 \n
 """ + "```" + f"""
-{full_date_header}
+{_format_date_header(date)}
 ----------|------------
-SPX Last  | {spx_last_str:>{ALIGN_WIDTH}}
-Prem Sold | {premium_sold_str:>{ALIGN_WIDTH}}
-Prem Cap  | {premium_captured_str:>{ALIGN_WIDTH}}
-PCR       | {pcr_str:>{ALIGN_WIDTH}}
-Win %     | {win_rate_str:>{ALIGN_WIDTH}}
-Exp : Stp | {exp_stp_str:>{ALIGN_WIDTH}}
-Bad Slip  | {bad_slip_combined_str:>{ALIGN_WIDTH}}
--ve Exprd | {negative_exp_str:>{ALIGN_WIDTH}}
-WTD PL    | {weekly_pl_str:>{ALIGN_WIDTH}}
-MTD PL    | {monthly_pl_str:>{ALIGN_WIDTH}}
+{table}
+""" + "```"
+    return message
+
+def format_accounts_message(date, spx_last, columns, notes=()):
+    """
+    Report of several accounts side by side, one column of format_report_rows
+    values per account, in the code block layout of format_message.
+
+    :param columns: List of (column title, rows) tuples, rows as returned by
+                    format_report_rows or None for an account without data.
+    :param notes: Lines added below the table, e.g. accounts that failed.
+    """
+    spx_last_str = f"{spx_last:,.2f}" if spx_last is not None else ""
+    labels = next(([label for label, _ in rows] for _, rows in columns if rows is not None), [])
+
+    lines = [
+        f"{'SPX Last':<9} | {spx_last_str}",
+        f"{'':<9} | " + " | ".join(f"{title[:REPORT_ALIGN_WIDTH]:>{REPORT_ALIGN_WIDTH}}" for title, _ in columns),
+        "----------|" + "|".join("-" * (REPORT_ALIGN_WIDTH + 2) for _ in columns),
+    ]
+    for i, label in enumerate(labels):
+        values = [rows[i][1] if rows is not None else "n/a" for _, rows in columns]
+        lines.append(f"{label:<9} | " + " | ".join(f"{value:>{REPORT_ALIGN_WIDTH}}" for value in values))
+    lines.extend(notes)
+    table = "\n".join(lines)
+
+    message = f"""
+\n
+""" + "```" + f"""
+{_format_date_header(date)}
+{table}
 """ + "```"
     return message
 
+BAD_SLIP_THRESHOLD = 0.50
+
+METRIC_COLUMNS = [
+    'premium_sold', 'premium_captured', 'pcr', 'win_rate', 'expired_trades',
+    'stops', 'bad_slip', 'bad_slip_max', 'negative_exp'
+]
+METRIC_FLOAT_COLUMNS = ['premium_sold', 'premium_captured', 'pcr', 'win_rate', 'bad_slip_max']
+# Trade columns calculate_metrics and calculate_daily_metrics read (plus TradeDate)
+METRIC_INPUT_COLUMNS = ['TotalPremium', 'ProfitLoss', 'ClosingProcessed', 'PriceClose', 'PriceStopTarget']
+
+@profiled
 def calculate_metrics(df_trades_ordered):
     premium_sold = df_trades_ordered['TotalPremium'].sum()
     premium_captured = df_trades_ordered['ProfitLoss'].sum()
@@ -155,24 +267,215 @@ def calculate_metrics(df_trades_ordered):
         if premium_sold != 0 else (0, 0)
     )
     
-    expired_trades = (df_trades_ordered['ClosingProcessed'] == 0).sum()
+    expired = (df_trades_ordered['ClosingProcessed'] == 0).fillna(False).astype(bool)
+    expired_trades = expired.sum()
     stops = (df_trades_ordered['ClosingProcessed'] == 1).sum()
 
-    bad_slip_data = df_trades_ordered.apply(
-        lambda row: abs(row['PriceClose']) - row['PriceStopTarget'], axis=1
-    )
-    bad_slip_condition = bad_slip_data >= 0.50
+    bad_slip_data = df_trades_ordered['PriceClose'].abs() - df_trades_ordered['PriceStopTarget']
+    bad_slip_condition = bad_slip_data >= BAD_SLIP_THRESHOLD
     
     bad_slip = bad_slip_condition.sum()
     bad_slip_max = bad_slip_data[bad_slip_condition].max() if bad_slip > 0 else 0
 
-    negative_exp = df_trades_ordered[
-        (df_trades_ordered['ClosingProcessed'] == 0) &
-        (df_trades_ordered['ProfitLoss'] < 0)
-    ].shape[0]
+    negative_exp = df_trades_ordered[expired & (df_trades_ordered['ProfitLoss'] < 0)].shape[0]
 
     return premium_sold, premium_captured, pcr, win_rate, expired_trades, stops, bad_slip, bad_slip_max, negative_exp
 
+# How the partial sums of partial_metrics combine across trade chunks
+PARTIAL_METRIC_AGGREGATES = {
+    'premium_sold': 'sum', 'premium_captured': 'sum', 'wins': 'sum', 'trades': 'sum',
+    'expired_trades': 'sum', 'stops': 'sum', 'bad_slip': 'sum', 'bad_slip_max': 'max',
+    'negative_exp': 'sum',
+}
+
+def partial_metrics(df_trades, group_keys):
+    """
+    Per-group sums, counts and maxima behind the calculate_metrics figures.
+    Unlike the final metrics they can be added up across chunks of the same
+    groups (see PARTIAL_METRIC_AGGREGATES) before finish_metrics.
+
+    :param group_keys: Dict of group key name to a Series aligned with
+                       df_trades, e.g. {'TradeDate': df_trades['TradeDate']}.
+    :return: DataFrame indexed by the group keys.
+    """
+    import pandas as pd
+
+    profit_loss = df_trades['ProfitLoss']
+    # Open trades have no ClosingProcessed; count them as neither expired nor stopped
+    expired = (df_trades['ClosingProcessed'] == 0).fillna(False).astype(bool)
+    stopped = (df_trades['ClosingProcessed'] == 1).fillna(False).astype(bool)
+    bad_slip_data = df_trades['PriceClose'].abs() - df_trades['PriceStopTarget']
+    bad_slip_condition = bad_slip_data >= BAD_SLIP_THRESHOLD
+
+    per_trade = pd.DataFrame({
+        **group_keys,
+        'premium_sold': df_trades['TotalPremium'],
+        'premium_captured': profit_loss,
+        'wins': profit_loss > 0,
+        'trades': 1,
+        'expired_trades': expired,
+        'stops': stopped,
+        'bad_slip': bad_slip_condition,
+        'bad_slip_max': bad_slip_data.where(bad_slip_condition),
+        'negative_exp': expired & (profit_loss < 0),
+    })
+    return per_trade.groupby(list(group_keys), sort=True).agg(PARTIAL_METRIC_AGGREGATES)
+
+def combine_partial_metrics(partials):
+    """
+    Add up partial_metrics frames of the same group keys.
+    """
+    import pandas as pd
+
+    partials = [partial for partial in partials if not partial.empty] or partials[:1]
+    if len(partials) == 1:
+        return partials[0]
+    levels = list(range(partials[0].index.nlevels))
+    return pd.concat(partials).groupby(level=levels).agg(PARTIAL_METRIC_AGGREGATES)
+
+def finish_metrics(partial):
+    """
+    The METRIC_COLUMNS figures of every group of a partial_metrics frame,
+    with the same arithmetic as calculate_metrics.
+    """
+    metrics = partial.copy()
+    has_premium = metrics['premium_sold'] != 0
+    metrics['pcr'] = (metrics['premium_captured'] / metrics['premium_sold'] * 100).where(has_premium, 0)
+    metrics['win_rate'] = (metrics['wins'] / metrics['trades'] * 100).where(has_premium, 0)
+    metrics['bad_slip_max'] = metrics['bad_slip_max'].fillna(0)
+    return metrics[METRIC_COLUMNS]
+
+@profiled
+def calculate_daily_metrics(df_trades):
+    """
+    Compute the calculate_metrics figures for every day of a multi-day trade
+    frame (as returned by db_handler.get_trades_range) in one groupby.
+
+    :param df_trades: Trades with a TradeDate column.
+    :return: DataFrame indexed by TradeDate with one column per metric
+             (see METRIC_COLUMNS); days without trades are absent.
+    """
+    return finish_metrics(partial_metrics(df_trades, {'TradeDate': df_trades['TradeDate']}))
+
+@profiled
+def calculate_daily_metrics_chunked(trade_chunks):
+    """
+    calculate_daily_metrics over an iterable of trade frames, e.g.
+    db_handler.iter_trades_range. Only one chunk and the per-day partial
+    sums are held at a time, and a day may be split across chunks.
+
+    :param trade_chunks: Iterable of trade frames with a TradeDate column; at
+                         least one, which may be empty.
+    :return: DataFrame like calculate_daily_metrics.
+    """
+    partial = None
+    for df_trades in trade_chunks:
+        chunk_partial = partial_metrics(df_trades, {'TradeDate': df_trades['TradeDate']})
+        partial = chunk_partial if partial is None else combine_partial_metrics([partial, chunk_partial])
+    if partial is None:
+        raise ValueError("No trade chunks to aggregate.")
+    return finish_metrics(partial)
+
+def get_day_metrics(daily_metrics, date):
+    """
+    Return the calculate_metrics tuple for `date` from a calculate_daily_metrics
+    frame; a day without trades gives all zeros.
+    """
+    import pandas as pd
+
+    day = pd.Timestamp(date.year, date.month, date.day)
+    if day not in daily_metrics.index:
+        return (0,) * len(METRIC_COLUMNS)
+    return tuple(daily_metrics.at[day, column] for column in METRIC_COLUMNS)
+
+METRICS_BACKENDS = ('pandas', 'sql')
+
+def get_metrics_backend(config=None):
+    """
+    Backend computing the daily metrics: `metrics_backend` from config.yaml,
+    'pandas' (trade rows loaded into DataFrames, the default) or 'sql'
+    (aggregated inside SQLite).
+    """
+    if config is None:
+        try:
+            config = load_yaml_config()
+        except FileNotFoundError:
+            config = {}
+    backend = config.get('metrics_backend') or 'pandas'
+    if backend not in METRICS_BACKENDS:
+        raise ValueError(f"Unknown metrics_backend '{backend}'. Choose from: {', '.join(METRICS_BACKENDS)}.")
+    return backend
+
+DAILY_METRICS_QUERY = """
+SELECT Year, Month, Day,
+       TOTAL(TotalPremium),
+       TOTAL(ProfitLoss),
+       AVG(CASE WHEN ProfitLoss > 0 THEN 1.0 ELSE 0.0 END),
+       COUNT(CASE WHEN ClosingProcessed = 0 THEN 1 END),
+       COUNT(CASE WHEN ClosingProcessed = 1 THEN 1 END),
+       COUNT(CASE WHEN ABS(PriceClose) - PriceStopTarget >= :threshold THEN 1 END),
+       MAX(CASE WHEN ABS(PriceClose) - PriceStopTarget >= :threshold
+                THEN ABS(PriceClose) - PriceStopTarget END),
+       COUNT(CASE WHEN ClosingProcessed = 0 AND ProfitLoss < 0 THEN 1 END)
+FROM Trade
+WHERE (Year * 10000 + Month * 100 + Day) BETWEEN :start AND :end
+  AND TATTradeID IS NOT NULL
+GROUP BY Year, Month, Day
+ORDER BY Year, Month, Day;
+"""
+
+@profiled
+def query_daily_metrics_rows(connection, start_date, end_date):
+    """
+    The calculate_metrics figures of every day from start_date through
+    end_date, aggregated inside SQLite so no trade rows reach Python.
+
+    :return: List of (datetime, metrics tuple) for the days with trades, the
+             tuple in METRIC_COLUMNS order.
+    """
+    rows = execute_with_retry(connection, DAILY_METRICS_QUERY, {
+        'threshold': BAD_SLIP_THRESHOLD, 'start': date_key(start_date), 'end': date_key(end_date)
+    })
+    days = []
+    for (year, month, day, premium_sold, premium_captured, win,
+         expired_trades, stops, bad_slip, bad_slip_max, negative_exp) in rows:
+        # Same arithmetic as calculate_metrics
+        pcr, win_rate = (
+            ((premium_captured / premium_sold) * 100, win * 100)
+            if premium_sold != 0 else (0, 0)
+        )
+        days.append((datetime(year, month, day), (
+            premium_sold, premium_captured, pcr, win_rate, expired_trades,
+            stops, bad_slip, bad_slip_max if bad_slip > 0 else 0, negative_exp
+        )))
+    return days
+
+def query_day_metrics(connection, date):
+    """
+    SQL counterpart of calculate_metrics for one day, without pandas; a day
+    without trades gives all zeros.
+    """
+    rows = query_daily_metrics_rows(connection, date, date)
+    return rows[0][1] if rows else (0,) * len(METRIC_COLUMNS)
+
+def query_daily_metrics(connection, start_date, end_date):
+    """
+    SQL counterpart of calculate_daily_metrics over a date range: the same
+    frame (indexed by TradeDate, one column per metric), built from one row
+    per day.
+    """
+    import pandas as pd
+
+    rows = query_daily_metrics_rows(connection, start_date, end_date)
+    daily = pd.DataFrame(
+        [metrics for _, metrics in rows],
+        index=pd.DatetimeIndex([day for day, _ in rows], name='TradeDate'),
+        columns=METRIC_COLUMNS,
+    )
+    return daily.astype({
+        column: 'float64' if column in METRIC_FLOAT_COLUMNS else 'int64' for column in METRIC_COLUMNS
+    })
+
 def input_with_timeout(prompt, timeout):
     answer = [None]
     
@@ -190,27 +493,91 @@ def input_with_timeout(prompt, timeout):
     else:
         return answer[0]
 
-def get_last_spx_value(connection, year, month, day):
+DB_LOCK_RETRIES = 4
+DB_LOCK_BACKOFF = 0.25  # seconds, doubled after every attempt
+DEFAULT_WATCH_INTERVAL = 5  # seconds between change checks in --watch mode
+
+def is_database_locked_error(error):
     """
-    Retrieve the last SPX value for a given day from the DailyLog table,
-    forcing the year of each row's timestamp to the current system year.
+    True if `error` (or the error it was raised from, as pandas wraps sqlite3
+    errors) is SQLite reporting a locked or busy database.
     """
-    try:
-        target_date = datetime(year, month, day)
-        query = "SELECT DailyLogID, LogDate, PL, SPX FROM DailyLog WHERE LogDate IS NOT NULL;"
-        df_daily_log = pd.read_sql_query(query, connection)
+    database_errors = (sqlite3.OperationalError,)
+    if 'pandas' in sys.modules:
+        # Only a loaded pandas can have raised its own DatabaseError
+        database_errors += (sys.modules['pandas'].errors.DatabaseError,)
+
+    while error is not None:
+        if isinstance(error, database_errors):
+            message = str(error).lower()
+            if 'database is locked' in message or 'database table is locked' in message or 'busy' in message:
+                return True
+        error = error.__cause__
+    return False
+
+def run_with_lock_retry(func, retries=DB_LOCK_RETRIES, backoff=DB_LOCK_BACKOFF):
+    """
+    Call `func` and retry it with exponential backoff while SQLite reports the
+    database as locked, e.g. while TAT is writing during market hours. Any
+    other error is raised immediately.
+    """
+    for attempt in range(retries + 1):
+        try:
+            return func()
+        except Exception as e:
+            if attempt == retries or not is_database_locked_error(e):
+                raise
+            wait = backoff * 2 ** attempt
+            print(f"Database is locked, retrying in {wait:.2f}s ({attempt + 1}/{retries}).")
+            time.sleep(wait)
+
+def read_sql_with_retry(query, connection, params=None):
+    """
+    pd.read_sql_query with retry on a locked database.
+    """
+    import pandas as pd
 
-        # Convert each row's LogDate to a datetime with the forced current year
-        df_daily_log['LogDate'] = df_daily_log['LogDate'].apply(convert_to_human_readable)
+    df = run_with_lock_retry(lambda: pd.read_sql_query(query, connection, params=params))
+    add_rows(len(df))
+    return df
 
-        # Convert the column to datetime64 if needed (the forced year is now in range)
-        df_daily_log['LogDate'] = pd.to_datetime(df_daily_log['LogDate'])
+def execute_with_retry(connection, query, params=()):
+    """
+    Execute a query with retry on a locked database and return all rows.
+    """
+    rows = run_with_lock_retry(lambda: connection.execute(query, params).fetchall())
+    add_rows(len(rows))
+    return rows
+
+@profiled
+def get_last_spx_value(connection, year, month, day, store=None):
+    """
+    Retrieve the last SPX value for a given day from the DailyLog table.
 
-        # Filter to the requested date
-        df_filtered = df_daily_log[df_daily_log['LogDate'].dt.date == target_date.date()]
+    Only the target day's FILETIME range is searched and only its latest row
+    is returned, so the lookup cost does not grow with the table. Finished
+    days are answered from `store` (a refreshed MetricsStore) when one is given.
+    """
+    if store is not None and store.is_finished(datetime(year, month, day)):
+        stored_spx_value = store.get_last_spx(datetime(year, month, day))
+        if stored_spx_value is not None:
+            print(f"Last SPX value found: {stored_spx_value}")
+            return stored_spx_value
 
-        if not df_filtered.empty:
-            last_spx_value = df_filtered.iloc[-1]['SPX']
+    try:
+        target_date = datetime(year, month, day)
+        day_start, day_end = filetime_day_bounds(target_date)
+        query = """
+        SELECT SPX FROM DailyLog
+        WHERE LogDate BETWEEN ? AND ?
+        ORDER BY LogDate DESC
+        LIMIT 1;
+        """
+        rows = execute_with_retry(connection, query, (day_start, day_end))
+
+        if rows:
+            row = rows[0]
+            last_spx_value = row[0]
             print(f"Last SPX value found: {last_spx_value}")
             return last_spx_value
         else:
@@ -223,3 +590,53 @@ def get_last_spx_value(connection, year, month, day):
     except Exception as e:
         print(f"Error during SPX lookup: {e}")
         return None
+
+SPX_RANGES_PER_QUERY = 200  # LogDate ranges per query, two parameters each
+
+@profiled
+def get_last_spx_values(connection, dates):
+    """
+    Retrieve the last SPX value for each of several days with one query (per
+    SPX_RANGES_PER_QUERY runs of consecutive days).
+
+    :param connection: An active database connection.
+    :param dates: Iterable of date or datetime objects.
+    :return: Dict mapping each requested datetime.date to its last SPX value,
+             or None when the day has no DailyLog rows.
+    """
+    target_days = sorted({datetime(d.year, d.month, d.day) for d in dates})
+    last_spx_values = {day.date(): None for day in target_days}
+    if not target_days:
+        return last_spx_values
+
+    range_start, _ = filetime_day_bounds(target_days[0])
+
+    # Only the requested days are scanned: one LogDate range per run of
+    # consecutive days, so days far apart do not read everything in between.
+    # SQLite returns the bare SPX column from the row holding MAX(LogDate).
+    bounds = [
+        (filetime_day_bounds(first)[0], filetime_day_bounds(last)[1]) for first, last in day_runs(target_days)
+    ]
+    rows = []
+    for i in range(0, len(bounds), SPX_RANGES_PER_QUERY):
+        batch = bounds[i:i + SPX_RANGES_PER_QUERY]
+        query = f"""
+        SELECT (LogDate - ?) / ? AS DayIndex, MAX(LogDate) AS LogDate, SPX
+        FROM DailyLog
+        WHERE {' OR '.join(['LogDate BETWEEN ? AND ?'] * len(batch))}
+        GROUP BY DayIndex;
+        """
+        params = (range_start, FILETIME_TICKS_PER_DAY, *(value for bound in batch for value in bound))
+        try:
+            rows += execute_with_retry(connection, query, params)
+        except sqlite3.Error as e:
+            print(f"Database error occurred: {e}")
+            return last_spx_values
+
+    first_day = target_days[0].date()
+    for day_index, _, spx in rows:
+        day = first_day + timedelta(days=day_index)
+        if day in last_spx_values:
+            last_spx_values[day] = spx
+
+    return last_spx_values
@@ -0,0 +1,155 @@
+import time
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from db_handler import (
+    get_trades_range, get_trades_after, get_trades_by_ids, get_trade_ids_without_tat_id,
+    get_max_row_ids, get_data_version, read_transaction
+)
+from metrics_store import load_daily_metrics
+from PL_Summary import get_report_range_start, wtd_mtd_from_daily_pl
+from profiler import profiled
+from utils import (
+    DEFAULT_WATCH_INTERVAL, METRIC_INPUT_COLUMNS, calculate_daily_metrics, execute_with_retry,
+    filetime_day_bounds, format_message, get_day_metrics, get_last_spx_value
+)
+
+# Trade columns the intraday report keeps: its metrics' inputs plus what
+# identifies the trades that are still open
+INTRADAY_COLUMNS = ['TradeID', 'DateClosed'] + METRIC_INPUT_COLUMNS
+
+class IntradayReport:
+    """
+    The report of one day, kept up to date incrementally.
+
+    Days before `date` are loaded once. Each update() only reads trades added
+    since the previous update plus the day's trades that were still open or
+    had no TATTradeID yet, and DailyLog rows above the last seen DailyLogID.
+    """
+
+    def __init__(self, connection, date, store=None):
+        self.connection = connection
+        self.date = datetime(date.year, date.month, date.day)
+
+        range_start = get_report_range_start(self.date)
+        previous_day = self.date - timedelta(days=1)
+        if range_start <= previous_day:
+            self.prior_premium_captured = load_daily_metrics(
+                connection, range_start, previous_day, store
+            )['premium_captured']
+        else:
+            self.prior_premium_captured = pd.Series(dtype='float64')
+
+        self.last_trade_id, self.last_log_id = get_max_row_ids(connection)
+        self.trades = get_trades_range(connection, self.date, self.date, columns=INTRADAY_COLUMNS)
+        # Rows the trade readers skip until TAT sets their TATTradeID
+        self.pending_ids = get_trade_ids_without_tat_id(connection, self.date)
+        self.spx_last = get_last_spx_value(connection, self.date.year, self.date.month, self.date.day)
+
+    @profiled
+    def update(self):
+        """
+        Read what changed since the previous update.
+
+        :return: True if the day's trades or SPX value may have changed.
+        """
+        max_trade_id, max_log_id = get_max_row_ids(self.connection)
+        changed = False
+
+        # Trades still open (not processed or without a close time) may change
+        still_open = self.trades['ClosingProcessed'].isna() | self.trades['DateClosed'].isna()
+        open_ids = self.trades.loc[still_open, 'TradeID']
+        if max_trade_id > self.last_trade_id or len(open_ids) or self.pending_ids:
+            new_trades = get_trades_after(self.connection, self.last_trade_id, self.date, columns=INTRADAY_COLUMNS)
+            new_pending_ids = get_trade_ids_without_tat_id(self.connection, self.date, self.last_trade_id)
+            reread_trades = get_trades_by_ids(
+                self.connection, list(open_ids) + self.pending_ids, columns=INTRADAY_COLUMNS
+            )
+            read_ids = set(reread_trades['TradeID'])
+            kept = self.trades[~still_open]
+            self.trades = pd.concat([kept, reread_trades, new_trades], ignore_index=True)
+            changed = len(new_trades) > 0 or len(open_ids) > 0 or any(i in read_ids for i in self.pending_ids)
+            self.pending_ids = [i for i in self.pending_ids if i not in read_ids] + new_pending_ids
+            self.last_trade_id = max_trade_id
+
+        if max_log_id > self.last_log_id:
+            day_start, day_end = filetime_day_bounds(self.date)
+            # SQLite returns the bare SPX column from the row holding MAX(LogDate)
+            rows = execute_with_retry(
+                self.connection,
+                "SELECT MAX(LogDate), SPX FROM DailyLog "
+                "WHERE DailyLogID > ? AND LogDate BETWEEN ? AND ?;",
+                (self.last_log_id, day_start, day_end)
+            )
+            if rows and rows[0][0] is not None and rows[0][1] != self.spx_last:
+                self.spx_last = rows[0][1]
+                changed = True
+            self.last_log_id = max_log_id
+
+        return changed
+
+    def message(self):
+        daily_metrics = calculate_daily_metrics(self.trades)
+        (
+            premium_sold, premium_captured, pcr,
+            win_rate, expired_trades, stops,
+            bad_slip, bad_slip_max, negative_exp
+        ) = get_day_metrics(daily_metrics, self.date)
+
+        daily_pl = pd.concat([self.prior_premium_captured, daily_metrics['premium_captured']])
+        weekly_pl, monthly_pl = wtd_mtd_from_daily_pl(daily_pl, self.date)
+
+        return format_message(
+            self.date, premium_sold, premium_captured, pcr, win_rate,
+            expired_trades, stops, bad_slip, bad_slip_max, self.spx_last,
+            negative_exp, weekly_pl, monthly_pl
+        )
+
+def watch(connection, publish, interval=DEFAULT_WATCH_INTERVAL, store=None, max_ticks=None, now=datetime.now):
+    """
+    Keep the current day's report up to date until interrupted.
+
+    Every `interval` seconds the connection's data_version is compared with the
+    previous tick; only when TAT has committed something is the report updated,
+    and `publish(date, message)` is only called when the formatted message
+    actually changed. A new IntradayReport is started when the day rolls over.
+
+    :param max_ticks: Stop after this many ticks (for tests); None runs forever.
+    """
+    report = None
+    last_version = None
+    last_message = None
+    ticks = 0
+
+    while max_ticks is None or ticks < max_ticks:
+        today = now()
+        version = get_data_version(connection)
+
+        if report is None or report.date.date() != today.date():
+            if store is not None:
+                store.today = today.date()
+                store.refresh(connection)
+            with read_transaction(connection):
+                report = IntradayReport(connection, today, store)
+            last_version, last_message = version, None
+            changed = True
+        elif version != last_version:
+            last_version = version
+            start = time.perf_counter()
+            with read_transaction(connection):
+                changed = report.update()
+            if changed:
+                print(f"Update read in {(time.perf_counter() - start) * 1000:.1f} ms.")
+        else:
+            changed = False
+
+        if changed:
+            message = report.message()
+            if message != last_message:
+                publish(report.date, message)
+                last_message = message
+
+        ticks += 1
+        if max_ticks is None or ticks < max_ticks:
+            time.sleep(interval)